@@ -0,0 +1,39 @@
+"""Measure how rendering scales with the number of threads.
+
+Run it on a regular and on a free-threaded interpreter to compare::
+
+    python benchmarks/thread_scaling.py --count 2000 --threads 1 2 4 8
+    python3.13t benchmarks/thread_scaling.py --count 2000 --threads 1 2 4 8
+"""
+
+import argparse
+import platform
+import time
+
+from pybarcodes import EAN13
+from pybarcodes.batch import gil_enabled, render_many
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--format", default="PNG")
+    args = parser.parse_args()
+
+    barcodes = [EAN13(f"400638{i:06d}") for i in range(args.count)]
+    print(f"Python {platform.python_version()}, GIL enabled: {gil_enabled()}")
+
+    baseline = None
+    for threads in args.threads:
+        started = time.perf_counter()
+        render_many(barcodes, format=args.format, max_workers=threads)
+        elapsed = time.perf_counter() - started
+
+        rate = args.count / elapsed
+        baseline = baseline or rate
+        print(f"{threads:>3} threads: {rate:8.0f} renders/s ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 from collections import namedtuple
 
-from pybarcodes.codes import CODE39, Code
+from pybarcodes.codes import CODE39, CODE128, Code
 from pybarcodes.ean import EAN, EAN8, EAN13, EAN14, JAN, Size, Weights
+from pybarcodes.prefork import warmup
+from pybarcodes.profile import RenderProfile
 
 __title__ = "pybarcodes"
 __author__ = "atbuy"
@@ -13,6 +15,19 @@ VersionInfo = namedtuple("VersionInfo", "major minor patch")
 
 version_info = VersionInfo(*__version__)
 
-SUPPORTED_BARCODES = ["EAN13", "EAN8", "EAN14", "JAN", "CODE39"]
+SUPPORTED_BARCODES = ["EAN13", "EAN8", "EAN14", "JAN", "CODE39", "CODE128"]
 
-__all__ = ("CODE39", "Code", "EAN", "EAN8", "EAN13", "EAN14", "JAN", "Size", "Weights")
+__all__ = (
+    "CODE39",
+    "CODE128",
+    "Code",
+    "EAN",
+    "EAN8",
+    "EAN13",
+    "EAN14",
+    "JAN",
+    "RenderProfile",
+    "Size",
+    "Weights",
+    "warmup",
+)
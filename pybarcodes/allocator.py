@@ -0,0 +1,316 @@
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+from collections.abc import Iterable
+from typing import BinaryIO
+
+from .barcode import BarcodeInput, PathInput
+from .ean import EAN, EAN13
+from .exceptions import IncorrectFormat
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+MAGIC = b"PBGTIN\x00\x01"
+# magic, barcode type, prefix, slots, cursor
+HEADER = struct.Struct("<8s16s16sQQ")
+# The bitmap starts on its own page, so the header can be flushed on its own
+HEADER_SIZE = 4096
+
+# Finds the next byte of the bitmap that has a free slot
+_NOT_FULL = re.compile(rb"[^\xff]")
+
+
+class GTINAllocator:
+    """Issue the codes of a company prefix, never issuing a code twice
+
+    Every item reference of the prefix is a bit in a memory-mapped file,
+    so 100 million slots take 12.5 MB. A cursor keeps the lowest slot that
+    may be free, so allocating codes only looks at the slots it hands out.
+
+    The bits of every change are flushed to disk before the call returns.
+    A crash can only leave slots marked that were never handed out, and
+    never clear the slot of a code that was. Processes sharing a file lock
+    it while they change it.
+
+    Parameters
+    ----------
+    path: Union[str, PathLike]
+        The bitmap file. It's created when it doesn't exist.
+    prefix: Union[str, int]
+        The GS1 company prefix. The rest of the digits, except the check
+        digit, are the item reference.
+    barcode_type: type[EAN]
+        The type of the codes, like EAN13 or EAN14
+
+    Raises
+    ------
+    IncorrectFormat
+        Raised when the prefix isn't valid for the barcode type
+    ValueError
+        Raised when the file belongs to a different prefix or barcode type
+    """
+
+    def __init__(
+        self, path: PathInput, prefix: BarcodeInput, barcode_type: type[EAN] = EAN13
+    ):
+        prefix = str(prefix)
+        width = barcode_type.BARCODE_LENGTH - len(prefix)
+        if width <= 0:
+            raise IncorrectFormat(
+                f"{barcode_type.__name__} prefix should be shorter than "
+                f"{barcode_type.BARCODE_LENGTH} digits, not {len(prefix)}."
+            )
+        barcode_type.validate(prefix + "0" * width)
+
+        self.path = os.fspath(path)
+        self.prefix = prefix
+        self.barcode_type = barcode_type
+        self.slots = 10**width
+        self._width = width
+        self._lock = threading.Lock()
+
+        if not os.path.exists(self.path):
+            self._create()
+
+        self._file = open(self.path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+        magic, type_name, file_prefix, slots, _ = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} isn't a GTIN bitmap.")
+        if (type_name.rstrip(b"\0"), file_prefix.rstrip(b"\0"), slots) != (
+            barcode_type.__name__.encode(),
+            prefix.encode(),
+            self.slots,
+        ):
+            self.close()
+            raise ValueError(
+                f"{self.path} belongs to a different prefix or barcode type."
+            )
+
+    def __enter__(self) -> "GTINAllocator":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the bitmap file"""
+
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    @property
+    def allocated(self) -> int:
+        """How many slots are allocated or reserved"""
+
+        count = 0
+        with self._lock:
+            end = len(self._map)
+            for start in range(HEADER_SIZE, end, 1024**2):
+                chunk = self._map[start : min(start + 1024**2, end)]
+                count += int.from_bytes(chunk, "little").bit_count()
+
+        # The bits past the last slot are always set
+        return count - (-self.slots % 8)
+
+    @property
+    def free(self) -> int:
+        """How many slots can still be allocated"""
+
+        return self.slots - self.allocated
+
+    def allocate(self, count: int = 1) -> list[str]:
+        """Allocate the next free codes
+
+        Parameters
+        ----------
+        count: int
+            How many codes to allocate
+
+        Returns
+        -------
+        list[str]:
+            The codes, with their check digits, in increasing order
+
+        Raises
+        ------
+        ValueError
+            Raised when there aren't enough free codes.
+            No codes are allocated then.
+        """
+
+        count = EAN._positive_int(count, "count")
+
+        with self._locked():
+            cursor = self._cursor()
+            slots = []
+            position = cursor
+            while len(slots) < count:
+                match = _NOT_FULL.search(self._map, HEADER_SIZE + position // 8)
+                if match is None:
+                    raise ValueError(
+                        f"Only {len(slots)} free codes are left, not {count}."
+                    )
+
+                index = match.start() - HEADER_SIZE
+                byte = self._map[match.start()]
+                bit = position - index * 8 if index == position // 8 else 0
+                while bit < 8 and len(slots) < count:
+                    if not byte & (1 << bit):
+                        slots.append(index * 8 + bit)
+                    bit += 1
+                position = index * 8 + bit
+
+            self._set(slots, True)
+            self._set_cursor(position)
+
+        return [self._code(slot) for slot in slots]
+
+    def reserve(self, codes: Iterable[BarcodeInput]) -> None:
+        """Mark codes as used, so they're never allocated
+
+        Raises
+        ------
+        ValueError
+            Raised when one of the codes is already allocated or reserved.
+            None of the codes are reserved then.
+        """
+
+        slots = [self._slot(code) for code in codes]
+        with self._locked():
+            taken = [slot for slot in slots if self._is_set(slot)]
+            if taken:
+                raise ValueError(f"{self._code(taken[0])} is already allocated.")
+            self._set(slots, True)
+
+    def release(self, codes: Iterable[BarcodeInput]) -> None:
+        """Free allocated or reserved codes, so they can be allocated again
+
+        Raises
+        ------
+        ValueError
+            Raised when one of the codes isn't allocated.
+            None of the codes are released then.
+        """
+
+        slots = [self._slot(code) for code in codes]
+        with self._locked():
+            free = [slot for slot in slots if not self._is_set(slot)]
+            if free:
+                raise ValueError(f"{self._code(free[0])} isn't allocated.")
+            self._set(slots, False)
+            if slots:
+                self._set_cursor(min(self._cursor(), *slots))
+
+    def is_allocated(self, code: BarcodeInput) -> bool:
+        """Whether a code is allocated or reserved"""
+
+        return self._is_set(self._slot(code))
+
+    def _create(self) -> None:
+        """Write an empty bitmap and link it into place in a single step
+
+        Linking fails when the file exists, so an allocator created at the
+        same time by another process is kept, along with the codes it issued.
+        """
+
+        size = (self.slots + 7) // 8
+        directory = os.path.dirname(os.path.abspath(self.path))
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                header = HEADER.pack(
+                    MAGIC,
+                    self.barcode_type.__name__.encode(),
+                    self.prefix.encode(),
+                    self.slots,
+                    0,
+                )
+                file.write(header.ljust(HEADER_SIZE, b"\0"))
+                file.truncate(HEADER_SIZE + size)
+
+                # Mark the bits past the last slot, so they're never free
+                padding = -self.slots % 8
+                if padding:
+                    file.seek(HEADER_SIZE + size - 1)
+                    file.write(bytes([(0xFF << (8 - padding)) & 0xFF]))
+
+                file.flush()
+                os.fsync(file.fileno())
+            try:
+                os.link(temporary, self.path)
+            except FileExistsError:
+                pass
+        finally:
+            os.remove(temporary)
+
+    def _locked(self) -> "_FileLock":
+        return _FileLock(self._lock, self._file)
+
+    def _slot(self, code: BarcodeInput) -> int:
+        code = str(code)
+        normalized = self.barcode_type.normalize(code)
+        if len(code) > self.barcode_type.BARCODE_LENGTH and code != normalized:
+            raise IncorrectFormat(f"{code} doesn't have the right check digit.")
+        if not normalized.startswith(self.prefix):
+            raise ValueError(f"{code} doesn't start with the prefix {self.prefix}.")
+        return int(normalized[len(self.prefix) : -1])
+
+    def _code(self, slot: int) -> str:
+        return self.barcode_type.normalize(f"{self.prefix}{slot:0{self._width}d}")
+
+    def _is_set(self, slot: int) -> bool:
+        return bool(self._map[HEADER_SIZE + slot // 8] & (1 << slot % 8))
+
+    def _set(self, slots: list[int], value: bool) -> None:
+        if not slots:
+            return
+
+        for slot in slots:
+            index = HEADER_SIZE + slot // 8
+            if value:
+                self._map[index] |= 1 << slot % 8
+            else:
+                self._map[index] &= ~(1 << slot % 8) & 0xFF
+
+        # Flush the pages that changed before anything is handed out
+        start = HEADER_SIZE + min(slots) // 8
+        start -= start % mmap.ALLOCATIONGRANULARITY
+        end = HEADER_SIZE + max(slots) // 8 + 1
+        self._map.flush(start, end - start)
+
+    def _cursor(self) -> int:
+        return HEADER.unpack_from(self._map)[4]
+
+    def _set_cursor(self, cursor: int) -> None:
+        # The cursor is only where the search for free slots starts. It's
+        # written after the bits, so at worst it points before a used slot.
+        struct.pack_into("<Q", self._map, HEADER.size - 8, cursor)
+        self._map.flush(0, HEADER_SIZE)
+
+
+class _FileLock:
+    """Lock an allocator across threads, and across processes where possible"""
+
+    def __init__(self, lock: threading.Lock, file: BinaryIO):
+        self.lock = lock
+        self.file = file
+
+    def __enter__(self) -> None:
+        self.lock.acquire()
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+
+    def __exit__(self, *exc_info: object) -> None:
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.lock.release()
@@ -1,14 +1,58 @@
-from collections import namedtuple
+import hashlib
+import os
+import socket
+import threading
+from collections import OrderedDict, namedtuple
 from io import BytesIO
 from os import PathLike
-from typing import Any, Optional, Union
+from typing import TYPE_CHECKING, Any, BinaryIO, Optional, Union
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
+
+from .profile import PIXEL_SIZES, RenderProfile, _positive_int, get_render_profile
+
+if TYPE_CHECKING:
+    from .cache import DiskCache
 
 BarcodeInput = Union[str, int]
 PathInput = Union[str, PathLike[str]]
 RenderSize = tuple[int, int]
-RenderOptions = tuple[int, int, int, int, int]
+ModuleRuns = namedtuple("ModuleRuns", "width bars")
+RenderOptions = namedtuple(
+    "RenderOptions", "module_width bar_height quiet_zone font_size text_padding"
+)
+Measurement = namedtuple("Measurement", "width height bars text raster_bytes")
+Box = tuple[int, int, int, int]
+
+_transpose = getattr(Image, "Transpose", Image)
+TRANSPOSES = {
+    90: _transpose.ROTATE_90,
+    180: _transpose.ROTATE_180,
+    270: _transpose.ROTATE_270,
+}
+
+# How many codes keep their module runs around
+MAX_MODULE_RUNS = 256
+
+# Kept apart from the barcodes, so rendering never writes to the barcode
+_code_runs: "OrderedDict[tuple[type, str], ModuleRuns]" = OrderedDict()
+_code_runs_lock = threading.Lock()
+
+
+def _rotate_box(box: Box, width: int, height: int, rotation: int) -> Box:
+    """Map a box of an upright image to the same box of the rotated image
+
+    The rotation is counterclockwise, the same as `Image.transpose`.
+    """
+
+    left, upper, right, lower = box
+    if rotation == 90:
+        return upper, width - right, lower, width - left
+    if rotation == 180:
+        return width - right, height - lower, width - left, height - upper
+    if rotation == 270:
+        return height - lower, left, height - upper, right
+    return box
 
 
 class Barcode:
@@ -53,20 +97,76 @@ class Barcode:
         quiet_zone: Optional[int] = None,
         font_size: Optional[int] = None,
         draw_text: bool = True,
+        mode: str = "RGB",
+        rotation: int = 0,
+        profile: Optional[RenderProfile] = None,
     ) -> Image.Image:
-        """Create a PIL Image object for the barcode."""
+        """Create a PIL Image object for the barcode.
 
-        img = self._get_barcode_image(
-            module_width=module_width,
-            bar_height=bar_height,
-            quiet_zone=quiet_zone,
-            font_size=font_size,
-            draw_text=draw_text,
+        Parameters
+        ----------
+        mode: str
+            The image mode, one of `1`, `L` or `RGB`
+        rotation: int
+            The angle to draw the barcode at, counterclockwise in degrees.
+            The bars are drawn straight into the rotated image.
+        profile: Optional[RenderProfile]
+            A profile to take the render options from,
+            in place of the keyword arguments
+        """
+
+        profile = self._get_profile(
+            profile,
+            size,
+            module_width,
+            bar_height,
+            quiet_zone,
+            font_size,
+            draw_text,
+            mode,
+            rotation,
         )
-        if size is not None:
-            resampling = getattr(Image, "Resampling", Image)
-            img = img.resize(size, resampling.NEAREST)
-        return img
+
+        profile.check_limits(self._get_measurement(profile, text=False))
+        return self._draw(profile, profile.options(self))
+
+    def measure(
+        self,
+        size: Optional[RenderSize] = None,
+        module_width: Optional[int] = None,
+        bar_height: Optional[int] = None,
+        quiet_zone: Optional[int] = None,
+        font_size: Optional[int] = None,
+        draw_text: bool = True,
+        mode: str = "RGB",
+        rotation: int = 0,
+        profile: Optional[RenderProfile] = None,
+    ) -> Measurement:
+        """Find the geometry of the rendered image without rendering it.
+
+        It takes the same options as :meth:`render`. Boxes are
+        `(left, top, right, bottom)` tuples in pixels of the final image.
+
+        Returns
+        -------
+        Measurement:
+            The width and height of the image, the box of the bars, the box of
+            the text or None when there's no text, and an estimate of the
+            memory the images of the render take in bytes
+        """
+
+        profile = self._get_profile(
+            profile,
+            size,
+            module_width,
+            bar_height,
+            quiet_zone,
+            font_size,
+            draw_text,
+            mode,
+            rotation,
+        )
+        return self._get_measurement(profile)
 
     def save(
         self,
@@ -77,6 +177,10 @@ class Barcode:
         quiet_zone: Optional[int] = None,
         font_size: Optional[int] = None,
         draw_text: bool = True,
+        mode: str = "RGB",
+        rotation: int = 0,
+        cache: Optional["DiskCache"] = None,
+        profile: Optional[RenderProfile] = None,
         **save_kwargs: Any,
     ) -> Image.Image:
         """Create a PIL Image object and save it to the path given.
@@ -87,21 +191,53 @@ class Barcode:
         ----------
         path: str
             The path to save the image to
+        cache: Optional[DiskCache]
+            A cache to take the file from instead of encoding the image,
+            and to store it in after encoding. The rendered image is
+            returned either way.
+        profile: Optional[RenderProfile]
+            A profile to take the render options, the format
+            and the save arguments from
 
         Returns
         -------
         Returns a PIL Image object to the caller
         """
 
-        img = self.render(
-            size=size,
-            module_width=module_width,
-            bar_height=bar_height,
-            quiet_zone=quiet_zone,
-            font_size=font_size,
-            draw_text=draw_text,
+        profile = self._get_profile(
+            profile,
+            size,
+            module_width,
+            bar_height,
+            quiet_zone,
+            font_size,
+            draw_text,
+            mode,
+            rotation,
         )
+        save_kwargs = {**profile.save_kwargs, **save_kwargs}
+        if profile.format is not None:
+            save_kwargs.setdefault("format", profile.format)
+
+        img = self.render(profile=profile)
+
+        key = None
+        if cache is not None and isinstance(path, (str, PathLike)):
+            extension = os.path.splitext(path)[1].lower()
+            image_format = save_kwargs.get("format")
+            image_format = image_format or Image.registered_extensions().get(extension)
+            if image_format is not None:
+                key_kwargs = {k: v for k, v in save_kwargs.items() if k != "format"}
+                key = self.render_key(image_format, profile=profile, **key_kwargs)
+                if cache.copy_to(key, path):
+                    return img
+                # A destination linked to an entry is replaced, not written through
+                if getattr(cache, "link", False) and cache.is_entry_link(path):
+                    os.unlink(path)
+
         img.save(path, **save_kwargs)
+        if key is not None:
+            cache.put_file(key, path)
         return img
 
     def show(self) -> None:
@@ -132,54 +268,229 @@ class Barcode:
 
         return self.to_text_bytesio(encoding=encoding)
 
+    def write_image(
+        self,
+        stream: Union[BinaryIO, socket.socket],
+        format: Optional[str] = None,
+        size: Optional[RenderSize] = None,
+        module_width: Optional[int] = None,
+        bar_height: Optional[int] = None,
+        quiet_zone: Optional[int] = None,
+        font_size: Optional[int] = None,
+        draw_text: bool = True,
+        mode: str = "RGB",
+        rotation: int = 0,
+        profile: Optional[RenderProfile] = None,
+        **save_kwargs: Any,
+    ) -> None:
+        """Encode the rendered barcode image straight into a stream.
+
+        The image is written as it's encoded, without being collected in
+        memory first. Streams with a file descriptor, like files, pipes and
+        sockets, are written to by the encoder directly.
+
+        Parameters
+        ----------
+        stream: Union[BinaryIO, socket.socket]
+            A writable binary file object, or a connected socket. Formats that
+            have to go back and patch their headers, like TIFF, also need it
+            to be seekable.
+        format: Optional[str]
+            The image format. It defaults to the one of the profile, or `PNG`.
+        """
+
+        profile = self._get_profile(
+            profile,
+            size,
+            module_width,
+            bar_height,
+            quiet_zone,
+            font_size,
+            draw_text,
+            mode,
+            rotation,
+        )
+        img = self.render(profile=profile)
+        format = format or profile.format or "PNG"
+        save_kwargs = {**profile.save_kwargs, **save_kwargs}
+
+        if isinstance(stream, socket.socket):
+            with stream.makefile("wb") as file:
+                img.save(file, format=format, **save_kwargs)
+        else:
+            img.save(stream, format=format, **save_kwargs)
+
     def to_image_bytesio(
         self,
-        format: str = "PNG",
+        format: Optional[str] = None,
         size: Optional[RenderSize] = None,
         module_width: Optional[int] = None,
         bar_height: Optional[int] = None,
         quiet_zone: Optional[int] = None,
         font_size: Optional[int] = None,
         draw_text: bool = True,
+        mode: str = "RGB",
+        rotation: int = 0,
+        profile: Optional[RenderProfile] = None,
         **save_kwargs: Any,
     ) -> BytesIO:
-        """Return the rendered barcode image in a BytesIO object."""
+        """Return the rendered barcode image in a BytesIO object.
+
+        The format defaults to the one of the profile, or `PNG`.
+        """
+
+        profile = self._get_profile(
+            profile,
+            size,
+            module_width,
+            bar_height,
+            quiet_zone,
+            font_size,
+            draw_text,
+            mode,
+            rotation,
+        )
 
         obj = BytesIO()
-        self.render(
-            size=size,
-            module_width=module_width,
-            bar_height=bar_height,
-            quiet_zone=quiet_zone,
-            font_size=font_size,
-            draw_text=draw_text,
-        ).save(obj, format=format, **save_kwargs)
+        self.write_image(obj, format, profile=profile, **save_kwargs)
         obj.seek(0)
         return obj
 
-    def to_image_bytes(
+    def to_image_buffer(
         self,
-        format: str = "PNG",
+        format: Optional[str] = None,
         size: Optional[RenderSize] = None,
         module_width: Optional[int] = None,
         bar_height: Optional[int] = None,
         quiet_zone: Optional[int] = None,
         font_size: Optional[int] = None,
         draw_text: bool = True,
+        mode: str = "RGB",
+        rotation: int = 0,
+        profile: Optional[RenderProfile] = None,
         **save_kwargs: Any,
-    ) -> bytes:
-        """Return the rendered barcode image as bytes."""
+    ) -> memoryview:
+        """Return the rendered barcode image as a memoryview.
+
+        The view is over the buffer the image was encoded into, so unlike
+        :meth:`to_image_bytes` the encoded image is never copied. It can be
+        passed to anything that takes bytes-like objects, like
+        `socket.sendall` or `file.write`.
+        """
 
         return self.to_image_bytesio(
-            format=format,
+            format,
             size=size,
             module_width=module_width,
             bar_height=bar_height,
             quiet_zone=quiet_zone,
             font_size=font_size,
             draw_text=draw_text,
+            mode=mode,
+            rotation=rotation,
+            profile=profile,
             **save_kwargs,
-        ).getvalue()
+        ).getbuffer()
+
+    def to_image_bytes(
+        self,
+        format: Optional[str] = None,
+        size: Optional[RenderSize] = None,
+        module_width: Optional[int] = None,
+        bar_height: Optional[int] = None,
+        quiet_zone: Optional[int] = None,
+        font_size: Optional[int] = None,
+        draw_text: bool = True,
+        mode: str = "RGB",
+        rotation: int = 0,
+        cache: Optional["DiskCache"] = None,
+        profile: Optional[RenderProfile] = None,
+        **save_kwargs: Any,
+    ) -> bytes:
+        """Return the rendered barcode image as bytes.
+
+        The format defaults to the one of the profile, or `PNG`.
+        When a cache is given, the bytes are taken from it if they are there,
+        and stored in it after rendering otherwise.
+        """
+
+        profile = self._get_profile(
+            profile,
+            size,
+            module_width,
+            bar_height,
+            quiet_zone,
+            font_size,
+            draw_text,
+            mode,
+            rotation,
+        )
+
+        if cache is not None:
+            key = self.render_key(format, profile=profile, **save_kwargs)
+            data = cache.get(key)
+            if data is None:
+                data = self.to_image_bytes(format, profile=profile, **save_kwargs)
+                cache.put(key, data)
+            return data
+
+        return self.to_image_bytesio(format, profile=profile, **save_kwargs).getvalue()
+
+    def render_key(
+        self,
+        format: Optional[str] = None,
+        size: Optional[RenderSize] = None,
+        module_width: Optional[int] = None,
+        bar_height: Optional[int] = None,
+        quiet_zone: Optional[int] = None,
+        font_size: Optional[int] = None,
+        draw_text: bool = True,
+        mode: str = "RGB",
+        rotation: int = 0,
+        profile: Optional[RenderProfile] = None,
+        **save_kwargs: Any,
+    ) -> str:
+        """Return a digest that identifies a rendered image of the barcode.
+
+        The digest covers the library version, the barcode type, the normalized
+        code, the resolved render options, the image format and the save
+        arguments, so two calls return the same key only when they would
+        produce the same image bytes.
+
+        Returns
+        -------
+        str:
+            A 32 character hexadecimal digest
+        """
+
+        from pybarcodes import __version__
+
+        profile = self._get_profile(
+            profile,
+            size,
+            module_width,
+            bar_height,
+            quiet_zone,
+            font_size,
+            draw_text,
+            mode,
+            rotation,
+        )
+        format = format or profile.format or "PNG"
+
+        payload = (
+            __version__,
+            self.__class__.__name__,
+            self.code,
+            tuple(profile.options(self)),
+            profile.size,
+            profile.draw_text,
+            profile.mode,
+            profile.rotation,
+            format.upper(),
+            sorted({**profile.save_kwargs, **save_kwargs}.items()),
+        )
+        return hashlib.blake2b(repr(payload).encode(), digest_size=16).hexdigest()
 
     def write(self, path: PathInput, encoding: str = "ascii") -> None:
         """
@@ -193,12 +504,39 @@ class Barcode:
         with open(path, "w", encoding=encoding) as file:
             file.write(self.code)
 
+    _positive_int = staticmethod(_positive_int)
+
     @staticmethod
-    def _positive_int(value: int, name: str) -> int:
-        value = int(value)
-        if value <= 0:
-            raise ValueError(f"{name} must be greater than 0.")
-        return value
+    def _get_profile(
+        profile: Optional[RenderProfile],
+        size: Optional[RenderSize],
+        module_width: Optional[int],
+        bar_height: Optional[int],
+        quiet_zone: Optional[int],
+        font_size: Optional[int],
+        draw_text: bool,
+        mode: str,
+        rotation: int,
+    ) -> RenderProfile:
+        """Return the profile given, or the shared one of the render options"""
+
+        if profile is None:
+            return get_render_profile(
+                None if size is None else tuple(size),
+                module_width,
+                bar_height,
+                quiet_zone,
+                font_size,
+                draw_text,
+                mode,
+                rotation,
+            )
+
+        options = (size, module_width, bar_height, quiet_zone, font_size)
+        changed = not draw_text or mode != "RGB" or rotation != 0
+        if options != (None,) * 5 or changed:
+            raise TypeError("Render options can't be given together with a profile.")
+        return profile
 
     def _get_render_options(
         self,
@@ -233,59 +571,186 @@ class Barcode:
         )
         text_padding = padding.height if draw_text else 0
 
-        return module_width, bar_height, quiet_zone, font_size, text_padding
+        return RenderOptions(
+            module_width, bar_height, quiet_zone, font_size, text_padding
+        )
 
-    def _get_default_font(self, font_size: int) -> ImageFont.ImageFont:
-        try:
-            return ImageFont.load_default(size=font_size)
-        except TypeError:
-            return ImageFont.load_default()
+    def _get_measurement(
+        self, profile: RenderProfile, text: bool = True
+    ) -> Measurement:
+        """Computes the geometry of a render from the module count and options
 
-    def _get_barcode_image(
-        self,
-        module_width: Optional[int] = None,
-        bar_height: Optional[int] = None,
-        quiet_zone: Optional[int] = None,
-        font_size: Optional[int] = None,
-        draw_text: bool = True,
-    ) -> Image.Image:
-        """Creates a PIL Image from the binary string of the barcode
+        The text box is only measured when `text` is true.
+        """
+
+        module_width, bar_height, quiet_zone, font_size, text_padding = profile.options(
+            self
+        )
+
+        bars_width = self._module_runs().width * module_width
+        width = bars_width + quiet_zone * 2
+        height = bar_height + text_padding
+        top = text_padding // 2
+
+        # The bars, the padded image and the resized image are all in memory.
+        # Rotated images are drawn without a separate image of the bars.
+        pixels = width * height
+        if not profile.rotation:
+            pixels += bars_width * bar_height
+        boxes = [(quiet_zone, top, quiet_zone + bars_width, top + bar_height)]
+
+        if profile.draw_text and text:
+            font = profile.font(font_size)
+            text_mode = "1" if profile.mode == "1" else "L"
+            with profile.font_lock:
+                length = font.getlength(self.code, mode=text_mode)
+                left, upper, right, lower = font.getbbox(self.code, mode=text_mode)
+            x = int(width // 2 - length // 2)
+            y = top + bar_height
+            boxes.append((x + left, y + upper, x + right, y + lower))
+
+        if profile.rotation:
+            boxes = [_rotate_box(box, width, height, profile.rotation) for box in boxes]
+            if profile.rotation != 180:
+                width, height = height, width
+
+        if profile.size is not None:
+            scale_x, scale_y = profile.size[0] / width, profile.size[1] / height
+            boxes = [
+                (
+                    round(left * scale_x),
+                    round(upper * scale_y),
+                    round(right * scale_x),
+                    round(lower * scale_y),
+                )
+                for left, upper, right, lower in boxes
+            ]
+            width, height = profile.size
+            pixels += width * height
+
+        return Measurement(
+            width,
+            height,
+            boxes[0],
+            boxes[1] if len(boxes) > 1 else None,
+            pixels * PIXEL_SIZES[profile.mode],
+        )
+
+    def _module_runs(self) -> ModuleRuns:
+        """Returns the module runs of the code, finding them once per code
+
+        The most recently used codes are kept, up to `MAX_MODULE_RUNS`.
+        Threads racing on a new code only find its runs twice.
+        """
+
+        key = (type(self), self.code)
+        with _code_runs_lock:
+            runs = _code_runs.get(key)
+            if runs is not None:
+                _code_runs.move_to_end(key)
+                return runs
+
+        runs = self._get_module_runs()
+        with _code_runs_lock:
+            _code_runs[key] = runs
+            while len(_code_runs) > MAX_MODULE_RUNS:
+                _code_runs.popitem(last=False)
+        return runs
+
+    def _get_module_runs(self) -> ModuleRuns:
+        """Finds the bars of the barcode, measured in modules
 
         Returns
         -------
-        A PIL Image with the barcode is returned to the caller.
+        ModuleRuns:
+            The total width of the barcode in modules,
+            and the start and width of every bar in modules
         """
 
-        module_width, bar_height, quiet_zone, font_size, text_padding = (
-            self._get_render_options(
-                module_width=module_width,
-                bar_height=bar_height,
-                quiet_zone=quiet_zone,
-                font_size=font_size,
-                draw_text=draw_text,
-            )
-        )
+        binary_string = self.get_binary_string
+
+        bars = []
+        start = binary_string.find("1")
+        while start != -1:
+            end = binary_string.find("0", start)
+            if end == -1:
+                end = len(binary_string)
+            bars.append((start, end - start))
+            start = binary_string.find("1", end)
+
+        return ModuleRuns(len(binary_string), tuple(bars))
+
+    def _get_bars_image(
+        self, module_width: int, bar_height: int, profile: RenderProfile
+    ) -> Image.Image:
+        """Creates a PIL Image with only the bars of the barcode
+
+        Returns
+        -------
+        A PIL Image as wide as the modules of the barcode and as tall as the bars.
+        """
 
         binary_string = self.get_binary_string
 
         # Create the image for the barcode
         img = Image.new(
-            "RGB",
+            profile.mode,
             (module_width * len(binary_string), bar_height),
-            (255, 255, 255),
+            profile.background,
         )
 
         index = 0
         for digit in binary_string:
-            color = (0, 0, 0) if digit == "1" else (255, 255, 255)
-            column = Image.new("RGB", (module_width, img.height), color)
+            color = profile.foreground if digit == "1" else profile.background
+            column = Image.new(profile.mode, (module_width, img.height), color)
             img.paste(column, (index, 0))
             index += module_width
 
+        return img
+
+    def _draw(
+        self,
+        profile: RenderProfile,
+        options: RenderOptions,
+        runs: Optional[ModuleRuns] = None,
+    ) -> Image.Image:
+        """Draws the image of a profile, from module runs found already if given
+
+        Returns
+        -------
+        A PIL Image the same as :meth:`render` returns.
+        """
+
+        if runs is None:
+            img = self._get_barcode_image(options, profile)
+        else:
+            img = self._get_runs_image(options, profile, runs)
+        if profile.size is not None:
+            resampling = getattr(Image, "Resampling", Image)
+            img = img.resize(profile.size, resampling.NEAREST)
+        return img
+
+    def _get_barcode_image(
+        self, options: RenderOptions, profile: RenderProfile
+    ) -> Image.Image:
+        """Creates a PIL Image from the binary string of the barcode
+
+        Returns
+        -------
+        A PIL Image with the barcode is returned to the caller.
+        """
+
+        if profile.rotation:
+            return self._get_runs_image(options, profile, self._module_runs())
+
+        module_width, bar_height, quiet_zone, font_size, text_padding = options
+
+        img = self._get_bars_image(module_width, bar_height, profile)
+
         base = Image.new(
-            "RGB",
+            profile.mode,
             (img.width + quiet_zone * 2, bar_height + text_padding),
-            (255, 255, 255),
+            profile.background,
         )
 
         # Paste the barcode on the center of the padded base
@@ -294,19 +759,69 @@ class Barcode:
 
         base.paste(img, (quiet_zone, text_padding // 2))
 
-        if not draw_text:
+        if not profile.draw_text:
             return base
 
         draw = ImageDraw.Draw(base)
-        font = self._get_default_font(font_size)
-
-        text_width = draw.textlength(self.code, font)
-        x = base_center.x - text_width // 2
-        y = text_padding // 2 + img.height
+        font = profile.font(font_size)
 
-        draw.text((x, y), self.code, (0, 0, 0), font=font)
+        with profile.font_lock:
+            text_width = draw.textlength(self.code, font)
+            x = base_center.x - text_width // 2
+            y = text_padding // 2 + img.height
+            draw.text((x, y), self.code, profile.foreground, font=font)
         return base
 
+    def _get_runs_image(
+        self, options: RenderOptions, profile: RenderProfile, runs: ModuleRuns
+    ) -> Image.Image:
+        """Draws the barcode from its module runs, straight at its rotation
+
+        Every bar is filled in as a rectangle of the rotated image, so there's
+        no upright image to transpose. Only the text is drawn upright, on a
+        mask as small as the text, and pasted in place rotated.
+
+        Returns
+        -------
+        A PIL Image the same as the upright image rotated by the profile.
+        """
+
+        module_width, bar_height, quiet_zone, font_size, text_padding = options
+        rotation = profile.rotation
+
+        width = runs.width * module_width + quiet_zone * 2
+        height = bar_height + text_padding
+        top = text_padding // 2
+
+        size = (width, height) if rotation in (0, 180) else (height, width)
+        img = Image.new(profile.mode, size, profile.background)
+
+        for start, length in runs.bars:
+            left = quiet_zone + start * module_width
+            box = (left, top, left + length * module_width, top + bar_height)
+            img.paste(profile.foreground, _rotate_box(box, width, height, rotation))
+
+        if not profile.draw_text:
+            return img
+
+        # Pillow draws text without antialiasing in mode 1, and bilevel
+        # glyphs have their own advances, so they're measured the same way
+        font = profile.font(font_size)
+        text_mode = "1" if profile.mode == "1" else "L"
+        with profile.font_lock:
+            length = font.getlength(self.code, mode=text_mode)
+            left, upper, right, lower = font.getbbox(self.code, mode=text_mode)
+            mask = Image.new(text_mode, (right - left, lower - upper))
+            ImageDraw.Draw(mask).text((-left, -upper), self.code, 255, font=font)
+        x = int(width // 2 - length // 2)
+        y = top + bar_height
+
+        box = (x + left, y + upper, x + right, y + lower)
+        if rotation:
+            mask = mask.transpose(TRANSPOSES[rotation])
+        img.paste(profile.foreground, _rotate_box(box, width, height, rotation), mask)
+        return img
+
     def __eq__(self, other: object) -> bool:
         if isinstance(other, self.__class__):
             return self.code == other.code
@@ -320,3 +835,14 @@ class Barcode:
 
     def __repr__(self) -> str:
         return self.__str__()
+
+
+def _reset_locks() -> None:
+    """Replace the lock, which another thread may have held during a fork"""
+
+    global _code_runs_lock
+    _code_runs_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_locks)
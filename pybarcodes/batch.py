@@ -0,0 +1,137 @@
+import os
+import sys
+from collections.abc import Iterable
+from concurrent.futures import Executor, ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, Optional, Union
+
+from PIL import Image
+
+from .barcode import Barcode
+from .profile import RenderProfile
+
+
+def gil_enabled() -> bool:
+    """Whether the running interpreter has the GIL enabled
+
+    Free-threaded builds of CPython 3.13 and later can run without it.
+    """
+
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+def render_many(
+    barcodes: Iterable[Barcode],
+    format: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    **options: Any,
+) -> list[Union[Image.Image, bytes]]:
+    """Render many barcodes on a pool of threads
+
+    The render path keeps its state per call, so barcodes can be rendered from
+    any number of threads at once. With the GIL, the threads overlap while PIL
+    draws and encodes. On free-threaded builds, rendering scales across cores.
+
+    Parameters
+    ----------
+    barcodes: Iterable[Barcode]
+        The barcodes to render
+    format: Optional[str]
+        The image format to encode to, like `to_image_bytes`.
+        When it's not given, the PIL images are returned instead.
+    max_workers: Optional[int]
+        The number of threads. Defaults to the number of CPUs.
+    executor: Optional[concurrent.futures.Executor]
+        An executor to render on instead of a new thread pool
+    options:
+        The render options passed to every barcode
+
+    Returns
+    -------
+    list:
+        The images or encoded bytes, in the order of the barcodes
+    """
+
+    if format is None:
+
+        def render(barcode: Barcode) -> Image.Image:
+            return barcode.render(**options)
+    else:
+
+        def render(barcode: Barcode) -> bytes:
+            return barcode.to_image_bytes(format, **options)
+
+    if executor is not None:
+        return list(executor.map(render, barcodes))
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        return list(pool.map(render, barcodes))
+
+
+def render_variants(
+    barcode: Barcode, specs: Iterable[Union[RenderProfile, dict[str, Any]]]
+) -> list[bytes]:
+    """Render several sizes, modes and formats of one barcode
+
+    The barcode is encoded once, and variants that only differ in their size,
+    format or save arguments share the same drawn image, so its bars and its
+    text are only drawn once. The variants are rendered one group after
+    another, and only the image of the current group is kept in memory.
+
+    Parameters
+    ----------
+    barcode: Barcode
+        The barcode to render
+    specs: Iterable[Union[RenderProfile, dict]]
+        A profile for every variant, or the options to create one from.
+        Variants without a format are encoded as `PNG`.
+
+    Returns
+    -------
+    list[bytes]:
+        The encoded images, in the order of the specs
+
+    Raises
+    ------
+    ValueError
+        Raised when the options of a spec aren't valid
+    RenderLimitError
+        Raised when a variant is over the render limits.
+        Nothing is rendered then.
+    """
+
+    profiles = [
+        spec if isinstance(spec, RenderProfile) else RenderProfile(**spec)
+        for spec in specs
+    ]
+
+    groups: dict[tuple, list[int]] = {}
+    for index, profile in enumerate(profiles):
+        profile.check_limits(barcode._get_measurement(profile, text=False))
+        key = (
+            profile.options(barcode),
+            profile.draw_text,
+            profile.mode,
+            profile.rotation,
+        )
+        groups.setdefault(key, []).append(index)
+
+    resampling = getattr(Image, "Resampling", Image)
+    results: list[bytes] = [b""] * len(profiles)
+    for indexes in groups.values():
+        profile = profiles[indexes[0]]
+        drawn = barcode._get_barcode_image(profile.options(barcode), profile)
+
+        for index in indexes:
+            variant = profiles[index]
+            img = drawn
+            if variant.size is not None:
+                img = drawn.resize(variant.size, resampling.NEAREST)
+
+            obj = BytesIO()
+            img.save(obj, format=variant.format or "PNG", **variant.save_kwargs)
+            results[index] = obj.getvalue()
+
+    return results
@@ -0,0 +1,722 @@
+import hashlib
+import multiprocessing
+import os
+import secrets
+import shutil
+import struct
+import tempfile
+import threading
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import Any, Optional
+
+from .barcode import PathInput
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+# Every cache and block lock alive, so their locks can be replaced after a fork
+_live_caches: "weakref.WeakSet[DiskCache]" = weakref.WeakSet()
+_live_block_locks: "weakref.WeakSet[_BlockLock]" = weakref.WeakSet()
+
+
+class DiskCache:
+    """A content-addressed cache of encoded barcode images on disk
+
+    Entries are stored under the key returned by
+    :meth:`pybarcodes.barcode.Barcode.render_key`, so every process using the
+    same directory shares the same entries, and they survive restarts.
+
+    Files are written to a temporary file and renamed into place, so readers
+    never see a partial entry and never need a lock. Reading an entry updates
+    its modification time, and once the cache grows past `max_size` the
+    least recently used entries are removed.
+
+    Parameters
+    ----------
+    directory: Union[str, PathLike]
+        The directory to keep the entries in. It is created if it doesn't exist.
+    max_size: int
+        The total size of the entries in bytes, before old entries are evicted
+    link: bool
+        Whether `save` hardlinks cached files to their destination instead of
+        copying them. Linked files share their contents with the cache, so
+        they should be replaced rather than modified in place.
+        :meth:`pybarcodes.barcode.Barcode.save` given the cache replaces a
+        linked destination, but a save without it writes through the link.
+    """
+
+    def __init__(
+        self, directory: PathInput, max_size: int = 256 * 1024**2, link: bool = False
+    ):
+        if max_size <= 0:
+            raise ValueError("max_size must be greater than 0.")
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.link = link
+
+        # The size of the cache is only known for sure after a scan,
+        # entries written by other processes are picked up by the next one
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+        _live_caches.add(self)
+
+    def path(self, key: str) -> Path:
+        """Return the path the entry of a key is stored at"""
+
+        return self.directory / key[:2] / key
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached bytes of a key, or None if there aren't any"""
+
+        path = self.path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        self._touch(path)
+        return data
+
+    def put(self, key: str, data: bytes) -> Path:
+        """Store the bytes of a key and return the path of the entry"""
+
+        return self._store(key, len(data), lambda file: file.write(data))
+
+    def put_file(self, key: str, source: PathInput) -> Path:
+        """Store a copy of a file under a key and return the path of the entry"""
+
+        size = os.path.getsize(source)
+
+        def write(file) -> None:
+            with open(source, "rb") as source_file:
+                shutil.copyfileobj(source_file, file)
+
+        return self._store(key, size, write)
+
+    def copy_to(self, key: str, destination: PathInput) -> bool:
+        """Place the entry of a key at the destination given
+
+        The entry is hardlinked when `link` is set and the destination is on the
+        same filesystem, and copied otherwise. An existing destination is replaced.
+
+        Returns
+        -------
+        bool:
+            Whether the key was in the cache
+        """
+
+        path = self.path(key)
+        destination = Path(destination)
+        temporary = _temporary_path(destination)
+        try:
+            linked = False
+            if self.link:
+                try:
+                    os.link(path, temporary)
+                    linked = True
+                except FileNotFoundError:
+                    raise
+                except OSError:
+                    pass
+            if not linked:
+                with open(path, "rb") as source, open(temporary, "xb") as file:
+                    shutil.copyfileobj(source, file)
+            os.replace(temporary, destination)
+        except FileNotFoundError:
+            return False
+        finally:
+            # Renaming a link over another link of the same file does nothing
+            if os.path.lexists(temporary):
+                os.unlink(temporary)
+
+        self._touch(path)
+        return True
+
+    def is_entry_link(self, path: PathInput) -> bool:
+        """Whether a file is a hardlink to an entry of the cache"""
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+        if stat.st_nlink < 2 or stat.st_dev != os.stat(self.directory).st_dev:
+            return False
+
+        for directory in self.directory.iterdir():
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory):
+                if entry.inode() == stat.st_ino and not entry.name.startswith("."):
+                    return True
+        return False
+
+    def size(self) -> int:
+        """Scan the cache and return the total size of the entries in bytes"""
+
+        return sum([size for _, size, _ in self._scan()])
+
+    def evict(self, target: Optional[int] = None) -> int:
+        """Remove the least recently used entries until the cache fits
+
+        Parameters
+        ----------
+        target: Optional[int]
+            The size to shrink the cache to. Defaults to 90% of `max_size`.
+
+        Returns
+        -------
+        int:
+            The number of entries removed
+        """
+
+        if target is None:
+            target = self.max_size * 9 // 10
+
+        with self._lock:
+            return self._evict(target)
+
+    def _evict(self, target: int) -> int:
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        total = sum([size for _, size, _ in entries])
+        removed = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+
+        self._size = total
+        return removed
+
+    def clear(self) -> None:
+        """Remove every entry of the cache"""
+
+        self.evict(target=0)
+
+    def _store(self, key: str, size: int, write) -> Path:
+        path = self.path(key)
+        path.parent.mkdir(exist_ok=True)
+
+        # Created the way open creates files, so the umask applies to entries
+        # and to the destinations they're linked to
+        temporary = _temporary_path(path)
+        try:
+            with open(temporary, "xb") as file:
+                write(file)
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.lexists(temporary):
+                os.unlink(temporary)
+            raise
+
+        with self._lock:
+            if self._size is None:
+                self._size = self.size()
+            else:
+                self._size += size
+
+            if self._size > self.max_size:
+                self._evict(self.max_size * 9 // 10)
+
+        return path
+
+    def _scan(self) -> list[tuple[Path, int, float]]:
+        entries = []
+        for directory in self.directory.iterdir():
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory):
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((Path(entry.path), stat.st_size, stat.st_mtime))
+        return entries
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+
+def _temporary_path(destination: Path) -> Path:
+    """A name next to the destination to write it under before replacing it
+
+    It's random, so threads and processes writing the same destination don't
+    collide, and files are only created under it exclusively.
+    """
+
+    return destination.with_name(f".{destination.name}.{secrets.token_hex(8)}.tmp")
+
+
+def _reset_locks() -> None:
+    """Replace the locks, which another thread may have held during a fork"""
+
+    for cache in list(_live_caches):
+        cache._lock = threading.Lock()
+    # The lock file is opened again, or the flocks of the child would be
+    # the same as the ones of its parent
+    for lock in list(_live_block_locks):
+        lock._lock = threading.Lock()
+        if lock._file is not None:
+            lock._file.close()
+            lock._file = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_locks)
+
+
+# The layout of a shared memory cache:
+# a header, an index of buckets, and an arena of entries that tile it
+SHARED_MAGIC = b"PYBCSHM1"
+SHARED_HEADER = struct.Struct(
+    "<8sIQIQQI20x"
+)  # magic version arena buckets head gen count
+SHARED_BUCKET = struct.Struct("<16sQB7x")  # digest, offset + 1, referenced
+SHARED_ENTRY = struct.Struct("<Q16sIII4x")  # seq, digest, length, capacity, bucket
+SHARED_VERSION = 1
+
+EMPTY = 0
+TOMBSTONE = 2**64 - 1
+NO_BUCKET = 2**32 - 1
+FREE_DIGEST = bytes(16)
+# How many buckets a key can be placed in, from the one its digest points to
+PROBES = 16
+
+# The blocks created by this process or the process it was forked from,
+# which the resource tracker this process shares already knows about
+_created_blocks: set[str] = set()
+
+
+def _digest(key: str) -> bytes:
+    return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+
+class SharedMemoryCache:
+    """A cache of encoded barcode images in shared memory, for the workers of a host
+
+    Entries are stored under the key returned by
+    :meth:`pybarcodes.barcode.Barcode.render_key` in a fixed-size arena, and
+    found through a hash index in the same block of shared memory, so every
+    worker process serves the labels any of them rendered.
+
+    Readers never take a lock. Every entry has a sequence number that is odd
+    while it's written, and a read only returns the bytes it copied out if
+    the number was the same and even before and after. Writers take a lock
+    that's shared with the other processes. Once the arena is full, a clock
+    hand sweeps it: entries read since it last passed get a second chance,
+    and the others are evicted.
+
+    The cache can be passed to child processes, or created in a pre-fork
+    master before its workers fork. Unrelated processes can attach to it by
+    name: the writers lock a file named after the block in the temporary
+    directory, unless they're given a `lock`.
+
+    Parameters
+    ----------
+    name: Optional[str]
+        The name of the shared memory block to attach to. A new block is
+        created when it's not given.
+    size: int
+        The size of the arena in bytes, for a new block
+    buckets: Optional[int]
+        The number of buckets of the index, for a new block. Defaults to one
+        for every 2 KiB of arena. It's rounded up to a power of 2.
+    lock: Optional[multiprocessing.Lock]
+        The lock the writers share, instead of the lock file of the block.
+        Every process attached to the block has to use the same lock.
+
+    Raises
+    ------
+    ValueError
+        Raised when an option isn't valid, the block isn't a cache, or it's
+        attached to by name without a `lock` where files can't be locked
+    """
+
+    def __init__(
+        self,
+        name: Optional[str] = None,
+        size: int = 64 * 1024**2,
+        buckets: Optional[int] = None,
+        lock: Optional[Any] = None,
+    ):
+        if lock is None and name is not None and fcntl is None:  # pragma: no cover
+            raise ValueError("A lock is needed to attach to a cache by name.")
+        # Only the process that created the block removes it, not its forks
+        self._owner = os.getpid() if name is None else None
+
+        if name is None:
+            if size <= SHARED_ENTRY.size * 2:
+                raise ValueError(f"size must be greater than {SHARED_ENTRY.size * 2}.")
+            buckets = max(buckets or size // 2048, PROBES)
+            buckets = 1 << (buckets - 1).bit_length()
+            total = SHARED_HEADER.size + buckets * SHARED_BUCKET.size + size
+            self._memory = shared_memory.SharedMemory(create=True, size=total)
+            _created_blocks.add(self._memory.name)
+            self._buf = self._memory.buf
+            SHARED_HEADER.pack_into(
+                self._buf, 0, SHARED_MAGIC, SHARED_VERSION, size, buckets, 0, 0, 0
+            )
+            self._attach()
+            self._reset()
+        else:
+            self._memory = _attach_shared_memory(name)
+            self._buf = self._memory.buf
+            magic, version = SHARED_HEADER.unpack_from(self._buf)[:2]
+            if magic != SHARED_MAGIC or version != SHARED_VERSION:
+                self._memory.close()
+                raise ValueError(f"{name} isn't a pybarcodes cache.")
+            self._attach()
+
+        if lock is None:
+            if fcntl is None:  # pragma: no cover
+                lock = multiprocessing.Lock()
+            else:
+                lock = _BlockLock(self.name)
+        self.lock = lock
+
+    def _attach(self) -> None:
+        _, _, self.size, buckets, _, _, _ = SHARED_HEADER.unpack_from(self._buf)
+        self._mask = buckets - 1
+        self._index = SHARED_HEADER.size
+        self._arena = self._index + buckets * SHARED_BUCKET.size
+        # Larger entries would evict most of the arena
+        self.max_entry_size = self.size // 4 - SHARED_ENTRY.size
+
+    @property
+    def name(self) -> str:
+        """The name other processes attach to the cache with"""
+
+        return self._memory.name
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {"name": self.name, "lock": self.lock}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        # Child processes share the resource tracker of their parent,
+        # so they attach to the block without unregistering it
+        self.lock = state["lock"]
+        self._owner = None
+        self._memory = shared_memory.SharedMemory(name=state["name"])
+        self._buf = self._memory.buf
+        self._attach()
+
+    def __len__(self) -> int:
+        return SHARED_HEADER.unpack_from(self._buf)[6]
+
+    def __enter__(self) -> "SharedMemoryCache":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached bytes of a key, or None if there aren't any
+
+        The bytes are copied out of shared memory once, which is what makes
+        the read safe without a lock.
+        """
+
+        digest = _digest(key)
+        bucket = self._find(digest)
+        if bucket is None:
+            return None
+
+        _, offset, _ = SHARED_BUCKET.unpack_from(self._buf, bucket)
+        if offset == EMPTY or offset + SHARED_ENTRY.size > self.size + 1:
+            return None
+        position = self._arena + offset - 1
+
+        seq, entry_digest, length, capacity, _ = SHARED_ENTRY.unpack_from(
+            self._buf, position
+        )
+        if seq & 1 or entry_digest != digest or length > capacity:
+            return None
+        start = position + SHARED_ENTRY.size
+        if start + length > self._arena + self.size:
+            return None
+        data = bytes(self._buf[start : start + length])
+
+        if SHARED_ENTRY.unpack_from(self._buf, position)[:2] != (seq, digest):
+            return None
+        # Give the entry a second chance when the clock hand passes it
+        self._buf[bucket + 24] = 1
+        return data
+
+    def put(self, key: str, data: bytes) -> bool:
+        """Store the bytes of a key
+
+        Returns
+        -------
+        bool:
+            Whether the bytes were stored. Entries larger than a quarter of
+            the arena aren't, and neither are keys whose buckets are all taken.
+        """
+
+        length = len(data)
+        if length > self.max_entry_size:
+            return False
+
+        digest = _digest(key)
+        with self.lock:
+            bucket = self._find(digest)
+            if bucket is not None:
+                # Equal keys always have equal bytes
+                self._buf[bucket + 24] = 1
+                return True
+
+            bucket = self._free_bucket(digest)
+            if bucket is None:
+                return False
+
+            start, end = self._allocate(SHARED_ENTRY.size + length)
+            capacity = end - start - SHARED_ENTRY.size
+            if capacity - length >= SHARED_ENTRY.size:
+                # Leave the rest of the region as a free entry
+                capacity = length
+                self._write_free(start + SHARED_ENTRY.size + length, end)
+            self._set_head(start + SHARED_ENTRY.size + capacity)
+
+            position = self._arena + start
+            seq = self._next_seq()
+            number = (bucket - self._index) // SHARED_BUCKET.size
+            SHARED_ENTRY.pack_into(
+                self._buf, position, seq | 1, digest, length, capacity, number
+            )
+            data_start = position + SHARED_ENTRY.size
+            self._buf[data_start : data_start + length] = data
+            SHARED_ENTRY.pack_into(
+                self._buf, position, seq + 2, digest, length, capacity, number
+            )
+            SHARED_BUCKET.pack_into(self._buf, bucket, digest, start + 1, 0)
+            self._add_count(1)
+        return True
+
+    def put_file(self, key: str, source: PathInput) -> bool:
+        """Store the contents of a file under a key"""
+
+        with open(source, "rb") as file:
+            return self.put(key, file.read())
+
+    def copy_to(self, key: str, destination: PathInput) -> bool:
+        """Write the entry of a key to the destination given
+
+        Returns
+        -------
+        bool:
+            Whether the key was in the cache
+        """
+
+        data = self.get(key)
+        if data is None:
+            return False
+
+        temporary = _temporary_path(Path(destination))
+        try:
+            with open(temporary, "xb") as file:
+                file.write(data)
+            os.replace(temporary, destination)
+        except BaseException:
+            if os.path.lexists(temporary):
+                os.unlink(temporary)
+            raise
+        return True
+
+    def clear(self) -> None:
+        """Remove every entry of the cache"""
+
+        with self.lock:
+            self._reset()
+
+    def close(self) -> None:
+        """Detach from the shared memory, and remove it if this cache created it"""
+
+        if self._buf is None:
+            return
+        self._buf.release()
+        self._buf = None
+        self._memory.close()
+        if isinstance(self.lock, _BlockLock):
+            self.lock.close()
+        if self._owner == os.getpid():
+            self._memory.unlink()
+            if isinstance(self.lock, _BlockLock):
+                self.lock.remove()
+
+    def _find(self, digest: bytes) -> Optional[int]:
+        """Return the position of the bucket of a digest, if it has one"""
+
+        first = int.from_bytes(digest[:8], "little")
+        for probe in range(PROBES):
+            bucket = self._index + ((first + probe) & self._mask) * SHARED_BUCKET.size
+            bucket_digest, offset, _ = SHARED_BUCKET.unpack_from(self._buf, bucket)
+            if offset == EMPTY:
+                return None
+            if offset != TOMBSTONE and bucket_digest == digest:
+                return bucket
+        return None
+
+    def _free_bucket(self, digest: bytes) -> Optional[int]:
+        first = int.from_bytes(digest[:8], "little")
+        for probe in range(PROBES):
+            bucket = self._index + ((first + probe) & self._mask) * SHARED_BUCKET.size
+            if SHARED_BUCKET.unpack_from(self._buf, bucket)[1] in (EMPTY, TOMBSTONE):
+                return bucket
+        return None
+
+    def _allocate(self, needed: int) -> tuple[int, int]:
+        """Sweep the clock hand until it has freed `needed` contiguous bytes
+
+        Returns
+        -------
+        tuple[int, int]:
+            The arena offsets the free region starts and ends at
+        """
+
+        start = position = SHARED_HEADER.unpack_from(self._buf)[4]
+        while position - start < needed:
+            if start + needed > self.size:
+                # A region can't wrap around the end of the arena
+                self._write_free(start, position)
+                start = position = 0
+                continue
+
+            seq, _, _, capacity, number = SHARED_ENTRY.unpack_from(
+                self._buf, self._arena + position
+            )
+            end = position + SHARED_ENTRY.size + capacity
+            if number != NO_BUCKET:
+                bucket = self._index + number * SHARED_BUCKET.size
+                if self._buf[bucket + 24]:
+                    # Read since the hand last passed, so it's kept this time
+                    self._buf[bucket + 24] = 0
+                    self._write_free(start, position)
+                    start = position = end
+                    continue
+
+                # Readers that started before this see the sequence change
+                struct.pack_into("<Q", self._buf, self._arena + position, seq | 1)
+                struct.pack_into("<Q", self._buf, bucket + 16, TOMBSTONE)
+                self._add_count(-1)
+            position = end
+
+        return start, position
+
+    def _write_free(self, start: int, end: int) -> None:
+        """Mark the arena between two offsets as one free entry"""
+
+        if end <= start:
+            return
+        capacity = end - start - SHARED_ENTRY.size
+        SHARED_ENTRY.pack_into(
+            self._buf,
+            self._arena + start,
+            self._next_seq(),
+            FREE_DIGEST,
+            0,
+            capacity,
+            NO_BUCKET,
+        )
+
+    def _reset(self) -> None:
+        self._buf[self._index : self._arena] = bytes(self._arena - self._index)
+        self._set_head(0)
+        struct.pack_into("<I", self._buf, 40, 0)
+        self._write_free(0, self.size)
+
+    def _next_seq(self) -> int:
+        generation = struct.unpack_from("<Q", self._buf, 32)[0] + 1
+        struct.pack_into("<Q", self._buf, 32, generation)
+        return generation * 2
+
+    def _set_head(self, head: int) -> None:
+        struct.pack_into("<Q", self._buf, 24, head)
+
+    def _add_count(self, change: int) -> None:
+        count = struct.unpack_from("<I", self._buf, 40)[0]
+        struct.pack_into("<I", self._buf, 40, count + change)
+
+
+class _BlockLock:
+    """Lock a shared memory block across threads and processes, by its name
+
+    The processes take an flock on a file named after the block, so
+    unrelated processes that attach by name share the lock.
+    """
+
+    def __init__(self, name: str):
+        self.path = os.path.join(
+            tempfile.gettempdir(), f"pybarcodes-{name.lstrip('/')}.lock"
+        )
+        self._lock = threading.Lock()
+        self._file = None
+        _live_block_locks.add(self)
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.path = state["path"]
+        self._lock = threading.Lock()
+        self._file = None
+        _live_block_locks.add(self)
+
+    def __enter__(self) -> None:
+        self._lock.acquire()
+        try:
+            if self._file is None:
+                self._file = open(self.path, "ab")
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            self._lock.release()
+            raise
+
+    def __exit__(self, *exc_info: object) -> None:
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._lock.release()
+
+    def close(self) -> None:
+        """Close the lock file, which is opened again on the next lock"""
+
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def remove(self) -> None:
+        """Remove the lock file, once no process can attach to the block"""
+
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach to a block of shared memory without letting this process remove it"""
+
+    if name in _created_blocks:
+        return shared_memory.SharedMemory(name=name)
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        memory = shared_memory.SharedMemory(name=name)
+        # Before Python 3.13, the resource tracker of every process that
+        # attaches removes the block when that process exits
+        resource_tracker.unregister(memory._name, "shared_memory")
+        return memory
@@ -1,11 +1,13 @@
 from collections import namedtuple
 from typing import Optional, Union
 
-from PIL import Image, ImageDraw
+from PIL import Image
 
-from .barcode import Barcode, BarcodeInput
+from .barcode import Barcode, BarcodeInput, ModuleRuns
+from .codings import code128 as CODE128Coding
 from .codings import codex as CODEXCoding
 from .exceptions import IncorrectFormat
+from .profile import RenderProfile
 
 Size = namedtuple("Size", "width height")
 
@@ -16,13 +18,13 @@ class Code(Barcode):
 
         self.checksum = self.code[-1]
 
-        # Calculate the variable width of the barcod
-        # 6 pixels for each character
-        if self.BARCODE_SIZE[0] == -1:
-            self.BARCODE_SIZE = (
-                (len(self.code) * 6 + len(CODEXCoding.GUARD) * 2) * 6,
-                self.BARCODE_SIZE[1],
-            )
+    @property
+    def BARCODE_COLUMN_NUMBER(self) -> int:
+        """How many binary columns the barcode consists of
+
+        It is computed from the code on every access, so rendering never
+        writes any state on the instance.
+        """
 
         column_size = 0
         for char in self.get_binary_string:
@@ -32,8 +34,7 @@ class Code(Barcode):
                 column_size += 3
             column_size += 1
 
-        # Calculate how many character will have to be written
-        self.BARCODE_COLUMN_NUMBER = column_size
+        return column_size
 
     @classmethod
     def validate(cls, barcode: BarcodeInput) -> None:
@@ -124,47 +125,32 @@ class Code(Barcode):
 
         return self._calculate_checksum(barcode)
 
-    def _get_barcode_image(
-        self,
-        module_width: Optional[int] = None,
-        bar_height: Optional[int] = None,
-        quiet_zone: Optional[int] = None,
-        font_size: Optional[int] = None,
-        draw_text: bool = True,
+    def _get_bars_image(
+        self, module_width: int, bar_height: int, profile: RenderProfile
     ) -> Image.Image:
-        """Creates a PIL Image from the binary string of the barcode.
+        """Creates a PIL Image with only the bars of the barcode.
 
         Returns
         -------
-        A PIL Image with the barcode is returned to the caller.
+        A PIL Image as wide as the bars and as tall as the bars.
         """
 
-        module_width, bar_height, quiet_zone, font_size, text_padding = (
-            self._get_render_options(
-                module_width=module_width,
-                bar_height=bar_height,
-                quiet_zone=quiet_zone,
-                font_size=font_size,
-                draw_text=draw_text,
-            )
-        )
-
         # Create the image to write the columns
         img = Image.new(
-            "RGB",
+            profile.mode,
             (module_width * self.BARCODE_COLUMN_NUMBER, bar_height),
-            (255, 255, 255),
+            profile.background,
         )
 
         # This is the spacing we are going to add after each digit
-        space = Image.new("RGB", (module_width, img.height), (255, 255, 255))
+        space = Image.new(profile.mode, (module_width, img.height), profile.background)
 
         # Create a binary string representation of the barcode digits
         binary_string = self.get_binary_string
 
         index = 0
         for digit in binary_string:
-            color = (0, 0, 0)
+            color = profile.foreground
 
             # If the character is a `1`, then we write a bar with ratio 3:1
             # So the bar needs to be 3 times the size of the bar we write in the `0` situation
@@ -174,48 +160,48 @@ class Code(Barcode):
                 column_width = module_width * 3
             elif digit == " ":
                 column_width = module_width * 3
-                color = (255, 255, 255)
+                color = profile.background
             else:
                 column_width = module_width
 
             # First paste the column
-            column = Image.new("RGB", (column_width, img.height), color)
+            column = Image.new(profile.mode, (column_width, img.height), color)
             img.paste(column, (index, 0))
             index += column_width
 
-            if not (color[0] == 255):
+            if digit != " ":
                 # Then paste the spacing
                 img.paste(space, (index, 0))
                 index += space.width
 
         # Crop redundant whitespace after barcode
-        img = img.crop((0, 0, index, img.height))
-
-        base = Image.new(
-            "RGB",
-            (img.width + quiet_zone * 2, bar_height + text_padding),
-            (255, 255, 255),
-        )
-
-        # Paste the barcode on the center of the padded base
-        Point = namedtuple("Point", "x y")
-        base_center = Point(base.width // 2, base.height // 2)
+        return img.crop((0, 0, index, img.height))
 
-        base.paste(img, (quiet_zone, text_padding // 2))
+    def _get_module_runs(self) -> ModuleRuns:
+        """Finds the bars of the barcode, measured in modules
 
-        if not draw_text:
-            return base
+        Wide bars and spaces are 3 modules, and every bar is followed by a
+        single module of spacing, the same way the image is drawn.
 
-        draw = ImageDraw.Draw(base)
-        font = self._get_default_font(font_size)
+        Returns
+        -------
+        ModuleRuns:
+            The total width of the barcode in modules,
+            and the start and width of every bar in modules
+        """
 
-        text_width = draw.textlength(self.code, font)
-        x = base_center.x - text_width // 2
-        y = text_padding // 2 + img.height
+        bars = []
+        index = 0
+        for digit in self.get_binary_string:
+            if digit == " ":
+                index += 3
+                continue
 
-        draw.text((x, y), self.code, (0, 0, 0), font=font)
+            width = 3 if digit == "1" else 1
+            bars.append((index, width))
+            index += width + 1
 
-        return base
+        return ModuleRuns(index, tuple(bars))
 
     def _convert_to_binary(self, string: str) -> str:
         """Renders the string from `get_binary_string` into binary
@@ -271,7 +257,24 @@ class Code(Barcode):
         Returns an integer with the width of the bar
         """
 
-        return self.BARCODE_SIZE[0] // self.BARCODE_COLUMN_NUMBER
+        return self._get_barcode_width() // self.BARCODE_COLUMN_NUMBER
+
+    def _get_barcode_width(self) -> int:
+        """Finds the width of the barcode when the size doesn't specify one
+
+        Returns
+        -------
+        Returns an integer with the width of the barcode
+        """
+
+        width = self.BARCODE_SIZE[0]
+
+        # Calculate the variable width of the barcode
+        # 6 pixels for each character
+        if width == -1:
+            width = (len(self.code) * 6 + len(CODEXCoding.GUARD) * 2) * 6
+
+        return width
 
 
 class CODE39(Code):
@@ -280,7 +283,8 @@ class CODE39(Code):
     Attributes
     ----------
     BARCODE_SIZE: Tuple[int, int]
-        The barcode's size and not the output image's size
+        The barcode's size and not the output image's size.
+        A width of -1 means it's calculated from the number of characters.
     BARCODE_FONT_SIZE: int
         The size of the font under the barcode
     BARCODE_PADDING: Tuple[int, int]
@@ -293,3 +297,191 @@ class CODE39(Code):
 
     def __init__(self, barcode: BarcodeInput):
         super().__init__(barcode)
+
+
+class CODE128(Barcode):
+    """The class to represent Code128 barcodes
+
+    The barcode is encoded with the fewest symbols possible, switching between
+    code sets A, B and C (or shifting for a single character) wherever that
+    makes the symbol shorter. Runs of digits are packed two per symbol in code set C.
+
+    Attributes
+    ----------
+    BARCODE_SIZE: Tuple[int, int]
+        The barcode's size and not the output image's size.
+        The width is variable and depends on the encoded symbols.
+    BARCODE_FONT_SIZE: int
+        The size of the font under the barcode
+    BARCODE_PADDING: Tuple[int, int]
+        The padding around the actual barcode
+    BARCODE_MODULE_WIDTH: int
+        The default width of a single module in pixels
+    """
+
+    BARCODE_SIZE = -1, 240
+    BARCODE_FONT_SIZE = 30
+    BARCODE_PADDING = Size(80, 100)
+    BARCODE_MODULE_WIDTH = 4
+
+    def __init__(self, barcode: BarcodeInput):
+        super().__init__(barcode)
+
+        self.symbols = self._encode(self.code)
+        self.checksum = self._calculate_checksum(self.symbols)
+
+    @classmethod
+    def validate(cls, barcode: BarcodeInput) -> None:
+        code = str(barcode)
+
+        if not code:
+            raise IncorrectFormat(f"{cls.__name__} can't be empty.")
+
+        for char in code:
+            if char not in CODE128Coding.CODE_SET_A and char not in (
+                CODE128Coding.CODE_SET_B
+            ):
+                raise IncorrectFormat(
+                    f"Character {char!r} is not supported by {cls.__name__}"
+                )
+
+    @classmethod
+    def encode(cls, barcode: BarcodeInput) -> list[int]:
+        """Find the shortest sequence of symbols that encodes the barcode
+
+        Parameters
+        ----------
+        barcode: Union[str, int]
+            The barcode to encode
+
+        Returns
+        -------
+        list[int]:
+            The symbol values, starting with the start symbol.
+            The checksum and the stop symbol are not included.
+        """
+
+        return cls._encode(cls.normalize(barcode))
+
+    @classmethod
+    def calculate_checksum(cls, barcode: Union[str, "CODE128"]) -> int:
+        """Calculate the checksum symbol of the barcode
+
+        Parameters
+        ----------
+        barcode: Union[str, "CODE128"]
+            The barcode to calculate the checksum of.
+
+        Returns
+        -------
+        The value of the checksum symbol, between 0 and 102
+
+        Raises
+        ------
+        TypeError
+            Raised when the barcode is not an acceptable type
+        IncorrectFormat
+            Raised when the barcode contains unsupported characters
+        """
+
+        if isinstance(barcode, cls):
+            return barcode.checksum
+        elif not isinstance(barcode, str):
+            raise TypeError(f"Can't accept type {type(barcode)}")
+
+        return cls._calculate_checksum(cls.encode(barcode))
+
+    @property
+    def get_binary_string(self) -> str:
+        """Converts the code to the binary string that it produces.
+
+        Returns
+        -------
+        str:
+            The return string contains 1's and 0's that represent the barcode,
+            including the checksum and the stop symbol.
+        """
+
+        patterns = CODE128Coding.PATTERNS
+        binary_string = "".join([patterns[value] for value in self.symbols])
+        return binary_string + patterns[self.checksum] + CODE128Coding.STOP
+
+    @staticmethod
+    def _calculate_checksum(symbols: list[int]) -> int:
+        return sum([i * value for i, value in enumerate(symbols)], symbols[0]) % 103
+
+    @staticmethod
+    def _encode(code: str) -> list[int]:
+        """Encode a validated code with dynamic programming
+
+        `cost[i][s]` holds the fewest symbols needed to encode `code[i:]` when
+        the symbol at position `i` starts in code set `s`. Every position is
+        visited once, so the encoder runs in linear time.
+        """
+
+        sets = "ABC"
+        set_a, set_b = CODE128Coding.CODE_SET_A, CODE128Coding.CODE_SET_B
+        length = len(code)
+
+        cost = [[0, 0, 0] for _ in range(length + 1)]
+        steps: list[list[tuple[int, int]]] = [[] for _ in range(length)]
+
+        for i in range(length - 1, -1, -1):
+            char = code[i]
+            encodable = (
+                char in set_a,
+                char in set_b,
+                i + 1 < length and char.isdigit() and code[i + 1].isdigit(),
+            )
+            width = (1, 1, 2)
+
+            for current in range(3):
+                # Each choice is the code set the character is written in and
+                # the code set the next character starts in
+                best, choice = length * 4, (current, current)
+                for target in (current, *[t for t in range(3) if t != current]):
+                    if encodable[target]:
+                        total = (
+                            (target != current) + 1 + cost[i + width[target]][target]
+                        )
+                        if total < best:
+                            best, choice = total, (target, target)
+
+                other = 1 - current
+                if current < 2 and encodable[other] and 2 + cost[i + 1][current] < best:
+                    best, choice = 2 + cost[i + 1][current], (other, current)
+
+                cost[i][current] = best
+                steps[i].append(choice)
+
+        current = min((1, 2, 0), key=lambda s: cost[0][s])
+        symbols = [CODE128Coding.START[sets[current]]]
+
+        i = 0
+        while i < length:
+            target, following = steps[i][current]
+            if target != following:
+                symbols.append(CODE128Coding.SHIFT)
+            elif target != current:
+                symbols.append(CODE128Coding.SWITCH[sets[target]])
+
+            if target == 2:
+                symbols.append(int(code[i : i + 2]))
+                i += 2
+            else:
+                symbols.append(CODE128Coding.CODE_SETS[sets[target]][code[i]])
+                i += 1
+
+            current = following
+
+        return symbols
+
+    def _get_column_size(self) -> int:
+        """Returns the default width of each module
+
+        Returns
+        -------
+        Returns an integer with the width of the bar
+        """
+
+        return self.BARCODE_MODULE_WIDTH
@@ -0,0 +1,132 @@
+# Bar and space widths of every Code 128 symbol, indexed by symbol value
+WIDTHS = [
+    "212222",
+    "222122",
+    "222221",
+    "121223",
+    "121322",
+    "131222",
+    "122213",
+    "122312",
+    "132212",
+    "221213",
+    "221312",
+    "231212",
+    "112232",
+    "122132",
+    "122231",
+    "113222",
+    "123122",
+    "123221",
+    "223211",
+    "221132",
+    "221231",
+    "213212",
+    "223112",
+    "312131",
+    "311222",
+    "321122",
+    "321221",
+    "312212",
+    "322112",
+    "322211",
+    "212123",
+    "212321",
+    "232121",
+    "111323",
+    "131123",
+    "131321",
+    "112313",
+    "132113",
+    "132311",
+    "211313",
+    "231113",
+    "231311",
+    "112133",
+    "112331",
+    "132131",
+    "113123",
+    "113321",
+    "133121",
+    "313121",
+    "211331",
+    "231131",
+    "213113",
+    "213311",
+    "213131",
+    "311123",
+    "311321",
+    "331121",
+    "312113",
+    "312311",
+    "332111",
+    "314111",
+    "221411",
+    "431111",
+    "111224",
+    "111422",
+    "121124",
+    "121421",
+    "141122",
+    "141221",
+    "112214",
+    "112412",
+    "122114",
+    "122411",
+    "142112",
+    "142211",
+    "241211",
+    "221114",
+    "413111",
+    "241112",
+    "134111",
+    "111242",
+    "121142",
+    "121241",
+    "114212",
+    "124112",
+    "124211",
+    "411212",
+    "421112",
+    "421211",
+    "212141",
+    "214121",
+    "412121",
+    "111143",
+    "111341",
+    "131141",
+    "114113",
+    "114311",
+    "411113",
+    "411311",
+    "113141",
+    "114131",
+    "311141",
+    "411131",
+    "211412",
+    "211214",
+    "211232",
+]
+STOP_WIDTHS = "2331112"
+
+SHIFT = 98
+CODE_C = 99
+CODE_B = 100
+CODE_A = 101
+START = {"A": 103, "B": 104, "C": 105}
+SWITCH = {"A": CODE_A, "B": CODE_B, "C": CODE_C}
+
+
+def _widths_to_binary(widths: str) -> str:
+    return "".join(("1", "0")[i % 2] * int(width) for i, width in enumerate(widths))
+
+
+# Everything below is compiled once at import
+PATTERNS = [_widths_to_binary(widths) for widths in WIDTHS]
+STOP = _widths_to_binary(STOP_WIDTHS)
+
+# Code set A holds the control characters and the upper case characters,
+# code set B holds every printable character
+CODE_SET_A = {chr(i): i + 64 if i < 32 else i - 32 for i in range(96)}
+CODE_SET_B = {chr(i): i - 32 for i in range(32, 128)}
+CODE_SETS = {"A": CODE_SET_A, "B": CODE_SET_B}
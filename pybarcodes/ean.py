@@ -1,12 +1,86 @@
+import importlib.util
 from collections import namedtuple
-from typing import Union
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+from itertools import islice
+from typing import TYPE_CHECKING, Optional, Union
+
+from PIL import Image
 
 from .barcode import Barcode, BarcodeInput
 from .codings import ean as EANCoding
 from .exceptions import IncorrectFormat
+from .profile import RenderProfile
+
+if TYPE_CHECKING:
+    import numpy
 
 Size = namedtuple("Size", "width height")
 Weights = namedtuple("Weights", "ODD EVEN")
+NumpyTables = namedtuple("NumpyTables", "parities left right guards")
+
+# Turns the characters of a binary string into the bytes 0 and 1
+_MODULES = bytes.maketrans(b"01", b"\x00\x01")
+
+
+@lru_cache(maxsize=16)
+def _range_suffixes(weights: tuple[int, ...], patterns: bool) -> list[list[str]]:
+    """Build the trailing digits of every code in a block, check digit included
+
+    The suffixes are grouped by the residue of the weighted sum of the digits
+    before the block, so a whole block of codes only needs that residue.
+    When `patterns` is set, the suffixes are the binary patterns of the
+    digits instead, which are always in `R` coding.
+    """
+
+    width = len(weights)
+    codings = EANCoding.CODES["R"]
+    residues = []
+    digits = []
+    for value in range(10**width):
+        block = f"{value:0{width}d}"
+        digits.append(block)
+        residues.append(sum([int(d) * w for d, w in zip(block, weights)]))
+
+    suffixes = []
+    for base in range(10):
+        group = []
+        for block, residue in zip(digits, residues):
+            check = str((10 - (base + residue) % 10) % 10)
+            if patterns:
+                pattern = "".join([codings[int(d)] for d in block + check])
+                group.append(pattern + EANCoding.RIGHT_GUARD)
+            else:
+                group.append(block + check)
+        suffixes.append(group)
+
+    return suffixes
+
+
+@lru_cache(maxsize=1)
+def _numpy_tables() -> "NumpyTables":
+    """Build the coding tables as NumPy arrays for `EAN.encode_many`"""
+
+    import numpy
+
+    def modules(pattern: str) -> "numpy.ndarray":
+        return numpy.frombuffer(pattern.encode("ascii"), dtype=numpy.uint8) - ord("0")
+
+    codes = EANCoding.CODES
+    return NumpyTables(
+        # The coding of every digit of the first section, where 0 is `L` and 1 is `G`
+        numpy.array(
+            [[c == "G" for c in EANCoding.STRUCTURE[str(d)]] for d in range(10)],
+            dtype=numpy.uint8,
+        ),
+        numpy.array([[modules(p) for p in codes[c]] for c in ("L", "G")]),
+        numpy.array([modules(p) for p in codes["R"]]),
+        {
+            "left": modules(EANCoding.LEFT_GUARD),
+            "center": modules(EANCoding.CENTER_GUARD),
+            "right": modules(EANCoding.RIGHT_GUARD),
+        },
+    )
 
 
 class EAN(Barcode):
@@ -15,6 +89,9 @@ class EAN(Barcode):
     Shouldn't be used directly and it's subclasses are preferred
     """
 
+    # The prefixes a code has to start with, or none when any code is accepted
+    PREFIXES: tuple[str, ...] = ()
+
     def __init__(self, barcode: BarcodeInput):
         super().__init__(barcode)
 
@@ -53,42 +130,287 @@ class EAN(Barcode):
         This string is used to iterate over, to create the barcode.
         """
 
+        return self._get_binary_string(self.code)
+
+    @classmethod
+    def _get_binary_string(cls, code: str) -> str:
+        return "".join(cls._get_segments(code))
+
+    @classmethod
+    def _get_segments(cls, code: str) -> list[str]:
+        """Split the binary string of a normalized code into its guards and digits
+
+        Returns
+        -------
+        list[str]:
+            The binary pattern of every guard and digit, in order
+        """
+
         # Find the structure of the first section
         # This is determined by the first digit
-        if self.HAS_STRUCTURE:
+        if cls.HAS_STRUCTURE:
             # We find the structure of the first section using the first digit
-            structure = EANCoding.STRUCTURE[self.code[0]]
+            structure = EANCoding.STRUCTURE[code[0]]
 
             # The first digit is removed
-            code = self.code[1:]
+            code = code[1:]
         else:
             # If there is no structure then all digits should be in `L` coding
-            structure = "L" * (self.FIRST_SECTION[1])
+            structure = "L" * (cls.FIRST_SECTION[1])
 
             # In EAN8 barcodes the first digit is accounted for
-            code = self.code
 
-        # Convert the barcode to a binary string with the CodeNumbers class
         # Add the left guard
-        binary_string = EANCoding.LEFT_GUARD
+        segments = [EANCoding.LEFT_GUARD]
 
         # Add the 6 digits after the left guard
-        for i in range(*self.FIRST_SECTION):
+        for i in range(*cls.FIRST_SECTION):
             digit = int(code[i])
             coding = structure[i]
-            binary_string += EANCoding.CODES[coding][digit]
+            segments.append(EANCoding.CODES[coding][digit])
 
         # Add the center guard
-        binary_string += EANCoding.CENTER_GUARD
+        segments.append(EANCoding.CENTER_GUARD)
 
         # Add the 6 digits after the center guard
-        for i in range(*self.SECOND_SECTION):
+        for i in range(*cls.SECOND_SECTION):
             digit = int(code[i])
-            binary_string += EANCoding.CODES["R"][digit]
+            segments.append(EANCoding.CODES["R"][digit])
+
+        segments.append(EANCoding.RIGHT_GUARD)
+
+        return segments
+
+    @classmethod
+    def encode_many(
+        cls, codes: Iterable[BarcodeInput], use_numpy: Optional[bool] = None
+    ) -> Union[memoryview, "numpy.ndarray"]:
+        """Encode many codes to a matrix of their modules
+
+        Parameters
+        ----------
+        codes: Iterable[Union[str, int]]
+            The codes to encode. Their check digits are completed
+            the same way as `normalize`.
+        use_numpy: Optional[bool]
+            Whether to build a NumPy array. By default it's used when NumPy
+            is installed.
+
+        Returns
+        -------
+        Union[numpy.ndarray, memoryview]:
+            An array of shape `(number of codes, modules)` with a 1 for every
+            bar module and a 0 for every space, like `get_binary_string`.
+            Without NumPy, it's a 2-dimensional memoryview over a bytearray,
+            or an empty one when there are no codes.
+
+        Raises
+        ------
+        IncorrectFormat
+            Raised when one of the codes isn't valid
+        """
+
+        length = cls.BARCODE_LENGTH
+        codes = [str(code) for code in codes]
+        for code in codes:
+            cls.validate(code)
+
+        digits = (cls.FIRST_SECTION[1] - cls.FIRST_SECTION[0]) + (
+            cls.SECOND_SECTION[1] - cls.SECOND_SECTION[0]
+        )
+        guards = EANCoding.LEFT_GUARD + EANCoding.CENTER_GUARD + EANCoding.RIGHT_GUARD
+        width = len(guards) + digits * 7
+
+        if use_numpy is None:
+            use_numpy = importlib.util.find_spec("numpy") is not None
+
+        if not use_numpy:
+            codes = [cls.normalize(code) for code in codes]
+            data = "".join([cls._get_binary_string(code) for code in codes])
+            buffer = bytearray(data.encode("ascii").translate(_MODULES))
+            if not codes:
+                # memoryviews can't have a 0 in their shape
+                return memoryview(buffer)
+            return memoryview(buffer).cast("B", (len(codes), width))
+
+        import numpy
+
+        tables = _numpy_tables()
+        data = "".join([code[:length] for code in codes]).encode("ascii")
+        digits = numpy.empty((len(codes), length + 1), dtype=numpy.uint8)
+        digits[:, :length] = numpy.frombuffer(data, dtype=numpy.uint8).reshape(
+            len(codes), length
+        )
+        digits -= ord("0")
+
+        # The check digits of all the codes at once, like `calculate_checksum`
+        weights = [
+            cls.WEIGHTS.ODD if i % 2 else cls.WEIGHTS.EVEN for i in range(length)
+        ]
+        checksums = digits[:, :length] @ numpy.array(weights, dtype=numpy.uint32)
+        digits[:, length] = (10 - checksums % 10) % 10
+
+        if cls.HAS_STRUCTURE:
+            parities = tables.parities[digits[:, 0]]
+            digits = digits[:, 1:]
+        else:
+            parities = numpy.zeros((len(codes), cls.FIRST_SECTION[1]), numpy.uint8)
+
+        left = tables.left[parities, digits[:, slice(*cls.FIRST_SECTION)]]
+        right = tables.right[digits[:, slice(*cls.SECOND_SECTION)]]
+
+        modules = numpy.empty((len(codes), width), dtype=numpy.uint8)
+        start = len(EANCoding.LEFT_GUARD)
+        center = start + left.shape[1] * 7
+        end = center + len(EANCoding.CENTER_GUARD)
+        stop = width - len(EANCoding.RIGHT_GUARD)
+        modules[:, :start] = tables.guards["left"]
+        modules[:, start:center] = left.reshape(len(codes), center - start)
+        modules[:, center:end] = tables.guards["center"]
+        modules[:, end:stop] = right.reshape(len(codes), stop - end)
+        modules[:, stop:] = tables.guards["right"]
+        return modules
+
+    def _get_bars_image(
+        self, module_width: int, bar_height: int, profile: RenderProfile
+    ) -> Image.Image:
+        """Composes the bars from the cached tiles of each guard and digit
+
+        Returns
+        -------
+        A PIL Image as wide as the modules of the barcode and as tall as the bars.
+        """
+
+        atlas = profile.tile_atlas(module_width, bar_height)
+        segments = self._get_segments(self.code)
+
+        width = module_width * sum([len(segment) for segment in segments])
+        img = Image.new(profile.mode, (width, bar_height), profile.background)
+
+        index = 0
+        for segment in segments:
+            tile = atlas.tile(segment)
+            img.paste(tile, (index, 0))
+            index += tile.width
+
+        return img
+
+    @classmethod
+    def range(
+        cls,
+        prefix: BarcodeInput,
+        start: int = 0,
+        stop: Optional[int] = None,
+        patterns: bool = False,
+    ) -> Iterator[str]:
+        """Generate the codes of a prefix followed by a counter
+
+        The counter fills the digits between the prefix and the check digit.
+        Check digits are not recalculated for every code. The weighted sum of
+        the prefix is computed once, and the last digits of the counter come
+        from precomputed tables, so the codes are generated in bulk.
+
+        Parameters
+        ----------
+        prefix: Union[str, int]
+            The digits every code starts with, e.g. the GS1 company prefix
+        start: int
+            The first counter value
+        stop: Optional[int]
+            The counter value to stop before. Defaults to the end of the counter space.
+        patterns: bool
+            Yield the binary strings of the codes, like `get_binary_string`,
+            instead of the normalized codes
+
+        Returns
+        -------
+        An iterator over the normalized codes, or their binary strings
 
-        binary_string += EANCoding.RIGHT_GUARD
+        Raises
+        ------
+        IncorrectFormat
+            Raised when the prefix is not valid for the barcode type
+        ValueError
+            Raised when the counter range doesn't fit after the prefix
+        """
+
+        prefix = str(prefix)
+        width = cls.BARCODE_LENGTH - len(prefix)
+        if width <= 0:
+            raise IncorrectFormat(
+                f"{cls.__name__} prefix should be shorter than "
+                f"{cls.BARCODE_LENGTH} digits, not {len(prefix)}."
+            )
+        cls.validate(prefix + "0" * width)
+
+        capacity = 10**width
+        stop = capacity if stop is None else stop
+        if not 0 <= start <= stop <= capacity:
+            raise ValueError(f"The counter range should be within 0 and {capacity}.")
+
+        return cls._range(prefix, width, start, stop, patterns)
 
-        return binary_string
+    @classmethod
+    def range_chunks(
+        cls,
+        prefix: BarcodeInput,
+        start: int = 0,
+        stop: Optional[int] = None,
+        chunk_size: int = 65536,
+        patterns: bool = False,
+    ) -> Iterator[bytes]:
+        """Generate the codes of `range` in newline-terminated chunks
+
+        Each chunk holds up to `chunk_size` codes and can be written straight
+        to a file opened in binary mode.
+
+        Returns
+        -------
+        An iterator over the chunks, as ASCII bytes
+        """
+
+        chunk_size = cls._positive_int(chunk_size, "chunk_size")
+        codes = cls.range(prefix, start, stop, patterns=patterns)
+        while True:
+            chunk = list(islice(codes, chunk_size))
+            if not chunk:
+                return
+            chunk.append("")
+            yield "\n".join(chunk).encode("ascii")
+
+    @classmethod
+    def _range(
+        cls, prefix: str, width: int, start: int, stop: int, patterns: bool
+    ) -> Iterator[str]:
+        length = cls.BARCODE_LENGTH
+        weights = [
+            cls.WEIGHTS.ODD if i % 2 else cls.WEIGHTS.EVEN for i in range(length)
+        ]
+
+        # The last digits of the counter are taken from a table, as long as
+        # they stay in the `R` coded section of the barcode
+        second_section = cls.SECOND_SECTION[0] + cls.HAS_STRUCTURE
+        block_width = min(width, length - second_section, 4)
+        block = 10**block_width
+        suffixes = _range_suffixes(tuple(weights[length - block_width :]), patterns)
+        suffix_length = (block_width + 1) * 7 + len(EANCoding.RIGHT_GUARD)
+
+        head_width = width - block_width
+        prefix_sum = sum([int(d) * w for d, w in zip(prefix, weights)])
+
+        counter_weights = weights[len(prefix) :]
+        for head_value in range(start // block, -(-stop // block)):
+            counter = f"{head_value:0{head_width}d}" if head_width else ""
+            head = prefix + counter
+            counter_sum = sum([int(d) * w for d, w in zip(counter, counter_weights)])
+            residue = (prefix_sum + counter_sum) % 10
+            if patterns:
+                padded = head + "0" * (block_width + 1)
+                head = cls._get_binary_string(padded)[:-suffix_length]
+
+            first = head_value * block
+            group = suffixes[residue][max(start - first, 0) : min(stop - first, block)]
+            yield from map(head.__add__, group)
 
     @classmethod
     def calculate_checksum(cls, barcode: Union[str, "EAN13", "EAN8", "EAN14"]) -> int:
@@ -268,14 +590,18 @@ class JAN(EAN13, EAN):
         How many binary columns the barcode consists of
     BARCODE_PADDING: Tuple[int, int]
         The padding around the actual barcode
+    PREFIXES: Tuple[str, ...]
+        The country codes a JAN barcode starts with
     """
 
+    PREFIXES = ("45", "49")
+
     @classmethod
     def validate(cls, barcode: BarcodeInput) -> None:
         super().validate(barcode)
 
         code = str(barcode)
-        if code[:2] not in ("45", "49"):
+        if not code.startswith(cls.PREFIXES):
             raise IncorrectFormat(
                 "JAN type barcodes need to start with country code 45 or 49."
             )
@@ -283,7 +609,7 @@ class JAN(EAN13, EAN):
     def __init__(self, barcode: BarcodeInput):
         super().__init__(barcode)
 
-        if self.code[:2] not in ("45", "49"):
+        if not self.code.startswith(self.PREFIXES):
             raise IncorrectFormat(
                 "JAN type barcodes need to start with country code 45 or 49."
             )
@@ -1,2 +1,6 @@
 class IncorrectFormat(Exception):
     """Raised when the user didn't pass the correct format for the barcode they are using"""
+
+
+class RenderLimitError(ValueError):
+    """Raised when a render would be larger than the configured size limits"""
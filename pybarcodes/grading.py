@@ -0,0 +1,413 @@
+"""Grade the print quality of barcode images, in the style of ISO/IEC 15416.
+
+Every image is read along several scanlines. Each scanline is a reflectance
+profile, graded on its symbol contrast, minimum reflectance, minimum edge
+contrast, modulation, defects, decodability and on whether it decodes at all.
+A scanline's grade is the lowest of those, and the grade of the symbol is the
+average of its scanlines.
+
+Reflectance is taken as the gray value of a pixel, from 0 for black to 1 for
+white, so images rendered by the library and grayscale scans are graded the
+same way.
+"""
+
+import re
+from collections import Counter, namedtuple
+from functools import lru_cache
+from typing import Optional
+
+from PIL import Image
+
+from .barcode import Barcode
+from .codes import CODE39
+from .codings import codex as CODEXCoding
+from .codings import ean as EANCoding
+from .ean import EAN, EAN8, EAN13, EAN14, JAN
+from .exceptions import IncorrectFormat
+
+ScanGrade = namedtuple(
+    "ScanGrade",
+    "symbol_contrast min_reflectance max_reflectance edge_contrast modulation "
+    "defects decodability code grade",
+)
+SymbolGrade = namedtuple("SymbolGrade", "grade value code symbology scans")
+
+GRADES = "FDCBA"
+
+# The lowest value of every grade from D to A, or the highest for defects
+SYMBOL_CONTRAST_GRADES = (0.20, 0.40, 0.55, 0.70)
+MODULATION_GRADES = (0.40, 0.50, 0.60, 0.70)
+DEFECTS_GRADES = (0.30, 0.25, 0.20, 0.15)
+DECODABILITY_GRADES = (0.25, 0.37, 0.50, 0.62)
+MIN_EDGE_CONTRAST = 0.15
+
+# The types that can be decoded, tried in this order when none is given
+DECODABLE_TYPES = (JAN, EAN13, EAN8, EAN14, CODE39)
+
+_RUNS = re.compile(rb"\x00+|\x01+")
+
+# The characters of the Code39 patterns. The space wins over `*`,
+# which has the same pattern.
+_CODEX_PATTERNS = {
+    pattern: char for char, pattern in reversed(CODEXCoding.CODES.items())
+}
+_EAN_DIGITS = {
+    pattern: (coding, digit)
+    for coding, patterns in EANCoding.CODES.items()
+    for digit, pattern in enumerate(patterns)
+}
+_EAN_STRUCTURES = {structure: digit for digit, structure in EANCoding.STRUCTURE.items()}
+
+
+def _grade(value: float, thresholds: tuple[float, ...], lower: bool = False) -> int:
+    """Turn a measure into a grade from 0 for F to 4 for A"""
+
+    grade = 0
+    for threshold in thresholds:
+        if (value <= threshold) if lower else (value >= threshold):
+            grade += 1
+    return grade
+
+
+def _ean_elements(barcode_type: type[EAN]) -> int:
+    left = barcode_type.FIRST_SECTION[1] - barcode_type.FIRST_SECTION[0]
+    right = barcode_type.SECOND_SECTION[1] - barcode_type.SECOND_SECTION[0]
+    return 3 + 4 * left + 5 + 4 * right + 3
+
+
+def _modules(widths: list[float], total: int) -> tuple[list[int], float]:
+    """Round the widths of a character to modules, and find the margin
+
+    The margin is 1 when every width is a whole number of modules,
+    and 0 when one of them is halfway between two.
+    """
+
+    scale = total / sum(widths)
+    exact = [width * scale for width in widths]
+    modules = [max(1, round(width)) for width in exact]
+    margin = min(1 - 2 * abs(width - round(width)) for width in exact)
+    return modules, margin
+
+
+def _decode_ean(
+    barcode_type: type[EAN], widths: list[float]
+) -> tuple[Optional[str], float]:
+    if len(widths) != _ean_elements(barcode_type):
+        return None, 0.0
+
+    left = barcode_type.FIRST_SECTION[1] - barcode_type.FIRST_SECTION[0]
+    right = barcode_type.SECOND_SECTION[1] - barcode_type.SECOND_SECTION[0]
+    characters = [widths[3 + 4 * i : 7 + 4 * i] for i in range(left)]
+    start = 3 + 4 * left + 5
+    characters += [widths[start + 4 * i : start + 4 + 4 * i] for i in range(right)]
+
+    digits = []
+    codings = ""
+    decodability = 1.0
+    for index, character in enumerate(characters):
+        modules, margin = _modules(character, 7)
+        decodability = min(decodability, margin)
+        # Left digits start with a space, right digits with a bar
+        colors = "01" if index < left else "10"
+        pattern = "".join(colors[i % 2] * width for i, width in enumerate(modules))
+
+        coding, digit = _EAN_DIGITS.get(pattern, (None, None))
+        if coding is None or (coding == "R") != (index >= left):
+            return None, decodability
+        codings += coding
+        digits.append(str(digit))
+
+    code = "".join(digits)
+    if barcode_type.HAS_STRUCTURE:
+        first = _EAN_STRUCTURES.get(codings[:left])
+        if first is None:
+            return None, decodability
+        code = first + code
+    elif "G" in codings:
+        return None, decodability
+
+    try:
+        valid = barcode_type.normalize(code[:-1]) == code
+    except IncorrectFormat:
+        valid = False
+    return (code if valid else None), decodability
+
+
+def _decode_code39(widths: list[float]) -> tuple[Optional[str], float]:
+    """Decode the narrow and wide bars and spaces of a Code39 barcode
+
+    Bars are 1 or 3 modules wide, and spaces are 1 module, or 4 where
+    the pattern has a wide space.
+    """
+
+    bars, spaces = widths[::2], widths[1::2]
+    if len(bars) < 2 or not spaces:
+        return None, 0.0
+
+    tokens = ""
+    decodability = 1.0
+    thresholds = []
+    for elements in (bars, spaces):
+        narrow, wide = min(elements), max(elements)
+        if wide < narrow * 1.5:
+            return None, 0.0
+        thresholds.append((narrow + wide) / 2)
+        half = (wide - narrow) / 2
+        decodability = min(
+            decodability,
+            *[min(1.0, abs(width - thresholds[-1]) / half) for width in elements],
+        )
+
+    for index, bar in enumerate(bars):
+        tokens += "W" if bar > thresholds[0] else "N"
+        if index < len(spaces) and spaces[index] > thresholds[1]:
+            tokens += "S"
+
+    guard = CODEXCoding.GUARD
+    if not (tokens.startswith(guard) and tokens.endswith(guard)):
+        return None, decodability
+
+    tokens = tokens[len(guard) : -len(guard)]
+    code = ""
+    while tokens:
+        for length in (6, 8):
+            char = _CODEX_PATTERNS.get(tokens[:length])
+            if char is not None:
+                code += char
+                tokens = tokens[length:]
+                break
+        else:
+            return None, decodability
+
+    try:
+        valid = bool(code) and CODE39.normalize(code[:-1]) == code
+    except IncorrectFormat:
+        valid = False
+    return (code if valid else None), decodability
+
+
+def _decode(
+    barcode_types: tuple[type[Barcode], ...], widths: list[float]
+) -> tuple[Optional[str], Optional[type[Barcode]], float]:
+    best = 0.0
+    for barcode_type in barcode_types:
+        if issubclass(barcode_type, EAN):
+            code, decodability = _decode_ean(barcode_type, widths)
+        else:
+            code, decodability = _decode_code39(widths)
+        if code is not None:
+            return code, barcode_type, decodability
+        best = max(best, decodability)
+    return None, None, best
+
+
+def grade_scanline(
+    row: bytes, barcode_types: tuple[type[Barcode], ...] = DECODABLE_TYPES
+) -> tuple[ScanGrade, Optional[type[Barcode]]]:
+    """Grade a single scan reflectance profile
+
+    Parameters
+    ----------
+    row: bytes
+        The gray values of the pixels of the scanline
+    barcode_types: tuple[type[Barcode]]
+        The types to decode the scanline as
+
+    Returns
+    -------
+    tuple:
+        The grades of the scanline, and the type it was decoded as
+    """
+
+    low, high = min(row), max(row)
+    threshold = (low + high) / 2
+    symbol_contrast = (high - low) / 255
+    failed = ScanGrade(
+        symbol_contrast, low / 255, high / 255, 0.0, 0.0, 1.0, 0.0, None, "F"
+    )
+    if high - low < 2:
+        return failed, None
+
+    # Pixels darker than the global threshold are bars
+    binary = row.translate(_binary(int(threshold)))
+    runs = [match.span() for match in _RUNS.finditer(binary)]
+
+    # The light runs at both ends are the quiet zones. A bar that touches
+    # the end of the row starts or ends there.
+    first = binary[0]
+    last = len(runs) - binary[-1]
+    if last - first < 5:
+        return failed, None
+
+    # The reflectance of every element and quiet zone
+    peaks = [
+        max(row[start:end]) if binary[start] else min(row[start:end])
+        for start, end in runs
+    ]
+    edge_contrast = (
+        min([abs(peaks[i] - peaks[i + 1]) for i in range(len(peaks) - 1)]) / 255
+    )
+    modulation = edge_contrast / symbol_contrast
+
+    # Element reflectance non-uniformity, leaving out the pixels of the edges
+    non_uniformity = 0
+    for start, end in runs:
+        if end - start > 2:
+            inner = row[start + 1 : end - 1]
+            non_uniformity = max(non_uniformity, max(inner) - min(inner))
+    defects = non_uniformity / (high - low)
+
+    # The edges are where the profile crosses the threshold between two pixels
+    edges = [] if first else [0.0]
+    for start, _ in runs[1:]:
+        before, after = row[start - 1], row[start]
+        edges.append(start - 0.5 + (before - threshold) / (before - after))
+    if last == len(runs):
+        edges.append(float(len(row)))
+    widths = [end - start for start, end in zip(edges, edges[1:])]
+    code, barcode_type, decodability = _decode(barcode_types, widths)
+
+    grades = (
+        _grade(symbol_contrast, SYMBOL_CONTRAST_GRADES),
+        4 if low <= high / 2 else 0,
+        4 if edge_contrast >= MIN_EDGE_CONTRAST else 0,
+        _grade(modulation, MODULATION_GRADES),
+        _grade(defects, DEFECTS_GRADES, lower=True),
+        _grade(decodability, DECODABILITY_GRADES),
+        4 if code is not None else 0,
+    )
+    scan = ScanGrade(
+        symbol_contrast,
+        low / 255,
+        high / 255,
+        edge_contrast,
+        modulation,
+        defects,
+        decodability,
+        code,
+        GRADES[min(grades)],
+    )
+    return scan, barcode_type
+
+
+@lru_cache(256)
+def _binary(threshold: int) -> bytes:
+    """The table that maps gray values darker than a threshold to 0, and others to 1"""
+
+    return bytes(int(value > threshold) for value in range(256))
+
+
+def _gray(image: Image.Image, box: tuple[int, int, int, int]) -> bytes:
+    """The gray values of the pixels of a box of an image"""
+
+    region = image.crop(box)
+    if region.mode != "L":
+        region = region.convert("L")
+    return region.tobytes()
+
+
+def _find_bars(image: Image.Image) -> tuple[int, int, int, int]:
+    """Find the rows of the bars, from the first bar the middle row crosses
+
+    Text and margins above and below the bars are left out of the box.
+    Without a bar in the middle row, the box is the whole image.
+    """
+
+    width, height = image.size
+    middle = height // 2
+    row = _gray(image, (0, middle, width, middle + 1))
+    threshold = (min(row) + max(row)) // 2
+
+    dark = _binary(threshold)
+    x = row.translate(dark).find(0)
+    if max(row) - min(row) < 2 or x == -1:
+        return 0, 0, width, height
+
+    column = _gray(image, (x, 0, x + 1, height)).translate(dark)
+    top = column.rfind(1, 0, middle) + 1
+    bottom = column.find(1, middle)
+    return 0, top, width, height if bottom == -1 else bottom
+
+
+def grade(
+    image: Image.Image,
+    barcode_type: Optional[type[Barcode]] = None,
+    scanlines: int = 10,
+    box: Optional[tuple[int, int, int, int]] = None,
+) -> SymbolGrade:
+    """Grade the print quality of the barcode in an image
+
+    Scanlines are spread evenly over the middle 80% of the height of the
+    box, the same as the inspection band of ISO/IEC 15416. Scanlines with
+    the same pixels, like every scanline of a rendered barcode, are only
+    graded once.
+
+    Parameters
+    ----------
+    image: PIL.Image.Image
+        A rendered barcode or a scan, in any mode. The barcode should be
+        upright, with its quiet zones inside the box.
+    barcode_type: Optional[type[Barcode]]
+        The type to decode the barcode as. Defaults to trying EAN13, EAN8,
+        EAN14, JAN and CODE39.
+    scanlines: int
+        How many scanlines to grade
+    box: Optional[tuple[int, int, int, int]]
+        The part of the image with the bars and their quiet zones. Defaults
+        to the whole width of the image, and the height of the first bar
+        the middle row of the image crosses.
+
+    Returns
+    -------
+    SymbolGrade:
+        The grade of the symbol, from A to F, and its value from 4 to 0,
+        the code most scanlines decoded and its type, and the grade of
+        every scanline
+
+    Raises
+    ------
+    ValueError
+        Raised when the barcode type can't be decoded
+    """
+
+    if barcode_type is None:
+        barcode_types = DECODABLE_TYPES
+    elif issubclass(barcode_type, (EAN, CODE39)):
+        barcode_types = (barcode_type,)
+    else:
+        raise ValueError(f"{barcode_type.__name__} barcodes can't be graded.")
+    scanlines = Barcode._positive_int(scanlines, "scanlines")
+
+    left, top, right, bottom = box or _find_bars(image)
+    margin = (bottom - top) * 0.1
+    # Nearest neighbour resampling picks the rows at the middle of every
+    # part of the band, all in one pass
+    resampling = getattr(Image, "Resampling", Image)
+    band = image.resize(
+        (right - left, scanlines),
+        resampling.NEAREST,
+        box=(left, top + margin, right, bottom - margin),
+    )
+    if band.mode != "L":
+        band = band.convert("L")
+    pixels = band.tobytes()
+    width = right - left
+
+    graded: dict[bytes, tuple[ScanGrade, Optional[type[Barcode]]]] = {}
+    scans = []
+    types = []
+    for y in range(scanlines):
+        row = pixels[y * width : (y + 1) * width]
+        result = graded.get(row)
+        if result is None:
+            result = graded[row] = grade_scanline(row, barcode_types)
+        scans.append(result[0])
+        types.append(result[1])
+
+    value = sum(GRADES.index(scan.grade) for scan in scans) / len(scans)
+    letter = GRADES[_grade(value, (0.5, 1.5, 2.5, 3.5))]
+
+    decoded = Counter((scan.code, t) for scan, t in zip(scans, types) if scan.code)
+    code, decoded_type = decoded.most_common(1)[0][0] if decoded else (None, None)
+    symbology = decoded_type.__name__ if decoded_type is not None else None
+    return SymbolGrade(letter, value, code, symbology, scans)
@@ -0,0 +1,387 @@
+"""Resumable bulk renders of the codes in a file.
+
+A job renders every line of an input file to an image, in numbered chunks of
+lines. Chunks that are done are appended to a checkpoint file, so a job that
+crashes or is killed picks up where it stopped when it's run again.
+
+Jobs are described by a JSON manifest::
+
+    {
+        "input": "codes.txt",
+        "symbology": "ean13",
+        "output": "labels",
+        "format": "PNG",
+        "chunk_size": 1000,
+        "options": {"module_width": 3, "draw_text": false}
+    }
+
+Run it with ``python -m pybarcodes.jobs manifest.json``.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Any, Optional
+
+from PIL import Image
+
+from .barcode import Barcode, PathInput
+from .exceptions import IncorrectFormat
+from .profile import RenderProfile
+from .registry import get_barcode_type
+
+JobProgress = namedtuple(
+    "JobProgress", "chunks completed labels reused invalid elapsed eta"
+)
+ChunkReport = namedtuple("ChunkReport", "number labels reused invalid")
+
+CHECKPOINT_HEADER = "pybarcodes-job"
+
+
+def _render_chunk(
+    source: PathInput,
+    number: int,
+    start: int,
+    end: int,
+    first_line: int,
+    barcode_type: type[Barcode],
+    directory: str,
+    options: dict[str, Any],
+) -> ChunkReport:
+    """Render the lines between two offsets of the input file
+
+    Images are written to a temporary file and renamed into place, so an
+    image that exists is complete. Images left by an earlier run are kept
+    when they can still be read.
+    """
+
+    profile = RenderProfile(**options)
+    extension = f".{profile.format.lower()}"
+
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".tmp"):
+            os.remove(os.path.join(directory, name))
+
+    with open(source, "rb") as file:
+        file.seek(start)
+        lines = file.read(end - start).split(b"\n")
+
+    labels = reused = invalid = 0
+    for index, line in enumerate(lines, start=first_line):
+        code = line.strip().decode("ascii", "replace")
+        if not code:
+            continue
+
+        path = os.path.join(directory, f"{index:09d}{extension}")
+        if os.path.exists(path):
+            try:
+                with Image.open(path) as image:
+                    image.verify()
+            except Exception:
+                pass
+            else:
+                reused += 1
+                continue
+
+        try:
+            barcode = barcode_type(code)
+            temporary = f"{path}.{os.getpid()}.tmp"
+            barcode.save(temporary, profile=profile)
+        except (IncorrectFormat, ValueError):
+            invalid += 1
+            continue
+
+        os.replace(temporary, path)
+        labels += 1
+
+    return ChunkReport(number, labels, reused, invalid)
+
+
+class RenderJob:
+    """Render every line of a file to an image, and resume after a crash
+
+    Line `n` of the input is rendered to
+    ``<output>/<chunk number>/<n>.<format>``, with both numbers zero-padded.
+    Empty lines are skipped, and codes that aren't valid are counted and
+    skipped too.
+
+    Parameters
+    ----------
+    source: Union[str, PathLike]
+        The input file, with a code on every line
+    barcode_type: Union[str, type[Barcode]]
+        The barcode class, or its name, like `ean13`
+    output: Union[str, PathLike]
+        The directory to write the images to
+    format: str
+        The image format, like `PNG`
+    chunk_size: int
+        How many lines every chunk has
+    options: Optional[dict]
+        The render options, the same as :class:`pybarcodes.profile.RenderProfile`
+    checkpoint: Optional[Union[str, PathLike]]
+        The checkpoint file. Defaults to `checkpoint` in the output directory.
+    max_workers: int
+        How many processes render chunks. A single worker renders in the
+        calling process.
+
+    Raises
+    ------
+    ValueError
+        Raised when an option isn't valid
+    """
+
+    def __init__(
+        self,
+        source: PathInput,
+        barcode_type: Any,
+        output: PathInput,
+        format: str = "PNG",
+        chunk_size: int = 1000,
+        options: Optional[dict[str, Any]] = None,
+        checkpoint: Optional[PathInput] = None,
+        max_workers: int = 1,
+    ):
+        if isinstance(barcode_type, str):
+            barcode_type = get_barcode_type(barcode_type)
+
+        self.source = os.fspath(source)
+        self.barcode_type = barcode_type
+        self.output = os.fspath(output)
+        self.chunk_size = Barcode._positive_int(chunk_size, "chunk_size")
+        self.max_workers = Barcode._positive_int(max_workers, "max_workers")
+        self.options = {**(options or {}), "format": format}
+        self.checkpoint = os.fspath(
+            checkpoint or os.path.join(self.output, "checkpoint")
+        )
+
+        # Check the options once, instead of in every worker
+        self.format = RenderProfile(**self.options).format
+
+    @classmethod
+    def from_manifest(cls, path: PathInput, **kwargs: Any) -> "RenderJob":
+        """Create a job from a JSON manifest
+
+        Relative paths in the manifest are relative to the manifest itself.
+        The keyword arguments override the manifest.
+        """
+
+        with open(path, encoding="utf-8") as file:
+            manifest = json.load(file)
+
+        base = os.path.dirname(os.path.abspath(path))
+        arguments = {
+            "source": os.path.join(base, manifest["input"]),
+            "barcode_type": manifest["symbology"],
+            "output": os.path.join(base, manifest["output"]),
+        }
+        for name in ("format", "chunk_size", "options", "max_workers"):
+            if name in manifest:
+                arguments[name] = manifest[name]
+        if "checkpoint" in manifest:
+            arguments["checkpoint"] = os.path.join(base, manifest["checkpoint"])
+
+        arguments.update(kwargs)
+        return cls(**arguments)
+
+    @property
+    def digest(self) -> str:
+        """A digest of everything that decides the output of the job
+
+        It covers the contents of the input, so a checkpoint isn't reused
+        after the input is edited, even in place to the same size.
+        """
+
+        source = hashlib.blake2b(digest_size=16)
+        with open(self.source, "rb") as file:
+            while block := file.read(1 << 20):
+                source.update(block)
+
+        payload = (
+            os.path.abspath(self.source),
+            source.hexdigest(),
+            self.barcode_type.__name__,
+            self.chunk_size,
+            sorted(self.options.items()),
+        )
+        return hashlib.blake2b(repr(payload).encode(), digest_size=16).hexdigest()
+
+    def chunks(self) -> list[tuple[int, int, int]]:
+        """Find the byte range and the first line of every chunk
+
+        Returns
+        -------
+        list:
+            A `(start, end, first line)` tuple for every chunk
+        """
+
+        chunks = []
+        start = position = line = 0
+        with open(self.source, "rb") as file:
+            for record in file:
+                position += len(record)
+                line += 1
+                if line % self.chunk_size == 0:
+                    chunks.append((start, position, line - self.chunk_size))
+                    start = position
+
+        if position > start:
+            chunks.append((start, position, line - line % self.chunk_size))
+        return chunks
+
+    def completed(self) -> set[int]:
+        """Read the numbers of the chunks that are done from the checkpoint
+
+        Raises
+        ------
+        ValueError
+            Raised when the checkpoint was written by a different job
+        """
+
+        try:
+            with open(self.checkpoint, encoding="ascii") as file:
+                header, *lines = file.read().split("\n")
+        except FileNotFoundError:
+            return set()
+
+        if not lines:
+            # Even the header was cut short
+            return set()
+
+        if header != f"{CHECKPOINT_HEADER} {self.digest}":
+            raise ValueError(
+                f"The checkpoint {self.checkpoint} belongs to a different job."
+            )
+
+        # The last line is empty, or cut short by a crash
+        return {int(line) for line in lines[:-1]}
+
+    def run(
+        self,
+        progress: Optional[Callable[[JobProgress], None]] = None,
+        executor: Optional[Executor] = None,
+    ) -> JobProgress:
+        """Render the chunks that aren't done yet
+
+        Parameters
+        ----------
+        progress: Optional[Callable[[JobProgress], None]]
+            Called after every chunk
+        executor: Optional[concurrent.futures.Executor]
+            An executor to render the chunks on, like a class of a
+            :class:`pybarcodes.scheduler.PriorityScheduler`, in place of the
+            processes of the job. Every chunk is submitted as its own call.
+
+        Returns
+        -------
+        JobProgress:
+            The number of chunks and how many are done, how many images were
+            rendered, kept from an earlier run or skipped as invalid by this
+            run, the seconds it took, and the seconds left, which is 0 at the end
+        """
+
+        started = time.monotonic()
+        chunks = self.chunks()
+        completed = self.completed()
+        pending = [
+            (number, *chunk)
+            for number, chunk in enumerate(chunks)
+            if number not in completed
+        ]
+
+        os.makedirs(self.output, exist_ok=True)
+        checkpoint = open(self.checkpoint, "a+", encoding="ascii")
+        # Drop a line that a crash cut short, before appending to it
+        checkpoint.seek(0)
+        size = checkpoint.read().rfind("\n") + 1
+        checkpoint.truncate(size)
+        if size == 0:
+            checkpoint.write(f"{CHECKPOINT_HEADER} {self.digest}\n")
+
+        totals = [0, 0, 0]
+        done = 0
+        report = JobProgress(len(chunks), len(completed), 0, 0, 0, 0.0, None)
+
+        def record(result: ChunkReport) -> JobProgress:
+            nonlocal done
+            checkpoint.write(f"{result.number}\n")
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+
+            done += 1
+            totals[:] = [total + count for total, count in zip(totals, result[1:])]
+            elapsed = time.monotonic() - started
+            eta = elapsed / done * (len(pending) - done)
+            return JobProgress(
+                len(chunks), len(completed) + done, *totals, elapsed, eta
+            )
+
+        arguments = [
+            (
+                self.source,
+                number,
+                start,
+                end,
+                first_line,
+                self.barcode_type,
+                os.path.join(self.output, f"{number:06d}"),
+                self.options,
+            )
+            for number, start, end, first_line in pending
+        ]
+
+        def submit_all(executor: Executor) -> None:
+            nonlocal report
+            futures = [executor.submit(_render_chunk, *a) for a in arguments]
+            for future in as_completed(futures):
+                report = record(future.result())
+                if progress is not None:
+                    progress(report)
+
+        try:
+            if executor is not None:
+                submit_all(executor)
+            elif self.max_workers > 1 and len(arguments) > 1:
+                with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                    submit_all(pool)
+            else:
+                for chunk in arguments:
+                    report = record(_render_chunk(*chunk))
+                    if progress is not None:
+                        progress(report)
+        finally:
+            checkpoint.close()
+
+        return report._replace(elapsed=time.monotonic() - started, eta=0.0)
+
+
+def _print_progress(progress: JobProgress) -> None:
+    eta = "?" if progress.eta is None else f"{progress.eta:.0f}s"
+    print(
+        f"{progress.completed}/{progress.chunks} chunks, "
+        f"{progress.labels} rendered, {progress.reused} kept, "
+        f"{progress.invalid} invalid, {eta} left",
+        file=sys.stderr,
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run a resumable bulk render.")
+    parser.add_argument("manifest")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    kwargs = {} if args.workers is None else {"max_workers": args.workers}
+    job = RenderJob.from_manifest(args.manifest, **kwargs)
+    _print_progress(job.run(progress=_print_progress))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+"""Measure render latency under concurrent load.
+
+Requests are drawn from a weighted mix of symbologies, code lengths and
+render options, and run through one of three execution paths:
+
+- ``thread``, which renders on a pool of threads
+- ``process``, which renders on a pool of processes
+- ``async``, which requests the images from a :class:`pybarcodes.server.RenderServer`
+  listening on the loopback interface
+
+With a target rate, requests are started on a fixed schedule and their latency
+is measured from the time they were scheduled, so a backlog shows up in the
+percentiles. Without one, every worker starts a new request as soon as its last
+one is done.
+
+Run it with ``python -m pybarcodes.loadtest --mode thread --concurrency 64
+--rate 500 --duration 10 --output report.json``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import string
+import sys
+import threading
+import time
+from collections import namedtuple
+from collections.abc import Callable, Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Optional
+from urllib.parse import quote, urlencode
+
+from .barcode import Barcode
+from .ean import EAN
+from .exceptions import IncorrectFormat
+from .registry import get_barcode_type
+from .server import RenderServer, _percentile
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+LoadCase = namedtuple(
+    "LoadCase",
+    "symbology length options format weight",
+    defaults=(None, None, "PNG", 1),
+)
+
+DEFAULT_MIX = (
+    LoadCase("ean13", weight=4),
+    LoadCase("ean8"),
+    LoadCase("code128", 12, weight=2),
+    LoadCase("code128", 40, {"module_width": 2}),
+    LoadCase("code39", 10, {"draw_text": False}),
+)
+MODES = ("thread", "process", "async")
+
+# How many codes are generated for every case, before the load starts
+CODES_PER_CASE = 256
+
+_ALPHABET = string.digits + string.ascii_uppercase
+
+
+def _generate_codes(case: LoadCase, count: int, rng: random.Random) -> list[str]:
+    barcode_type = get_barcode_type(case.symbology)
+    if issubclass(barcode_type, EAN):
+        codes = []
+        while len(codes) < count:
+            digits = "".join(rng.choices(string.digits, k=barcode_type.BARCODE_LENGTH))
+            try:
+                codes.append(barcode_type.normalize(digits))
+            except IncorrectFormat:
+                # Like a JAN code without its country prefix
+                continue
+        return codes
+
+    length = case.length or 12
+    return ["".join(rng.choices(_ALPHABET, k=length)) for _ in range(count)]
+
+
+def _render(
+    symbology: str, format: str, options: Optional[dict[str, Any]], code: str
+) -> int:
+    barcode = get_barcode_type(symbology)(code)
+    return len(barcode.to_image_buffer(format, **(options or {})))
+
+
+def _request_path(case: LoadCase, code: str) -> str:
+    query = {}
+    for name, value in (case.options or {}).items():
+        if name == "size":
+            value = "x".join(map(str, value))
+        elif name == "draw_text":
+            value = int(value)
+        query[name] = value
+
+    path = f"/{case.symbology}/{quote(code)}.{case.format.lower()}"
+    return f"{path}?{urlencode(query)}" if query else path
+
+
+async def _fetch(
+    connections: asyncio.Queue, address: tuple[str, int], path: str
+) -> int:
+    # A connection that failed is left as None, and opened again on its next use
+    connection = await connections.get()
+    try:
+        if connection is None:
+            connection = await asyncio.open_connection(*address)
+        reader, writer = connection
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        head = await reader.readuntil(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        length = 0
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        body = await reader.readexactly(length)
+    except BaseException:
+        if connection is not None:
+            connection[1].close()
+        connections.put_nowait(None)
+        raise
+    connections.put_nowait(connection)
+
+    status = int(status_line.split()[1])
+    if status != 200:
+        raise ValueError(f"The server answered {status} for {path}.")
+    return len(body)
+
+
+def _process_usage(pid: int) -> Optional[tuple[float, int]]:
+    """The CPU seconds and resident bytes of a process, read from /proc"""
+
+    try:
+        with open(f"/proc/{pid}/stat", encoding="ascii") as file:
+            # The fields after the command name, starting with the state
+            fields = file.read().rpartition(")")[2].split()
+    except OSError:
+        return None
+
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return cpu, int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _usage(children: Iterable[int]) -> tuple[float, int]:
+    """The CPU seconds and resident bytes of this process and its workers"""
+
+    usage = _process_usage(os.getpid())
+    if usage is None:
+        # Without /proc, only the peak RSS of this process is known
+        peak = 0 if resource is None else resource.getrusage(resource.RUSAGE_SELF)[2]
+        return time.process_time(), peak * (1 if sys.platform == "darwin" else 1024)
+
+    cpu, rss = usage
+    for pid in children:
+        usage = _process_usage(pid)
+        if usage is not None:
+            cpu += usage[0]
+            rss += usage[1]
+    return cpu, rss
+
+
+class _Sampler(threading.Thread):
+    """Record the CPU use and RSS of the load test at a fixed interval"""
+
+    def __init__(
+        self,
+        interval: float,
+        completed: Callable[[], int],
+        children: Callable[[], Iterable[int]],
+    ):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.completed = completed
+        self.children = children
+        self.samples: list[dict[str, Any]] = []
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        started = last_time = time.perf_counter()
+        last_cpu = _usage(self.children())[0]
+        while not self._stopped.wait(self.interval):
+            self.sample(started, last_time, last_cpu)
+            last_time, last_cpu = self.samples[-1]["_clock"], self.samples[-1]["_cpu"]
+        self.sample(started, last_time, last_cpu)
+
+        for sample in self.samples:
+            del sample["_clock"], sample["_cpu"]
+
+    def sample(self, started: float, last_time: float, last_cpu: float) -> None:
+        now = time.perf_counter()
+        cpu, rss = _usage(self.children())
+        elapsed = now - last_time
+        self.samples.append(
+            {
+                "time": now - started,
+                "completed": self.completed(),
+                "cpu_percent": 100 * (cpu - last_cpu) / elapsed if elapsed else 0.0,
+                "rss": rss,
+                "_clock": now,
+                "_cpu": cpu,
+            }
+        )
+
+    def stop(self) -> list[dict[str, Any]]:
+        self._stopped.set()
+        self.join()
+        return self.samples
+
+
+def _summary(latencies: list[float]) -> dict[str, float]:
+    latencies = sorted(latencies)
+    return {
+        "p50": _percentile(latencies, 50),
+        "p95": _percentile(latencies, 95),
+        "p99": _percentile(latencies, 99),
+        "max": latencies[-1] if latencies else 0.0,
+        "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+    }
+
+
+def run_load_test(
+    mix: Iterable[LoadCase] = DEFAULT_MIX,
+    mode: str = "thread",
+    concurrency: int = 64,
+    rate: Optional[float] = None,
+    duration: float = 10.0,
+    requests: Optional[int] = None,
+    sample_interval: float = 0.5,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """Render a mix of barcodes under load, and report latency and resource use
+
+    Everything runs on the local machine. The async path starts a render
+    server on a free loopback port, with a render thread for every
+    concurrent request.
+
+    Parameters
+    ----------
+    mix: Iterable[LoadCase]
+        The cases to draw requests from, with their symbology, the length of
+        the codes of variable length symbologies, the render options, the
+        image format and the weight of the case
+    mode: str
+        The execution path, one of `thread`, `process` or `async`
+    concurrency: int
+        How many requests run at once
+    rate: Optional[float]
+        The requests started per second. When it's not given,
+        requests are started as soon as one of the workers is free.
+    duration: float
+        The seconds to start requests for
+    requests: Optional[int]
+        The most requests to start, even when the duration isn't over
+    sample_interval: float
+        The seconds between two samples of the CPU use and the RSS
+    seed: int
+        The seed the codes and the order of the requests are drawn with
+
+    Returns
+    -------
+    dict:
+        A report that can be serialized to JSON. Latencies are in seconds,
+        and the timeline has the CPU use, as a percent of a core, and the RSS
+        in bytes, of this process and its worker processes.
+
+    Raises
+    ------
+    ValueError
+        Raised when an option isn't valid
+    """
+
+    mix = [LoadCase(*case) for case in mix]
+    if not mix:
+        raise ValueError("The mix needs at least one case.")
+    for case in mix:
+        get_barcode_type(case.symbology)
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}, not {mode!r}.")
+    concurrency = Barcode._positive_int(concurrency, "concurrency")
+    if requests is not None:
+        requests = Barcode._positive_int(requests, "requests")
+    for name, value in (("rate", rate), ("duration", duration)):
+        if value is not None and value <= 0:
+            raise ValueError(f"{name} must be greater than 0.")
+
+    rng = random.Random(seed)
+    codes = [_generate_codes(case, CODES_PER_CASE, rng) for case in mix]
+
+    return asyncio.run(
+        _run_load_test(
+            mix,
+            codes,
+            mode,
+            concurrency,
+            rate,
+            duration,
+            requests,
+            sample_interval,
+            rng,
+        )
+    )
+
+
+async def _run_load_test(
+    mix: list[LoadCase],
+    codes: list[list[str]],
+    mode: str,
+    concurrency: int,
+    rate: Optional[float],
+    duration: float,
+    requests: Optional[int],
+    sample_interval: float,
+    rng: random.Random,
+) -> dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    executor: Optional[Executor] = None
+    server: Optional[RenderServer] = None
+    connections: asyncio.Queue = asyncio.Queue()
+
+    if mode == "async":
+        server = RenderServer(port=0, max_workers=concurrency)
+        await server.start()
+        for _ in range(concurrency):
+            connections.put_nowait(await asyncio.open_connection(*server.address))
+
+        def call(case: LoadCase, code: str) -> Any:
+            return _fetch(connections, server.address, _request_path(case, code))
+    else:
+        if mode == "process":
+            executor = ProcessPoolExecutor(max_workers=concurrency)
+        else:
+            executor = ThreadPoolExecutor(max_workers=concurrency)
+
+        def call(case: LoadCase, code: str) -> Any:
+            render = partial(_render, case.symbology, case.format, case.options, code)
+            return loop.run_in_executor(executor, render)
+
+    def children() -> Iterable[int]:
+        return list(getattr(executor, "_processes", None) or ())
+
+    results: list[list[float]] = [[] for _ in mix]
+    errors = [0] * len(mix)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(number: int, code: str, scheduled: float, acquired: bool) -> None:
+        if not acquired:
+            await semaphore.acquire()
+        try:
+            await call(mix[number], code)
+        except Exception:
+            errors[number] += 1
+        else:
+            results[number].append(time.perf_counter() - scheduled)
+        finally:
+            semaphore.release()
+
+    sampler = _Sampler(
+        sample_interval, lambda: sum(map(len, results)) + sum(errors), children
+    )
+    sampler.start()
+
+    weights = [case.weight for case in mix]
+    tasks = []
+    started = time.perf_counter()
+    try:
+        while requests is None or len(tasks) < requests:
+            if rate is None:
+                await semaphore.acquire()
+                scheduled = time.perf_counter()
+                if scheduled - started >= duration:
+                    semaphore.release()
+                    break
+            else:
+                if len(tasks) >= rate * duration:
+                    break
+                scheduled = started + len(tasks) / rate
+                await asyncio.sleep(scheduled - time.perf_counter())
+
+            (number,) = rng.choices(range(len(mix)), weights)
+            code = rng.choice(codes[number])
+            tasks.append(
+                asyncio.create_task(run(number, code, scheduled, rate is None))
+            )
+
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+    finally:
+        timeline = sampler.stop()
+        if server is not None:
+            while not connections.empty():
+                connection = connections.get_nowait()
+                if connection is not None:
+                    connection[1].close()
+                    await connection[1].wait_closed()
+            await server.close()
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    latencies = [latency for case in results for latency in case]
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "rate": rate,
+        "duration": elapsed,
+        "requests": len(tasks),
+        "errors": sum(errors),
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "latency": _summary(latencies),
+        "cases": [
+            {
+                **case._asdict(),
+                "requests": len(results[number]) + errors[number],
+                "errors": errors[number],
+                "latency": _summary(results[number]),
+            }
+            for number, case in enumerate(mix)
+        ],
+        "timeline": timeline,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load test barcode rendering.")
+    parser.add_argument("--mode", choices=MODES, default="thread")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--rate", type=float, default=None)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--requests", type=int, default=None)
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--mix", help="A JSON file with a list of cases, with the fields of LoadCase"
+    )
+    parser.add_argument("--output", help="The file to write the report to")
+    args = parser.parse_args(argv)
+
+    mix = DEFAULT_MIX
+    if args.mix is not None:
+        with open(args.mix, encoding="utf-8") as file:
+            mix = [LoadCase(**case) for case in json.load(file)]
+
+    report = run_load_test(
+        mix,
+        args.mode,
+        args.concurrency,
+        args.rate,
+        args.duration,
+        args.requests,
+        args.interval,
+        args.seed,
+    )
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import zlib
+from collections.abc import Iterable
+from typing import Any, BinaryIO
+
+from .barcode import Barcode
+
+# Page sizes in points
+A4 = (595.28, 841.89)
+LETTER = (612.0, 792.0)
+
+# Courier is one of the standard PDF fonts, so it never has to be embedded.
+# Every character is 600 units wide, which makes centering the text exact.
+FONT_NAME = "Courier"
+FONT_CHARACTER_WIDTH = 0.6
+FONT_ASCENT = 0.8
+
+CATALOG, PAGES, FONT = 1, 2, 3
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+class PDFWriter:
+    """Write barcodes to a PDF document as vector graphics
+
+    Bars are drawn as filled rectangles and the text as a standard PDF font,
+    so labels stay sharp at any zoom and the document stays small. Labels are
+    placed on a grid, and every page is written to the stream as soon as it
+    is full, so only the page being filled is kept in memory.
+
+    Parameters
+    ----------
+    stream: BinaryIO
+        A writable binary file object. It doesn't need to be seekable.
+    page_size: Tuple[float, float]
+        The width and height of the pages in points
+    columns: int
+        The number of labels on each row of a page
+    rows: int
+        The number of label rows on each page
+    margin: float
+        The margin around the grid in points
+    scale: float
+        How many points each pixel of the render options is.
+        The default prints them at 300 dpi. Labels that don't fit their cell
+        are scaled down further.
+    compress: bool
+        Whether to compress the page contents
+    render_options:
+        `module_width`, `bar_height`, `quiet_zone`, `font_size` and `draw_text`,
+        the same as in :meth:`pybarcodes.barcode.Barcode.render`
+    """
+
+    def __init__(
+        self,
+        stream: BinaryIO,
+        page_size: tuple[float, float] = A4,
+        columns: int = 3,
+        rows: int = 8,
+        margin: float = 36.0,
+        scale: float = 72 / 300,
+        compress: bool = True,
+        **render_options: Any,
+    ):
+        self.stream = stream
+        self.page_size = page_size
+        self.columns = Barcode._positive_int(columns, "columns")
+        self.rows = Barcode._positive_int(rows, "rows")
+        self.margin = margin
+        self.scale = scale
+        self.compress = compress
+        self.render_options = render_options
+        self.draw_text = render_options.get("draw_text", True)
+
+        self.pages = 0
+        self._position = 0
+        self._offsets: dict[int, int] = {}
+        self._kids: list[int] = []
+        self._next_object = FONT + 1
+        self._labels: list[str] = []
+        self._closed = False
+
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._write_object(CATALOG, f"<< /Type /Catalog /Pages {PAGES} 0 R >>")
+        self._write_object(
+            FONT, f"<< /Type /Font /Subtype /Type1 /BaseFont /{FONT_NAME} >>"
+        )
+
+    def __enter__(self) -> "PDFWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def add(self, barcode: Barcode) -> None:
+        """Place a barcode on the next free cell of the grid
+
+        Parameters
+        ----------
+        barcode: Barcode
+            The barcode to draw
+
+        Raises
+        ------
+        ValueError
+            Raised when the writer is already closed
+        """
+
+        if self._closed:
+            raise ValueError("The PDF document is already closed.")
+
+        if len(self._labels) == self.columns * self.rows:
+            self._write_page()
+
+        cell = len(self._labels)
+        column, row = cell % self.columns, cell // self.columns
+
+        page_width, page_height = self.page_size
+        cell_width = (page_width - 2 * self.margin) / self.columns
+        cell_height = (page_height - 2 * self.margin) / self.rows
+
+        width, height, content = self._draw(barcode)
+        fit = min(self.scale, cell_width / width, cell_height / height)
+        x = self.margin + column * cell_width + (cell_width - width * fit) / 2
+        y = (
+            page_height
+            - self.margin
+            - (row + 1) * cell_height
+            + (cell_height - height * fit) / 2
+        )
+
+        self._labels.append(
+            f"q {fit:.5f} 0 0 {fit:.5f} {x:.2f} {y:.2f} cm\n{content}Q\n"
+        )
+
+    def close(self) -> None:
+        """Write the last page and the document trailer
+
+        The stream itself is left open.
+        """
+
+        if self._closed:
+            return
+
+        if self._labels or not self._kids:
+            self._write_page()
+
+        kids = " ".join([f"{kid} 0 R" for kid in self._kids])
+        self._write_object(
+            PAGES, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._kids)} >>"
+        )
+
+        xref_position = self._position
+        size = self._next_object
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        lines += [
+            f"{self._offsets[number]:010d} 00000 n \n" for number in range(1, size)
+        ]
+        lines.append(
+            f"trailer\n<< /Size {size} /Root {CATALOG} 0 R >>\n"
+            f"startxref\n{xref_position}\n%%EOF\n"
+        )
+        self._write("".join(lines).encode("ascii"))
+        self._closed = True
+
+    def _draw(self, barcode: Barcode) -> tuple[int, int, str]:
+        module_width, bar_height, quiet_zone, font_size, text_padding = (
+            barcode._get_render_options(**self.render_options)
+        )
+        runs = barcode._module_runs()
+
+        width = runs.width * module_width + quiet_zone * 2
+        height = bar_height + text_padding
+
+        # PDF coordinates start from the bottom left corner
+        bottom = height - text_padding // 2 - bar_height
+        operations = [
+            f"{quiet_zone + start * module_width} {bottom} "
+            f"{size * module_width} {bar_height} re\n"
+            for start, size in runs.bars
+        ]
+        operations.append("f\n")
+
+        if self.draw_text:
+            text_width = len(barcode.code) * FONT_CHARACTER_WIDTH * font_size
+            x = (width - text_width) / 2
+            y = bottom - font_size * FONT_ASCENT
+            operations.append(
+                f"BT /F1 {font_size} Tf {x:.2f} {y:.2f} Td "
+                f"({_escape(barcode.code)}) Tj ET\n"
+            )
+
+        return width, height, "".join(operations)
+
+    def _write_page(self) -> None:
+        content = "".join(self._labels).encode("latin-1")
+        self._labels = []
+
+        stream_filter = ""
+        if self.compress:
+            content = zlib.compress(content)
+            stream_filter = " /Filter /FlateDecode"
+
+        contents = self._reserve()
+        self._write_object(
+            contents,
+            f"<< /Length {len(content)}{stream_filter} >>\nstream\n",
+            content + b"\nendstream",
+        )
+
+        page = self._reserve()
+        width, height = self.page_size
+        self._write_object(
+            page,
+            f"<< /Type /Page /Parent {PAGES} 0 R /MediaBox [0 0 {width} {height}] "
+            f"/Resources << /Font << /F1 {FONT} 0 R >> >> /Contents {contents} 0 R >>",
+        )
+        self._kids.append(page)
+        self.pages += 1
+
+    def _reserve(self) -> int:
+        number = self._next_object
+        self._next_object += 1
+        return number
+
+    def _write_object(self, number: int, body: str, data: bytes = b"") -> None:
+        self._offsets[number] = self._position
+        header = f"{number} 0 obj\n{body}".encode("latin-1")
+        self._write(header + data + b"\nendobj\n")
+
+    def _write(self, data: bytes) -> None:
+        self.stream.write(data)
+        self._position += len(data)
+
+
+def write_pdf(barcodes: Iterable[Barcode], stream: BinaryIO, **kwargs: Any) -> int:
+    """Write barcodes to a PDF document and return the number of pages
+
+    The keyword arguments are the same as :class:`PDFWriter`.
+    """
+
+    with PDFWriter(stream, **kwargs) as writer:
+        for barcode in barcodes:
+            writer.add(barcode)
+    return writer.pages
@@ -0,0 +1,271 @@
+import queue
+import threading
+from collections import namedtuple
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from io import BytesIO
+from typing import Any, Optional
+
+from PIL import Image
+
+from .barcode import Barcode, BarcodeInput
+from .profile import RenderProfile, get_render_profile
+
+Stage = namedtuple("Stage", "function workers processes", defaults=(1, False))
+EncodedBarcode = namedtuple("EncodedBarcode", "barcode options runs")
+
+# How long blocked workers wait before checking whether the pipeline stopped
+POLL_INTERVAL = 0.05
+
+_DONE = object()
+
+
+class _Failure:
+    """An exception raised for an item, passed on to be raised in order"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _put(outbox: queue.Queue, entry: Any, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            outbox.put(entry, timeout=POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(inbox: queue.Queue, stop: threading.Event) -> Any:
+    while not stop.is_set():
+        try:
+            return inbox.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def pipeline(
+    items: Iterable[Any], stages: Iterable[Stage], queue_size: int = 16
+) -> Iterator[Any]:
+    """Run items through stages of workers, and yield the results in order
+
+    Every stage has its own workers, connected to the next stage by a bounded
+    queue, so all the stages are busy at once. When a stage falls behind, the
+    queues before it fill up and the stages before it wait, and no more than
+    a bounded number of items is ever in flight.
+
+    Parameters
+    ----------
+    items: Iterable
+        The inputs of the first stage. They're read lazily.
+    stages: Iterable[Stage]
+        The function, the number of workers and whether the workers are
+        processes, for every stage. Each function takes the result of the
+        stage before. Process stages need functions that can be pickled.
+    queue_size: int
+        The size of every queue between two stages
+
+    Yields
+    ------
+    The results of the last stage, in the order of the items.
+    An exception raised for an item is raised when its turn comes.
+    """
+
+    stages = list(stages)
+    queue_size = Barcode._positive_int(queue_size, "queue_size")
+    for stage in stages:
+        Barcode._positive_int(stage.workers, "workers")
+
+    return _pipeline(items, stages, queue_size)
+
+
+def _pipeline(
+    items: Iterable[Any], stages: list[Stage], queue_size: int
+) -> Iterator[Any]:
+    stop = threading.Event()
+    queues = [queue.Queue(queue_size) for _ in range(len(stages) + 1)]
+    in_flight = threading.Semaphore(queue_size * (len(stages) + 1))
+    executors: list[Executor] = []
+    threads = []
+
+    def feed() -> None:
+        index = 0
+        try:
+            for item in items:
+                while not in_flight.acquire(timeout=POLL_INTERVAL):
+                    if stop.is_set():
+                        return
+                if not _put(queues[0], (index, item), stop):
+                    return
+                index += 1
+        except BaseException as error:
+            # Raised after the results of the items read before it
+            _put(queues[0], (index, _Failure(error)), stop)
+        for _ in range(stages[0].workers if stages else 1):
+            _put(queues[0], _DONE, stop)
+
+    def work(number: int, run: Callable[[Any], Any], finished: list[int]) -> None:
+        inbox, outbox = queues[number], queues[number + 1]
+        while True:
+            entry = _get(inbox, stop)
+            if entry is _DONE:
+                break
+            index, item = entry
+            if not isinstance(item, _Failure):
+                try:
+                    item = run(item)
+                except BaseException as error:
+                    item = _Failure(error)
+            if not _put(outbox, (index, item), stop):
+                return
+
+        # The last worker of a stage tells the workers of the next one
+        with lock:
+            finished[0] += 1
+            last = finished[0] == stages[number].workers
+        if last:
+            following = stages[number + 1].workers if number + 1 < len(stages) else 1
+            for _ in range(following):
+                _put(outbox, _DONE, stop)
+
+    lock = threading.Lock()
+    threads.append(threading.Thread(target=feed, daemon=True))
+    for number, stage in enumerate(stages):
+        run = stage.function
+        if stage.processes:
+            executor = ProcessPoolExecutor(max_workers=stage.workers)
+            executors.append(executor)
+
+            def run(item: Any, function=stage.function, executor=executor) -> Any:
+                return executor.submit(function, item).result()
+
+        finished = [0]
+        for _ in range(stage.workers):
+            threads.append(
+                threading.Thread(target=work, args=(number, run, finished), daemon=True)
+            )
+
+    for thread in threads:
+        thread.start()
+
+    if not stages:
+        queues[-1] = queues[0]
+
+    pending: dict[int, Any] = {}
+    next_index = 0
+    try:
+        while True:
+            entry = _get(queues[-1], stop)
+            if entry is _DONE:
+                break
+            index, item = entry
+            pending[index] = item
+            while next_index in pending:
+                item = pending.pop(next_index)
+                next_index += 1
+                in_flight.release()
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        for executor in executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _encode(
+    barcode_type: type[Barcode], options: dict[str, Any], code: BarcodeInput
+) -> EncodedBarcode:
+    """Validate a code, find its bars, and check it's within the render limits"""
+
+    barcode = barcode_type(code)
+    profile = get_render_profile(**options)
+    profile.check_limits(barcode._get_measurement(profile, text=False))
+    return EncodedBarcode(barcode, profile.options(barcode), barcode._module_runs())
+
+
+def _rasterize(profile: RenderProfile, encoded: EncodedBarcode) -> Image.Image:
+    # Drawn from the bars the encoding stage found, which may be in another process
+    return encoded.barcode._draw(profile, encoded.options, encoded.runs)
+
+
+def _compress(format: str, save_kwargs: dict[str, Any], image: Image.Image) -> bytes:
+    obj = BytesIO()
+    image.save(obj, format=format, **save_kwargs)
+    return obj.getvalue()
+
+
+def render_pipeline(
+    codes: Iterable[BarcodeInput],
+    barcode_type: type[Barcode],
+    format: str = "PNG",
+    encode_workers: int = 1,
+    encode_processes: bool = False,
+    rasterize_workers: int = 2,
+    compress_workers: int = 2,
+    queue_size: int = 16,
+    save_kwargs: Optional[dict[str, Any]] = None,
+    **options: Any,
+) -> Iterator[bytes]:
+    """Render codes to encoded images with a pipeline of stages
+
+    Codes go through three stages, each with its own workers:
+
+    - encoding, which validates the code, finds its bars and checks the
+      render limits. It's pure Python, so it can run on processes to use
+      more cores.
+    - rasterizing, which draws the image from those bars on threads
+    - compressing, which encodes the image to the format on threads.
+      PIL releases the GIL while it compresses.
+
+    Parameters
+    ----------
+    codes: Iterable[Union[str, int]]
+        The codes to render. They're read lazily.
+    barcode_type: type[Barcode]
+        The barcode class of the codes
+    format: str
+        The image format, like `PNG`
+    encode_workers: int
+        How many workers encode codes
+    encode_processes: bool
+        Whether the encoding workers are processes instead of threads
+    rasterize_workers: int
+        How many threads rasterize images
+    compress_workers: int
+        How many threads compress images
+    queue_size: int
+        The size of every queue between two stages
+    save_kwargs: Optional[dict]
+        Extra arguments passed to `PIL.Image.Image.save`
+    options:
+        The render options, the same as :meth:`pybarcodes.barcode.Barcode.render`
+
+    Yields
+    ------
+    bytes:
+        The encoded images, in the order of the codes
+
+    Raises
+    ------
+    IncorrectFormat
+        Raised when a code isn't valid, once its turn comes
+    """
+
+    if "size" in options and options["size"] is not None:
+        options["size"] = tuple(options["size"])
+    profile = get_render_profile(**options)
+
+    stages = [
+        Stage(
+            partial(_encode, barcode_type, options), encode_workers, encode_processes
+        ),
+        Stage(partial(_rasterize, profile), rasterize_workers),
+        Stage(partial(_compress, format, save_kwargs or {}), compress_workers),
+    ]
+    return pipeline(codes, stages, queue_size=queue_size)
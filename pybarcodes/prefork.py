@@ -0,0 +1,156 @@
+"""Warm up the render path before a pre-fork server forks its workers.
+
+Call :func:`warmup` in the master process, after the application is loaded
+and before the workers are forked::
+
+    import pybarcodes
+
+    pybarcodes.warmup(profiles=[{"module_width": 3, "draw_text": False}])
+
+Everything it loads is shared by the workers copy-on-write, instead of being
+loaded again by every worker on its first request. Pass
+``range_tables=True`` as well when the workers generate codes in bulk.
+"""
+
+import gc
+import importlib.util
+from collections.abc import Iterable
+from typing import Any, Optional, Union
+
+from PIL import Image
+
+from .barcode import Barcode
+from .codings import ean as EANCoding
+from .ean import EAN, _numpy_tables
+from .profile import RenderProfile, get_render_profile
+from .registry import BARCODE_TYPES
+
+# A valid code of every barcode type, to render once
+SAMPLE_CODES = {
+    "EAN13": "400638133393",
+    "EAN8": "9638507",
+    "EAN14": "1400638133393",
+    "JAN": "490123456789",
+    "CODE39": "WARMUP",
+    "CODE128": "Warmup 0123",
+}
+
+# The keyword arguments the shared profiles of keyword renders are keyed by
+_SHARED_OPTIONS = (
+    "size",
+    "module_width",
+    "bar_height",
+    "quiet_zone",
+    "font_size",
+    "draw_text",
+    "mode",
+    "rotation",
+)
+
+
+def _get_profile(spec: Union[RenderProfile, dict[str, Any]]) -> RenderProfile:
+    if isinstance(spec, RenderProfile):
+        return spec
+
+    if set(spec) <= set(_SHARED_OPTIONS):
+        # Warm the same profile keyword renders with these options use
+        spec = dict(spec)
+        if spec.get("size") is not None:
+            spec["size"] = tuple(spec["size"])
+        return get_render_profile(**spec)
+    return RenderProfile(**spec)
+
+
+def _sample(barcode_type: type[Barcode]) -> Barcode:
+    """Create a barcode of a type, or of a subclass of a registered type"""
+
+    for cls in barcode_type.__mro__:
+        if cls.__name__ in SAMPLE_CODES:
+            return barcode_type(SAMPLE_CODES[cls.__name__])
+    raise ValueError(f"There's no sample code for {barcode_type.__name__}.")
+
+
+def _build_tiles(profile: RenderProfile, barcode: EAN) -> int:
+    """Build the tile of every guard and digit of an EAN barcode"""
+
+    options = profile.options(barcode)
+    atlas = profile.tile_atlas(options.module_width, options.bar_height)
+    patterns = [EANCoding.LEFT_GUARD, EANCoding.CENTER_GUARD, EANCoding.RIGHT_GUARD]
+    for codes in EANCoding.CODES.values():
+        patterns += codes
+    for pattern in patterns:
+        atlas.tile(pattern)
+    return len(atlas)
+
+
+def warmup(
+    profiles: Optional[Iterable[Union[RenderProfile, dict[str, Any]]]] = None,
+    barcode_types: Optional[Iterable[type[Barcode]]] = None,
+    freeze: bool = True,
+    range_tables: bool = False,
+) -> list[RenderProfile]:
+    """Load everything the first render of every profile would
+
+    It loads every PIL image plugin. For every profile, it loads the fonts,
+    builds the tiles of every EAN guard and digit, and renders and encodes
+    a sample of every barcode type. The tables of the range generators,
+    which take about 11 MB for EAN, are only built when asked for.
+
+    The tiles and fonts are kept on the profiles and never modified, so
+    workers read them without copying their pages. The locks of the caches
+    are replaced in every forked child, since a thread of the parent may have
+    held them while it forked.
+
+    Parameters
+    ----------
+    profiles: Optional[Iterable[Union[RenderProfile, dict]]]
+        The profiles the workers render with, or their options. Options that
+        can be passed to `render` warm the profile shared by renders with
+        those keyword arguments. Defaults to the default options.
+    barcode_types: Optional[Iterable[type[Barcode]]]
+        The barcode types to warm up. Defaults to every registered type.
+    freeze: bool
+        Whether to move every object to the permanent generation with
+        `gc.freeze`, so the garbage collector of the workers doesn't
+        write to the pages they share with the master
+    range_tables: bool
+        Whether to build the tables of `EAN.range` and `EAN.encode_many`,
+        for workers that generate codes in bulk
+
+    Returns
+    -------
+    list[RenderProfile]:
+        The profiles that were warmed up
+
+    Raises
+    ------
+    ValueError
+        Raised when a profile isn't valid, or a barcode type isn't
+        a registered type or a subclass of one
+    """
+
+    Image.init()
+
+    profiles = [_get_profile(spec) for spec in (profiles or [{}])]
+    if barcode_types is None:
+        barcode_types = BARCODE_TYPES.values()
+    barcodes = [_sample(cls) for cls in barcode_types]
+
+    if range_tables:
+        for barcode in barcodes:
+            if isinstance(barcode, EAN):
+                next(type(barcode).range(barcode.code[:3]))
+        if importlib.util.find_spec("numpy") is not None:
+            _numpy_tables()
+
+    for profile in profiles:
+        for barcode in barcodes:
+            if isinstance(barcode, EAN):
+                _build_tiles(profile, barcode)
+            barcode.to_image_bytes(profile=profile)
+
+    if freeze:
+        gc.collect()
+        gc.freeze()
+
+    return profiles
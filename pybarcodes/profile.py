@@ -0,0 +1,316 @@
+import os
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Optional
+
+from PIL import Image, ImageColor, ImageFont
+
+from .exceptions import RenderLimitError
+from .tiles import TileAtlas, get_tile_atlas
+
+if TYPE_CHECKING:
+    from .barcode import Barcode, Measurement, RenderOptions, RenderSize
+
+# The image modes barcodes can be drawn in, and how many bytes Pillow
+# keeps for each of their pixels. RGB pixels are padded to 4 bytes.
+PIXEL_SIZES = {"1": 1, "L": 1, "RGB": 4}
+MODES = tuple(PIXEL_SIZES)
+
+# The angles barcodes can be drawn at, counterclockwise in degrees
+ROTATIONS = (0, 90, 180, 270)
+
+# The default limits of every render. None turns a limit off, and both are
+# off unless they're set here or on a profile.
+MAX_DIMENSION: Optional[int] = None
+MAX_RASTER_BYTES: Optional[int] = None
+
+# Stands for the module default of a limit on a profile, since None turns it off
+_DEFAULT_LIMIT: Any = object()
+
+
+def _positive_int(value: int, name: str) -> int:
+    value = int(value)
+    if value <= 0:
+        raise ValueError(f"{name} must be greater than 0.")
+    return value
+
+
+def check_limits(
+    measurement: "Measurement",
+    max_dimension: Optional[int],
+    max_raster_bytes: Optional[int],
+) -> None:
+    """Check a measured render against size limits, None turns a limit off
+
+    Raises
+    ------
+    RenderLimitError
+        Raised when the image is too large, or would take too much memory
+    """
+
+    if max_dimension is not None and max(measurement[:2]) > max_dimension:
+        raise RenderLimitError(
+            f"The image would be {measurement.width}x{measurement.height} "
+            f"pixels, over the limit of {max_dimension}."
+        )
+
+    if max_raster_bytes is not None and measurement.raster_bytes > max_raster_bytes:
+        raise RenderLimitError(
+            f"Rendering would take {measurement.raster_bytes} bytes, "
+            f"over the limit of {max_raster_bytes}."
+        )
+
+
+# The fonts are shared by every thread, and a FreeType face can't be used by
+# two at once, so text is measured and drawn holding this lock
+_font_lock = threading.Lock()
+
+
+@lru_cache(maxsize=16)
+def _load_font(font_size: int) -> ImageFont.ImageFont:
+    try:
+        return ImageFont.load_default(size=font_size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+class RenderProfile:
+    """A set of render options that is checked once and reused
+
+    Creating a profile validates every option up front. The options resolved
+    for each barcode type, the fonts and the bar tiles are then kept on the
+    profile, so rendering many labels with the same geometry skips that work.
+
+    A profile is passed to :meth:`pybarcodes.barcode.Barcode.render`,
+    :meth:`~pybarcodes.barcode.Barcode.save` or
+    :meth:`~pybarcodes.barcode.Barcode.to_image_bytes` in place of the
+    render options, and can be shared by threads.
+
+    Parameters
+    ----------
+    size: Optional[Tuple[int, int]]
+        The size to resize the rendered image to
+    module_width: Optional[int]
+        The width of a single module in pixels
+    bar_height: Optional[int]
+        The height of the bars in pixels
+    quiet_zone: Optional[int]
+        The blank space on the left and right of the bars in pixels
+    font_size: Optional[int]
+        The size of the font under the barcode
+    draw_text: bool
+        Whether to draw the code under the bars
+    mode: str
+        The image mode, one of `1`, `L` or `RGB`
+    rotation: int
+        The angle to draw the barcode at, counterclockwise in degrees.
+        One of 0, 90, 180 or 270. The size is the size of the rotated image.
+    format: Optional[str]
+        The image format used when saving, like `PNG`.
+        When it's not given, it's taken from the file extension,
+        or `PNG` for bytes.
+    max_dimension: Optional[int]
+        The largest width or height of the image in pixels, or None for no
+        limit. `MAX_DIMENSION` is used when it's not given.
+    max_raster_bytes: Optional[int]
+        The most memory the images of a render may take, or None for no
+        limit. `MAX_RASTER_BYTES` is used when it's not given.
+    save_kwargs:
+        Extra arguments passed to `PIL.Image.Image.save`
+
+    Raises
+    ------
+    ValueError
+        Raised when an option isn't valid
+    """
+
+    def __init__(
+        self,
+        size: Optional["RenderSize"] = None,
+        module_width: Optional[int] = None,
+        bar_height: Optional[int] = None,
+        quiet_zone: Optional[int] = None,
+        font_size: Optional[int] = None,
+        draw_text: bool = True,
+        mode: str = "RGB",
+        rotation: int = 0,
+        format: Optional[str] = None,
+        max_dimension: Optional[int] = _DEFAULT_LIMIT,
+        max_raster_bytes: Optional[int] = _DEFAULT_LIMIT,
+        **save_kwargs: Any,
+    ):
+        if size is not None:
+            width, height = size
+            size = (_positive_int(width, "width"), _positive_int(height, "height"))
+        if module_width is not None:
+            module_width = _positive_int(module_width, "module_width")
+        if bar_height is not None:
+            bar_height = _positive_int(bar_height, "bar_height")
+        if quiet_zone is not None:
+            quiet_zone = _positive_int(quiet_zone, "quiet_zone")
+        if font_size is not None:
+            font_size = _positive_int(font_size, "font_size")
+        if max_dimension not in (None, _DEFAULT_LIMIT):
+            max_dimension = _positive_int(max_dimension, "max_dimension")
+        if max_raster_bytes not in (None, _DEFAULT_LIMIT):
+            max_raster_bytes = _positive_int(max_raster_bytes, "max_raster_bytes")
+
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}.")
+        if rotation not in ROTATIONS:
+            raise ValueError("rotation must be one of 0, 90, 180 or 270.")
+
+        if format is not None:
+            Image.init()
+            format = format.upper()
+            if format not in Image.SAVE:
+                raise ValueError(f"Can't save images as {format}.")
+
+        self.size = size
+        self.module_width = module_width
+        self.bar_height = bar_height
+        self.quiet_zone = quiet_zone
+        self.font_size = font_size
+        self.draw_text = bool(draw_text)
+        self.mode = mode
+        self.rotation = int(rotation)
+        self.format = format
+        self.max_dimension = max_dimension
+        self.max_raster_bytes = max_raster_bytes
+        self.save_kwargs = save_kwargs
+
+        self.background = ImageColor.getcolor("white", mode)
+        self.foreground = ImageColor.getcolor("black", mode)
+
+        # Filled lazily. Threads racing on a missing entry only build it twice.
+        self._options: dict[tuple[type, Optional[int]], RenderOptions] = {}
+        self._fonts: dict[int, ImageFont.ImageFont] = {}
+        self._atlases: dict[tuple[int, int], TileAtlas] = {}
+
+    def __repr__(self) -> str:
+        options = ", ".join(
+            f"{name}={value!r}"
+            for name, value in (
+                ("size", self.size),
+                ("module_width", self.module_width),
+                ("bar_height", self.bar_height),
+                ("quiet_zone", self.quiet_zone),
+                ("font_size", self.font_size),
+                ("draw_text", self.draw_text),
+                ("mode", self.mode),
+                ("rotation", self.rotation),
+                ("format", self.format),
+            )
+        )
+        return f"<RenderProfile({options})>"
+
+    def options(self, barcode: "Barcode") -> "RenderOptions":
+        """Return the render options resolved for a barcode
+
+        Options are kept per barcode type. Types whose default module width
+        depends on the code, like Code39, also keep them per module width.
+        """
+
+        column_size = None if self.module_width else barcode._get_column_size()
+        key = (type(barcode), column_size)
+
+        options = self._options.get(key)
+        if options is None:
+            options = self._options[key] = barcode._get_render_options(
+                module_width=self.module_width,
+                bar_height=self.bar_height,
+                quiet_zone=self.quiet_zone,
+                font_size=self.font_size,
+                draw_text=self.draw_text,
+            )
+        return options
+
+    def check_limits(self, measurement: "Measurement") -> None:
+        """Check a measured render against the size limits of the profile
+
+        Raises
+        ------
+        RenderLimitError
+            Raised when the image is too large, or would take too much memory
+        """
+
+        max_dimension = self.max_dimension
+        if max_dimension is _DEFAULT_LIMIT:
+            max_dimension = MAX_DIMENSION
+        max_raster_bytes = self.max_raster_bytes
+        if max_raster_bytes is _DEFAULT_LIMIT:
+            max_raster_bytes = MAX_RASTER_BYTES
+        check_limits(measurement, max_dimension, max_raster_bytes)
+
+    def font(self, font_size: int) -> ImageFont.ImageFont:
+        """Return the default font in a size, loading it the first time
+
+        Fonts are shared with other threads. Hold `font_lock` while using them.
+        """
+
+        font = self._fonts.get(font_size)
+        if font is None:
+            font = self._fonts[font_size] = _load_font(font_size)
+        return font
+
+    @property
+    def font_lock(self) -> threading.Lock:
+        """The lock to hold while measuring or drawing text with a font"""
+
+        return _font_lock
+
+    def tile_atlas(self, module_width: int, bar_height: int) -> TileAtlas:
+        """Return the bar tiles of a module width and bar height
+
+        The atlases are shared with other profiles of the same geometry,
+        but a profile keeps its own even after they're evicted from the
+        shared ones.
+        """
+
+        key = (module_width, bar_height)
+        atlas = self._atlases.get(key)
+        if atlas is None:
+            atlas = self._atlases[key] = get_tile_atlas(
+                module_width, bar_height, self.mode
+            )
+        return atlas
+
+
+@lru_cache(maxsize=32)
+def get_render_profile(
+    size: Optional["RenderSize"] = None,
+    module_width: Optional[int] = None,
+    bar_height: Optional[int] = None,
+    quiet_zone: Optional[int] = None,
+    font_size: Optional[int] = None,
+    draw_text: bool = True,
+    mode: str = "RGB",
+    rotation: int = 0,
+) -> RenderProfile:
+    """Return a shared profile for a set of render options
+
+    Renders that pass their options as keyword arguments go through this,
+    so repeated calls with the same options reuse the same caches.
+    """
+
+    return RenderProfile(
+        size=size,
+        module_width=module_width,
+        bar_height=bar_height,
+        quiet_zone=quiet_zone,
+        font_size=font_size,
+        draw_text=draw_text,
+        mode=mode,
+        rotation=rotation,
+    )
+
+
+def _reset_locks() -> None:
+    """Replace the lock, which another thread may have held during a fork"""
+
+    global _font_lock
+    _font_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_locks)
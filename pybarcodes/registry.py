@@ -0,0 +1,36 @@
+from .barcode import Barcode
+from .codes import CODE39, CODE128
+from .ean import EAN8, EAN13, EAN14, JAN
+
+BARCODE_TYPES: dict[str, type[Barcode]] = {
+    "EAN13": EAN13,
+    "EAN8": EAN8,
+    "EAN14": EAN14,
+    "JAN": JAN,
+    "CODE39": CODE39,
+    "CODE128": CODE128,
+}
+
+
+def get_barcode_type(name: str) -> type[Barcode]:
+    """Find the barcode class registered under the name given
+
+    Parameters
+    ----------
+    name: str
+        The name of the barcode type, e.g. `ean13`. The lookup is case-insensitive.
+
+    Returns
+    -------
+    The barcode class registered under that name
+
+    Raises
+    ------
+    ValueError
+        Raised when there is no barcode type with that name
+    """
+
+    try:
+        return BARCODE_TYPES[name.upper()]
+    except KeyError:
+        raise ValueError(f"Unsupported barcode type {name}.") from None
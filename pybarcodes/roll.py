@@ -0,0 +1,212 @@
+import mmap
+import os
+import struct
+from collections.abc import Iterable
+from typing import Any
+
+from PIL import Image
+
+from .barcode import Barcode, PathInput
+from .profile import RenderProfile
+
+FORMATS = ("PBM", "TIFF", "RAW")
+
+# The tags of a bilevel TIFF image with one strip, in the order they're written
+TIFF_TAGS = (
+    (256, "width"),
+    (257, "height"),
+    (258, 1),  # BitsPerSample
+    (259, 1),  # Compression: none
+    (262, 0),  # PhotometricInterpretation: WhiteIsZero
+    (273, "offset"),  # StripOffsets
+    (277, 1),  # SamplesPerPixel
+    (278, "height"),  # RowsPerStrip
+    (279, "size"),  # StripByteCounts
+)
+TIFF_LONG, TIFF_SHORT = 4, 3
+TIFF_MAX_SIZE = 2**32 - 1
+
+
+class RollWriter:
+    """Write barcodes one after another into one raster for continuous-feed printers
+
+    Every label is rendered as a bilevel image, packed with 1 for black, and
+    written into the file through a memory map of just its rows, so memory
+    stays bounded by one label however long the roll gets. The file is
+    extended before every label, and the rows it's extended with are white,
+    so gaps are never written.
+
+    The formats are:
+
+    - `PBM`: a binary Netpbm bitmap, with a header of a fixed size that's
+      completed on close
+    - `TIFF`: an uncompressed bilevel TIFF image, whose directory is written
+      after the rows on close
+    - `RAW`: the packed rows alone, every row padded to a whole byte
+
+    Parameters
+    ----------
+    path: Union[str, PathLike]
+        The file to write the roll to
+    width: int
+        The width of the roll in pixels. Labels are centered on it.
+    format: str
+        One of `PBM`, `TIFF` or `RAW`
+    gap: int
+        The number of white rows between labels
+    render_options:
+        The same keyword arguments as :class:`pybarcodes.profile.RenderProfile`,
+        except `mode`, since labels are always rendered in mode `1`
+    """
+
+    def __init__(
+        self,
+        path: PathInput,
+        width: int,
+        format: str = "PBM",
+        gap: int = 0,
+        **render_options: Any,
+    ):
+        self.format = format.upper()
+        if self.format not in FORMATS:
+            raise ValueError(f"The format must be one of {', '.join(FORMATS)}.")
+        if "mode" in render_options:
+            raise ValueError("Roll labels are always rendered in mode 1.")
+
+        self.width = Barcode._positive_int(width, "width")
+        self.gap = int(gap)
+        if self.gap < 0:
+            raise ValueError("gap must be 0 or greater.")
+        self.profile = RenderProfile(**render_options, mode="1")
+
+        self.row_bytes = (self.width + 7) // 8
+        self.height = 0
+        self.labels = 0
+        self._closed = False
+
+        self._file = open(path, "w+b")
+        header = self._header()
+        self._file.write(header)
+        self._data_offset = len(header)
+
+    def __enter__(self) -> "RollWriter":
+        return self
+
+    def __exit__(self, exc_type: object, *exc_info: object) -> None:
+        try:
+            self.close()
+        except ValueError:
+            # An error in the block says more than the roll being empty
+            if exc_type is None:
+                raise
+
+    def add(self, barcode: Barcode) -> None:
+        """Render a barcode below the previous one
+
+        Raises
+        ------
+        ValueError
+            Raised when the writer is already closed, the label is wider than
+            the roll, or a TIFF roll would be larger than 4 GiB
+        """
+
+        if self._closed:
+            raise ValueError("The roll is already closed.")
+
+        label = barcode.render(profile=self.profile)
+        if label.width > self.width:
+            raise ValueError(
+                f"The label is {label.width} pixels wide, "
+                f"wider than the roll of {self.width} pixels."
+            )
+
+        top = self.height + (self.gap if self.labels else 0)
+        start = self._data_offset + top * self.row_bytes
+        end = start + label.height * self.row_bytes
+        if self.format == "TIFF" and end > TIFF_MAX_SIZE:
+            raise ValueError("A TIFF roll can't be larger than 4 GiB.")
+
+        strip = Image.new("1", (self.width, label.height), 1)
+        strip.paste(label, ((self.width - label.width) // 2, 0))
+        data = strip.tobytes("raw", "1;I")
+
+        # Only the pages of this label are mapped
+        self._file.truncate(end)
+        offset = start - start % mmap.ALLOCATIONGRANULARITY
+        with mmap.mmap(self._file.fileno(), end - offset, offset=offset) as view:
+            view[start - offset :] = data
+
+        self.height = top + label.height
+        self.labels += 1
+
+    def close(self) -> None:
+        """Complete the header of the file and close it
+
+        Raises
+        ------
+        ValueError
+            Raised when no labels were added. Images can't be 0 pixels high,
+            so the file is removed.
+        """
+
+        if self._closed:
+            return
+
+        size = self.height * self.row_bytes
+        self._file.truncate(self._data_offset + size)
+        if self.format == "TIFF":
+            self._file.seek(self._data_offset + size)
+            self._file.write(self._tiff_directory(size))
+        self._file.seek(0)
+        self._file.write(self._header())
+        self._file.close()
+        self._closed = True
+
+        if not self.labels:
+            os.remove(self._file.name)
+            raise ValueError("The roll has no labels.")
+
+    def _header(self) -> bytes:
+        if self.format == "PBM":
+            # Padding the height keeps the header the same size once it's known
+            return f"P4\n{self.width} {self.height:>10}\n".encode("ascii")
+        if self.format == "TIFF":
+            size = self.height * self.row_bytes
+            # The directory follows the rows, on a word boundary
+            return struct.pack("<2sHI", b"II", 42, 8 + size + size % 2)
+        return b""
+
+    def _tiff_directory(self, size: int) -> bytes:
+        values = {"width": self.width, "height": self.height, "offset": 8}
+        values["size"] = size
+
+        entries = []
+        for tag, value in TIFF_TAGS:
+            if isinstance(value, str):
+                entries.append(struct.pack("<HHII", tag, TIFF_LONG, 1, values[value]))
+            else:
+                entries.append(struct.pack("<HHIHH", tag, TIFF_SHORT, 1, value, 0))
+        padding = b"\0" * (size % 2)
+        return (
+            padding
+            + struct.pack("<H", len(entries))
+            + b"".join(entries)
+            + struct.pack("<I", 0)
+        )
+
+
+def write_roll(barcodes: Iterable[Barcode], path: PathInput, **kwargs: Any) -> int:
+    """Write barcodes to a roll and return its height in pixels
+
+    The keyword arguments are the same as :class:`RollWriter`.
+
+    Raises
+    ------
+    ValueError
+        Raised when there are no barcodes, or a label doesn't fit the roll
+    """
+
+    with RollWriter(path, **kwargs) as writer:
+        for barcode in barcodes:
+            writer.add(barcode)
+    return writer.height
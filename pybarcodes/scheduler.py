@@ -0,0 +1,278 @@
+"""Share one pool of workers between interactive renders and bulk jobs.
+
+A :class:`PriorityScheduler` sits in front of an executor and only hands it as
+many calls as it has workers. The rest wait in a queue per priority class,
+and every worker that frees up takes the call of the most urgent class that
+is under its limit. Bulk jobs submit their chunks one call each, so they
+give way to interactive renders at every chunk boundary::
+
+    from pybarcodes.scheduler import PriorityScheduler
+
+    scheduler = PriorityScheduler(max_workers=8)
+    server = RenderServer(executor=scheduler.executor("interactive"))
+    job.run(executor=scheduler.executor("bulk"))
+"""
+
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from collections.abc import Callable, Mapping
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from functools import partial
+from typing import Any, Optional
+
+from .barcode import Barcode
+from .server import _percentile
+
+PriorityClass = namedtuple("PriorityClass", "priority max_workers", defaults=(None,))
+ClassStats = namedtuple(
+    "ClassStats", "queued running completed wait_p50 wait_p99 wait_max"
+)
+WorkItem = namedtuple("WorkItem", "future function args kwargs submitted")
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+# How many of the most recent waits every class keeps for its percentiles
+WAIT_SAMPLES = 1000
+
+
+class PriorityScheduler:
+    """Run calls on an executor in the order of their priority class
+
+    A class with a lower priority number goes first. Waiting makes calls more
+    urgent: every `aging` seconds a call waits lowers its priority by one, so
+    bulk work still runs while interactive renders keep coming.
+
+    Parameters
+    ----------
+    max_workers: Optional[int]
+        How many calls run at once. Defaults to the workers of the executor,
+        or to the number of CPUs.
+    classes: Optional[Mapping[str, PriorityClass]]
+        The priority and the most calls at once of every class. Defaults to
+        `interactive` with priority 0, and `bulk` with priority 1 that leaves
+        one worker free for interactive renders.
+    aging: float
+        The seconds of waiting that make a call one priority more urgent
+    executor: Optional[concurrent.futures.Executor]
+        The executor to run the calls on. A thread pool is started when it's
+        not given. Only a pool that the scheduler started is shut down by it.
+
+    Raises
+    ------
+    ValueError
+        Raised when an option isn't valid
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        classes: Optional[Mapping[str, PriorityClass]] = None,
+        aging: float = 5.0,
+        executor: Optional[Executor] = None,
+    ):
+        if max_workers is None:
+            max_workers = getattr(executor, "_max_workers", None) or os.cpu_count()
+        self.max_workers = Barcode._positive_int(max_workers, "max_workers")
+        if aging <= 0:
+            raise ValueError("aging must be greater than 0.")
+        self.aging = aging
+
+        if classes is None:
+            classes = {
+                INTERACTIVE: PriorityClass(0),
+                BULK: PriorityClass(1, max(self.max_workers - 1, 1)),
+            }
+        if not classes:
+            raise ValueError("At least one priority class is needed.")
+        for name, priority_class in classes.items():
+            if priority_class.max_workers is not None:
+                Barcode._positive_int(priority_class.max_workers, f"{name} max_workers")
+        self.classes = dict(classes)
+
+        self._executor = executor
+        self._owns_executor = executor is None
+        if executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="pybarcodes-scheduler"
+            )
+
+        self._lock = threading.Lock()
+        self._queues: dict[str, deque[WorkItem]] = {name: deque() for name in classes}
+        self._running = dict.fromkeys(classes, 0)
+        self._completed = dict.fromkeys(classes, 0)
+        self._waits = {name: deque(maxlen=WAIT_SAMPLES) for name in classes}
+        self._futures: set[Future] = set()
+        self._shutdown = False
+
+    def __enter__(self) -> "PriorityScheduler":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.shutdown()
+
+    def submit(
+        self, priority_class: str, function: Callable[..., Any], *args, **kwargs
+    ) -> Future:
+        """Queue a call in a priority class and return its future
+
+        Raises
+        ------
+        ValueError
+            Raised when the class doesn't exist
+        RuntimeError
+            Raised when the scheduler is shut down
+        """
+
+        if priority_class not in self.classes:
+            raise ValueError(f"There's no priority class {priority_class!r}.")
+
+        future: Future = Future()
+        item = WorkItem(future, function, args, kwargs, time.monotonic())
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("The scheduler is shut down.")
+            self._queues[priority_class].append(item)
+            self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+        self._dispatch()
+        return future
+
+    def executor(self, priority_class: str) -> "PriorityExecutor":
+        """An executor that submits its calls to a priority class
+
+        It can be passed anywhere the library takes an executor.
+        """
+
+        if priority_class not in self.classes:
+            raise ValueError(f"There's no priority class {priority_class!r}.")
+        return PriorityExecutor(self, priority_class)
+
+    def stats(self) -> dict[str, ClassStats]:
+        """Return the queue depth, running calls and wait times of every class
+
+        Waits are the seconds between submitting a call and starting it, over
+        the most recent calls only.
+        """
+
+        with self._lock:
+            stats = {}
+            for name in self.classes:
+                waits = sorted(self._waits[name])
+                stats[name] = ClassStats(
+                    queued=len(self._queues[name]),
+                    running=self._running[name],
+                    completed=self._completed[name],
+                    wait_p50=_percentile(waits, 50),
+                    wait_p99=_percentile(waits, 99),
+                    wait_max=waits[-1] if waits else 0.0,
+                )
+            return stats
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        """Stop taking calls, and shut down the executor the scheduler started
+
+        Queued calls still run, unless `cancel_futures` is set.
+        """
+
+        with self._lock:
+            self._shutdown = True
+            queued = [item for queue in self._queues.values() for item in queue]
+            if cancel_futures:
+                for queue in self._queues.values():
+                    queue.clear()
+            futures = list(self._futures)
+
+        if cancel_futures:
+            for item in queued:
+                item.future.cancel()
+        if wait:
+            wait_futures(futures)
+
+        if self._owns_executor:
+            self._executor.shutdown(wait=wait)
+
+    def _next(self) -> Optional[tuple[str, WorkItem]]:
+        """Take the most urgent call of a class under its limit"""
+
+        now = time.monotonic()
+        best = None
+        best_priority = 0.0
+        for name, priority_class in self.classes.items():
+            queue = self._queues[name]
+            if not queue:
+                continue
+            limit = priority_class.max_workers
+            if limit is not None and self._running[name] >= limit:
+                continue
+
+            priority = priority_class.priority - (now - queue[0].submitted) / self.aging
+            if best is None or priority < best_priority:
+                best, best_priority = name, priority
+
+        if best is None:
+            return None
+        return best, self._queues[best].popleft()
+
+    def _dispatch(self) -> None:
+        started = []
+        with self._lock:
+            while sum(self._running.values()) < self.max_workers:
+                entry = self._next()
+                if entry is None:
+                    break
+                name, item = entry
+                if not item.future.set_running_or_notify_cancel():
+                    continue
+                self._running[name] += 1
+                self._waits[name].append(time.monotonic() - item.submitted)
+                started.append(entry)
+
+        for name, item in started:
+            try:
+                inner = self._executor.submit(item.function, *item.args, **item.kwargs)
+            except BaseException as error:
+                item.future.set_exception(error)
+                self._release(name)
+            else:
+                inner.add_done_callback(partial(self._finish, name, item.future))
+
+    def _finish(self, name: str, future: Future, inner: Future) -> None:
+        # Free the worker before the future wakes its waiters
+        self._release(name)
+        if inner.cancelled():
+            future.set_exception(RuntimeError("The executor cancelled the call."))
+        elif inner.exception() is not None:
+            future.set_exception(inner.exception())
+        else:
+            future.set_result(inner.result())
+
+    def _release(self, name: str) -> None:
+        with self._lock:
+            self._running[name] -= 1
+            self._completed[name] += 1
+        self._dispatch()
+
+
+class PriorityExecutor(Executor):
+    """An executor view of one priority class of a :class:`PriorityScheduler`
+
+    Shutting it down doesn't shut down the scheduler.
+    """
+
+    def __init__(self, scheduler: PriorityScheduler, priority_class: str):
+        self.scheduler = scheduler
+        self.priority_class = priority_class
+        # The most calls of this class that can run at once, which is what
+        # the render server bounds its requests in flight by
+        limit = scheduler.classes[priority_class].max_workers
+        self._max_workers = limit or scheduler.max_workers
+
+    def submit(self, fn: Callable[..., Any], /, *args, **kwargs) -> Future:
+        return self.scheduler.submit(self.priority_class, fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        pass
@@ -0,0 +1,421 @@
+"""A small asyncio HTTP server that renders barcodes on request.
+
+Images are served from paths of the form ``/<type>/<code>.<extension>``, e.g.
+``GET /ean13/400638133393.png?module_width=3&draw_text=0``. The query string
+accepts the same render options as :meth:`pybarcodes.barcode.Barcode.render`,
+except ``profile``, with ``size`` given as ``<width>x<height>``.
+
+Run it with ``python -m pybarcodes.server --port 8000``.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from typing import Any, Optional, Union
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from PIL import Image
+
+from .barcode import Barcode
+from .cache import DiskCache, SharedMemoryCache
+from .exceptions import IncorrectFormat, RenderLimitError
+from .profile import check_limits
+from .registry import get_barcode_type
+
+ServerStats = namedtuple(
+    "ServerStats",
+    "requests renders not_modified cache_hits errors in_flight uptime throughput "
+    "latency_p50 latency_p95 latency_p99",
+)
+Response = tuple[HTTPStatus, dict[str, str], Union[bytes, memoryview]]
+
+INTEGER_OPTIONS = (
+    "module_width",
+    "bar_height",
+    "quiet_zone",
+    "font_size",
+    "rotation",
+)
+FALSE_VALUES = ("0", "false", "no", "off")
+
+# The limits of a render for a request, which the library has off by default
+MAX_DIMENSION = 32768
+MAX_RASTER_BYTES = 256 * 1024**2
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    index = round(percent / 100 * (len(values) - 1))
+    return values[index]
+
+
+class RenderServer:
+    """Serve rendered barcode images over HTTP
+
+    Rendering runs in an executor so the event loop only parses requests and
+    writes responses. Every image response carries an ETag computed from
+    :meth:`pybarcodes.barcode.Barcode.render_key`, and requests whose
+    ``If-None-Match`` header matches it are answered with
+    ``304 Not Modified`` without rendering anything.
+
+    Parameters
+    ----------
+    host: str
+        The interface to listen on
+    port: int
+        The port to listen on, 0 picks a free port
+    max_workers: Optional[int]
+        The number of render threads, when no executor is given
+    max_in_flight: Optional[int]
+        The maximum number of renders running at the same time.
+        Defaults to the number of render threads.
+    executor: Optional[concurrent.futures.Executor]
+        The executor to render on. It is not shut down by the server.
+    max_age: int
+        The `max-age` of the `Cache-Control` header, in seconds
+    latency_window: int
+        How many of the most recent request latencies the stats are computed from
+    cache: Optional[Union[DiskCache, SharedMemoryCache]]
+        A cache of the encoded images, like a
+        :class:`pybarcodes.cache.SharedMemoryCache` shared by the workers of
+        a host. Hits are answered without going through the executor.
+    max_dimension: Optional[int]
+        The largest width or height of a rendered image in pixels,
+        or None for no limit
+    max_raster_bytes: Optional[int]
+        The most memory the images of a render may take, or None for no limit
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        max_workers: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        max_age: int = 86400,
+        latency_window: int = 1024,
+        cache: Optional[Union[DiskCache, SharedMemoryCache]] = None,
+        max_dimension: Optional[int] = MAX_DIMENSION,
+        max_raster_bytes: Optional[int] = MAX_RASTER_BYTES,
+    ):
+        self.host = host
+        self.port = port
+        self.max_age = max_age
+        self.cache = cache
+        self.max_dimension = max_dimension
+        self.max_raster_bytes = max_raster_bytes
+
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._max_workers = max_workers
+        self._max_in_flight = max_in_flight
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._connections: set[asyncio.Task] = set()
+
+        self._latencies: deque[float] = deque(maxlen=latency_window)
+        self._started = time.monotonic()
+        self._requests = 0
+        self._renders = 0
+        self._not_modified = 0
+        self._cache_hits = 0
+        self._errors = 0
+        self._in_flight = 0
+
+    @property
+    def address(self) -> tuple[str, int]:
+        """The host and port the server is listening on"""
+
+        if self._server is None:
+            return self.host, self.port
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def start(self) -> None:
+        """Start listening for connections"""
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._max_workers, thread_name_prefix="pybarcodes-render"
+            )
+
+        max_in_flight = self._max_in_flight
+        if max_in_flight is None:
+            max_in_flight = getattr(self._executor, "_max_workers", None) or 1
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+        self._started = time.monotonic()
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port
+        )
+
+    async def serve_forever(self) -> None:
+        """Start the server if needed and serve until cancelled"""
+
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stop listening, drop open connections and release the render threads"""
+
+        if self._server is not None:
+            self._server.close()
+            # Keep-alive connections would keep waiting for their next request
+            for task in self._connections:
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def __aenter__(self) -> "RenderServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    def stats(self) -> ServerStats:
+        """Return request counters, throughput and latency percentiles
+
+        Latencies are in seconds and cover the most recent requests only.
+        """
+
+        uptime = time.monotonic() - self._started
+        latencies = sorted(self._latencies)
+        return ServerStats(
+            requests=self._requests,
+            renders=self._renders,
+            not_modified=self._not_modified,
+            cache_hits=self._cache_hits,
+            errors=self._errors,
+            in_flight=self._in_flight,
+            uptime=uptime,
+            throughput=self._requests / uptime if uptime > 0 else 0.0,
+            latency_p50=_percentile(latencies, 50),
+            latency_p95=_percentile(latencies, 95),
+            latency_p99=_percentile(latencies, 99),
+        )
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+
+                started = time.perf_counter()
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.split()
+                if len(parts) == 3:
+                    method, target, version = parts
+                    status, response_headers, body = await self._respond(
+                        method, target, headers
+                    )
+                else:
+                    method, version = "GET", "HTTP/1.0"
+                    status, response_headers, body = self._error(
+                        HTTPStatus.BAD_REQUEST, "Malformed request line."
+                    )
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" and (
+                    version == "HTTP/1.1" or connection == "keep-alive"
+                )
+
+                # A 304 can only carry the length of the 200 response, so none
+                if status != HTTPStatus.NOT_MODIFIED:
+                    response_headers["Content-Length"] = str(len(body))
+                response_headers["Connection"] = "keep-alive" if keep_alive else "close"
+                lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+                lines += [
+                    f"{name}: {value}" for name, value in response_headers.items()
+                ]
+                writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+                if method != "HEAD" and status != HTTPStatus.NOT_MODIFIED:
+                    writer.write(body)
+                await writer.drain()
+
+                self._requests += 1
+                self._latencies.append(time.perf_counter() - started)
+
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        except asyncio.CancelledError:
+            # Cancelled by close, which only waits for the handler to end.
+            # The stream reports a cancelled handler as an error.
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _respond(
+        self, method: str, target: str, headers: dict[str, str]
+    ) -> Response:
+        if method not in ("GET", "HEAD"):
+            return self._error(HTTPStatus.METHOD_NOT_ALLOWED, "Only GET is supported.")
+
+        url = urlsplit(target)
+        if url.path == "/stats":
+            body = json.dumps(self.stats()._asdict()).encode()
+            return HTTPStatus.OK, {"Content-Type": "application/json"}, body
+
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 2 or "." not in parts[1]:
+            return self._error(HTTPStatus.NOT_FOUND, "Not found.")
+
+        symbology, filename = parts
+        code, _, extension = unquote(filename).rpartition(".")
+        image_format = Image.registered_extensions().get(f".{extension.lower()}")
+        if image_format is None or image_format not in Image.SAVE:
+            return self._error(HTTPStatus.NOT_FOUND, f"Unsupported format {extension}.")
+
+        try:
+            barcode_type = get_barcode_type(symbology)
+        except ValueError as error:
+            return self._error(HTTPStatus.NOT_FOUND, str(error))
+
+        try:
+            options = self._parse_options(url.query)
+            barcode = barcode_type(code)
+            key = barcode.render_key(image_format, **options)
+            etag = f'"{key}"'
+        except (IncorrectFormat, ValueError) as error:
+            return self._error(HTTPStatus.BAD_REQUEST, str(error))
+
+        response_headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={self.max_age}",
+        }
+        if_none_match = headers.get("if-none-match", "")
+        # If-None-Match compares weakly, so weak validators match too
+        candidates = [
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        ]
+        if etag in candidates or "*" in candidates:
+            self._not_modified += 1
+            return HTTPStatus.NOT_MODIFIED, response_headers, b""
+
+        body = self.cache.get(key) if self.cache is not None else None
+        if body is not None:
+            self._cache_hits += 1
+        else:
+            loop = asyncio.get_running_loop()
+            render = partial(self._render, barcode, image_format, key, options)
+            async with self._semaphore:
+                self._in_flight += 1
+                try:
+                    body = await loop.run_in_executor(self._executor, render)
+                except RenderLimitError as error:
+                    return self._error(HTTPStatus.BAD_REQUEST, str(error))
+                except Exception as error:
+                    # Like an image format that can't take the render mode
+                    return self._error(
+                        HTTPStatus.INTERNAL_SERVER_ERROR,
+                        f"The image can't be rendered: {error}",
+                    )
+                finally:
+                    self._in_flight -= 1
+            self._renders += 1
+
+        content_type = Image.MIME.get(image_format, "application/octet-stream")
+        response_headers["Content-Type"] = content_type
+        return HTTPStatus.OK, response_headers, body
+
+    def _render(
+        self, barcode: Barcode, image_format: str, key: str, options: dict[str, Any]
+    ) -> Union[bytes, memoryview]:
+        if self.max_dimension is not None or self.max_raster_bytes is not None:
+            measurement = barcode.measure(**options)
+            check_limits(measurement, self.max_dimension, self.max_raster_bytes)
+        body = barcode.to_image_buffer(image_format, **options)
+        if self.cache is not None:
+            self.cache.put(key, body)
+        return body
+
+    def _parse_options(self, query: str) -> dict[str, Any]:
+        options: dict[str, Any] = {}
+        for name, value in parse_qsl(query, keep_blank_values=True):
+            if name in INTEGER_OPTIONS:
+                options[name] = int(value)
+            elif name == "mode":
+                options[name] = value.upper()
+            elif name == "draw_text":
+                options[name] = value.lower() not in FALSE_VALUES
+            elif name == "size":
+                width, _, height = value.lower().partition("x")
+                options[name] = (
+                    self._positive(width, "width"),
+                    self._positive(height, "height"),
+                )
+            else:
+                raise ValueError(f"Unknown render option {name}.")
+        return options
+
+    @staticmethod
+    def _positive(value: str, name: str) -> int:
+        number = int(value)
+        if number <= 0:
+            raise ValueError(f"{name} must be greater than 0.")
+        return number
+
+    def _error(self, status: HTTPStatus, message: str) -> Response:
+        self._errors += 1
+        body = json.dumps({"error": message}).encode()
+        return status, {"Content-Type": "application/json"}, body
+
+
+async def serve(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    max_workers: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+) -> None:
+    """Run a :class:`RenderServer` until cancelled"""
+
+    server = RenderServer(
+        host=host, port=port, max_workers=max_workers, max_in_flight=max_in_flight
+    )
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve barcode images over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-in-flight", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_in_flight))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
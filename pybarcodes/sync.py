@@ -0,0 +1,256 @@
+"""Keep a directory of labels in sync with a list of codes.
+
+Every label is rendered to ``<output>/<name>.<format>``. A manifest in the
+output directory maps every file it wrote to the
+:meth:`pybarcodes.barcode.Barcode.render_key` of its image, which covers the
+library version, the barcode type, the code and the render options. A sync
+only renders the labels whose key changed, and removes the files of labels
+that are gone.
+
+Run it on a CSV file with ``python -m pybarcodes.sync products.csv labels``.
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from collections import namedtuple
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, Union
+
+from .barcode import Barcode, BarcodeInput, PathInput
+from .exceptions import IncorrectFormat
+from .profile import RenderProfile
+from .registry import get_barcode_type
+
+SyncResult = namedtuple("SyncResult", "rendered unchanged removed invalid failed")
+
+MANIFEST_NAME = ".pybarcodes-sync.json"
+MANIFEST_VERSION = 1
+
+# The temporary files of labels and of the manifest, named after the process
+_TEMPORARY_NAME = re.compile(r"\.\d+\.tmp$")
+
+SyncEntries = Union[Mapping[str, BarcodeInput], Iterable[tuple[str, BarcodeInput]]]
+
+
+def read_entries(
+    path: PathInput, name_column: str = "sku", code_column: str = "code"
+) -> Iterator[tuple[str, str]]:
+    """Read the label names and the codes of a CSV file with a header row
+
+    Rows with an empty name are skipped.
+
+    Raises
+    ------
+    ValueError
+        Raised when one of the columns is missing
+    """
+
+    with open(path, newline="", encoding="utf-8") as file:
+        reader = csv.DictReader(file)
+        for column in (name_column, code_column):
+            if column not in (reader.fieldnames or ()):
+                raise ValueError(f"{path} has no {column} column.")
+
+        for row in reader:
+            name = (row[name_column] or "").strip()
+            if name:
+                yield name, (row[code_column] or "").strip()
+
+
+def _load_manifest(path: str) -> dict[str, str]:
+    """Read the keys of the files written by the last sync"""
+
+    try:
+        with open(path, encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (FileNotFoundError, ValueError):
+        # Without a manifest every label is rendered again
+        return {}
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest["files"]
+
+
+def _write_manifest(path: str, files: dict[str, str]) -> None:
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump({"version": MANIFEST_VERSION, "files": files}, file, indent=0)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def _check_name(name: str) -> str:
+    name = str(name)
+    if not name or name.startswith(".") or os.sep in name or "/" in name:
+        raise ValueError(f"{name!r} can't be used as a file name.")
+    return name
+
+
+def sync_directory(
+    entries: SyncEntries,
+    output: PathInput,
+    barcode_type: Any,
+    format: str = "PNG",
+    options: Optional[dict[str, Any]] = None,
+    max_workers: Optional[int] = None,
+) -> SyncResult:
+    """Render the labels that are new or changed, and remove the ones that are gone
+
+    Labels are rendered with :meth:`pybarcodes.barcode.Barcode.save` on a pool
+    of threads, to a temporary file that's renamed into place. The manifest
+    is written once all the labels are done, so a sync that's interrupted
+    renders the labels it didn't record again, and its temporary files are
+    removed by the next one. Files that the manifest doesn't list are never
+    removed.
+
+    A label that fails to render keeps its old file and isn't recorded with
+    its new key, so the next sync tries it again. The rest of the sync goes on.
+
+    Parameters
+    ----------
+    entries: Union[Mapping, Iterable[tuple]]
+        The name of every label and its code, like the pairs of `read_entries`
+    output: Union[str, PathLike]
+        The directory of the labels
+    barcode_type: Union[str, type[Barcode]]
+        The barcode class, or its name, like `ean13`
+    format: str
+        The image format, like `PNG`
+    options: Optional[dict]
+        The render options, the same as :class:`pybarcodes.profile.RenderProfile`
+    max_workers: Optional[int]
+        The number of threads. Defaults to the number of CPUs.
+
+    Returns
+    -------
+    SyncResult:
+        How many labels were rendered or already up to date, how many files
+        were removed, how many codes were skipped as invalid, and how many
+        labels failed to render
+
+    Raises
+    ------
+    ValueError
+        Raised when an option isn't valid, or a name is used twice
+        or can't be a file name
+    """
+
+    if isinstance(barcode_type, str):
+        barcode_type = get_barcode_type(barcode_type)
+    if isinstance(entries, Mapping):
+        entries = entries.items()
+
+    profile = RenderProfile(**{**(options or {}), "format": format})
+    extension = f".{profile.format.lower()}"
+    output = os.fspath(output)
+    os.makedirs(output, exist_ok=True)
+    for name in os.listdir(output):
+        if _TEMPORARY_NAME.search(name):
+            os.remove(os.path.join(output, name))
+
+    manifest_path = os.path.join(output, MANIFEST_NAME)
+    previous = _load_manifest(manifest_path)
+
+    files: dict[str, str] = {}
+    pending: list[tuple[str, Barcode]] = []
+    names = set()
+    unchanged = invalid = 0
+    for name, code in entries:
+        filename = _check_name(name) + extension
+        if filename in names:
+            raise ValueError(f"The label {name} is listed more than once.")
+        names.add(filename)
+
+        try:
+            barcode = barcode_type(code)
+        except (IncorrectFormat, ValueError):
+            invalid += 1
+            continue
+
+        key = barcode.render_key(profile=profile)
+        files[filename] = key
+        if previous.get(filename) == key and os.path.exists(
+            os.path.join(output, filename)
+        ):
+            unchanged += 1
+        else:
+            pending.append((filename, barcode))
+
+    def render(item: tuple[str, Barcode]) -> bool:
+        filename, barcode = item
+        path = os.path.join(output, filename)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            barcode.save(temporary, profile=profile)
+            os.replace(temporary, path)
+        except Exception:
+            # Like a render over the limits, or a format the mode can't take
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return False
+        return True
+
+    failed = set()
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        for (filename, _), done in zip(pending, pool.map(render, pending)):
+            if not done:
+                failed.add(filename)
+
+    for filename in failed:
+        # The old file stays under its old key, so it's rendered next time
+        if filename in previous:
+            files[filename] = previous[filename]
+        else:
+            del files[filename]
+
+    removed = 0
+    for filename in previous.keys() - files.keys():
+        try:
+            os.remove(os.path.join(output, filename))
+        except FileNotFoundError:
+            continue
+        removed += 1
+
+    _write_manifest(manifest_path, files)
+    return SyncResult(
+        len(pending) - len(failed), unchanged, removed, invalid, len(failed)
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Sync a directory of labels.")
+    parser.add_argument("csv")
+    parser.add_argument("output")
+    parser.add_argument("--symbology", default="ean13")
+    parser.add_argument("--format", default="PNG")
+    parser.add_argument("--name-column", default="sku")
+    parser.add_argument("--code-column", default="code")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    result = sync_directory(
+        read_entries(args.csv, args.name_column, args.code_column),
+        args.output,
+        args.symbology,
+        format=args.format,
+        max_workers=args.workers,
+    )
+    print(
+        f"{result.rendered} rendered, {result.unchanged} unchanged, "
+        f"{result.removed} removed, {result.invalid} invalid, "
+        f"{result.failed} failed",
+        file=sys.stderr,
+    )
+    if result.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
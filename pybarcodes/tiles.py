@@ -0,0 +1,122 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+from PIL import Image, ImageColor, ImageDraw
+
+# How many render profiles keep their tiles around
+MAX_PROFILES = 16
+
+_atlases: "OrderedDict[tuple[int, int, str], TileAtlas]" = OrderedDict()
+_atlases_lock = threading.Lock()
+# Every atlas alive, so their locks can be replaced after a fork
+_live_atlases: "weakref.WeakSet[TileAtlas]" = weakref.WeakSet()
+
+
+class TileAtlas:
+    """Rendered bar images of binary patterns, for a single render profile
+
+    Barcodes built from a small alphabet of patterns, like the guards and
+    digit codings of EAN barcodes, can be composed by pasting one tile per
+    pattern instead of drawing every module.
+
+    Tiles are built under a lock and never modified afterwards, so an atlas
+    can be shared by threads rendering at the same time.
+
+    Parameters
+    ----------
+    module_width: int
+        The width of a single module in pixels
+    bar_height: int
+        The height of the bars in pixels
+    mode: str
+        The image mode of the tiles
+    """
+
+    def __init__(self, module_width: int, bar_height: int, mode: str = "RGB"):
+        self.module_width = module_width
+        self.bar_height = bar_height
+        self.mode = mode
+        self._tiles: dict[str, Image.Image] = {}
+        self._lock = threading.Lock()
+        _live_atlases.add(self)
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+    def tile(self, pattern: str) -> Image.Image:
+        """Return the image of a binary pattern, building it the first time
+
+        Parameters
+        ----------
+        pattern: str
+            A string of 1's and 0's, where 1's are bars
+
+        Returns
+        -------
+        PIL.Image.Image:
+            The bars of the pattern. The image is shared and shouldn't be modified.
+        """
+
+        tile = self._tiles.get(pattern)
+        if tile is None:
+            with self._lock:
+                tile = self._tiles.get(pattern)
+                if tile is None:
+                    tile = self._tiles[pattern] = self._build(pattern)
+        return tile
+
+    def _build(self, pattern: str) -> Image.Image:
+        width = self.module_width
+        tile = Image.new(
+            self.mode,
+            (width * len(pattern), self.bar_height),
+            ImageColor.getcolor("white", self.mode),
+        )
+        black = ImageColor.getcolor("black", self.mode)
+        draw = ImageDraw.Draw(tile)
+        for index, module in enumerate(pattern):
+            if module == "1":
+                x = index * width
+                draw.rectangle((x, 0, x + width - 1, self.bar_height - 1), fill=black)
+        return tile
+
+
+def get_tile_atlas(module_width: int, bar_height: int, mode: str = "RGB") -> TileAtlas:
+    """Return the tile atlas of a render profile
+
+    The most recently used atlases are kept, up to `MAX_PROFILES`,
+    and the least recently used one is evicted after that.
+    """
+
+    key = (module_width, bar_height, mode)
+    with _atlases_lock:
+        atlas = _atlases.get(key)
+        if atlas is None:
+            atlas = _atlases[key] = TileAtlas(module_width, bar_height, mode)
+            while len(_atlases) > MAX_PROFILES:
+                _atlases.popitem(last=False)
+        else:
+            _atlases.move_to_end(key)
+    return atlas
+
+
+def clear_tile_atlases() -> None:
+    """Drop the tiles of every render profile"""
+
+    with _atlases_lock:
+        _atlases.clear()
+
+
+def _reset_locks() -> None:
+    """Replace the locks, which another thread may have held during a fork"""
+
+    global _atlases_lock
+    _atlases_lock = threading.Lock()
+    for atlas in list(_live_atlases):
+        atlas._lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_locks)
@@ -0,0 +1,381 @@
+import mmap
+import os
+from array import array
+from collections import namedtuple
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from operator import mul
+from typing import Optional, Union
+
+from .barcode import PathInput
+from .ean import EAN, EAN13
+
+ValidationResult = namedtuple(
+    "ValidationResult", "records valid corrected completed invalid"
+)
+ChunkResult = namedtuple("ChunkResult", "output errors counts")
+Diagnosis = namedtuple("Diagnosis", "rows kinds positions digits valid malformed")
+DiagnosisTables = namedtuple("DiagnosisTables", "weights substitutions transpositions")
+
+ZERO = ord("0")
+
+# The kinds of corrections of `diagnose_codes`
+SUBSTITUTION = 0
+TRANSPOSITION = 1
+
+# Maps the ASCII digits to their values
+DIGIT_VALUES = bytes(range(256)).replace(b"0123456789", bytes(range(10)))
+
+
+def _chunks(
+    view: mmap.mmap, size: int, chunk_size: int, record_length: Optional[int]
+) -> Iterator[tuple[int, int]]:
+    """Split a file into chunks that end on a record boundary"""
+
+    if record_length is not None:
+        chunk_size = max(chunk_size // record_length, 1) * record_length
+
+    start = 0
+    while start < size:
+        end = min(start + chunk_size, size)
+        if record_length is None and end < size:
+            newline = view.find(b"\n", end - 1)
+            end = size if newline == -1 else newline + 1
+        yield start, end
+        start = end
+
+
+def _process_chunk(
+    path: PathInput,
+    start: int,
+    end: int,
+    barcode_type: type[EAN],
+    record_length: Optional[int],
+    write_output: bool,
+) -> ChunkResult:
+    """Check the records between two offsets of a file
+
+    Records are never decoded. The check digit comes from the sum of the
+    ASCII values of the odd and even positions, less the value of `0`.
+    """
+
+    length = barcode_type.BARCODE_LENGTH
+    odd, even = barcode_type.WEIGHTS.ODD, barcode_type.WEIGHTS.EVEN
+    odd_zeros = ZERO * (length // 2)
+    even_zeros = ZERO * ((length + 1) // 2)
+    check_digits = b"0987654321"
+
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            data = view[start:end]
+
+    if record_length is None:
+        records = data.split(b"\n")
+        if records[-1] == b"":
+            records.pop()
+        step = None
+    else:
+        records = [
+            data[i : i + record_length] for i in range(0, len(data), record_length)
+        ]
+        step = record_length
+
+    output = []
+    errors = array("Q")
+    valid = corrected = completed = invalid = 0
+    position = start
+
+    for record in records:
+        offset = position
+        position += step or len(record) + 1
+
+        code = record.rstrip()
+        if not code:
+            continue
+
+        size = len(code)
+        if (size == length or size == length + 1) and code.isdigit():
+            checksum = (sum(code[1:length:2]) - odd_zeros) * odd + (
+                sum(code[0:length:2]) - even_zeros
+            ) * even
+            check = check_digits[checksum % 10 : checksum % 10 + 1]
+
+            if size == length:
+                completed += 1
+                code += check
+            elif code[length:] == check:
+                valid += 1
+            else:
+                corrected += 1
+                errors.append(offset)
+                code = code[:length] + check
+        else:
+            invalid += 1
+            errors.append(offset)
+
+        if write_output:
+            output.append(code)
+
+    if output:
+        output.append(b"")
+
+    return ChunkResult(
+        b"\n".join(output), errors.tobytes(), (valid, corrected, completed, invalid)
+    )
+
+
+def validate_file(
+    path: PathInput,
+    barcode_type: type[EAN] = EAN13,
+    output: Optional[PathInput] = None,
+    errors: Optional[PathInput] = None,
+    record_length: Optional[int] = None,
+    processes: int = 1,
+    chunk_size: int = 64 * 1024**2,
+) -> ValidationResult:
+    """Check and complete the check digits of every code in a file
+
+    The file is memory-mapped and processed in chunks of raw bytes, so codes
+    are never decoded into strings. Every record is trimmed of trailing
+    whitespace and then:
+
+    - kept as it is, when its check digit is correct
+    - corrected, when its check digit is wrong
+    - completed with its check digit, when it doesn't have one
+    - reported as invalid, when it isn't a code of the right length
+
+    Parameters
+    ----------
+    path: Union[str, PathLike]
+        The file to read the codes from
+    barcode_type: type[EAN]
+        The type of the codes, which decides their length and check digit weights
+    output: Optional[Union[str, PathLike]]
+        A file to write the corrected and completed codes to, one per line.
+        Invalid records are written as they were.
+    errors: Optional[Union[str, PathLike]]
+        A file to write the byte offsets of the corrected and invalid records
+        to, as native unsigned 64-bit integers
+    record_length: Optional[int]
+        The size of every record in bytes, for fixed-width files.
+        Newline-delimited records are assumed when it's not given.
+    processes: int
+        How many processes to split the chunks across
+    chunk_size: int
+        The approximate size of every chunk in bytes
+
+    Returns
+    -------
+    ValidationResult:
+        How many records were read, and how many were valid, corrected,
+        completed and invalid
+    """
+
+    processes = EAN._positive_int(processes, "processes")
+    chunk_size = EAN._positive_int(chunk_size, "chunk_size")
+    if record_length is not None:
+        record_length = EAN._positive_int(record_length, "record_length")
+
+    size = os.path.getsize(path)
+    if size:
+        with open(path, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                chunks = list(_chunks(view, size, chunk_size, record_length))
+    else:
+        chunks = []
+
+    arguments = [
+        (path, start, end, barcode_type, record_length, output is not None)
+        for start, end in chunks
+    ]
+
+    output_file = open(output, "wb") if output is not None else None
+    errors_file = open(errors, "wb") if errors is not None else None
+    totals = [0, 0, 0, 0]
+
+    def collect(results: Iterator[ChunkResult]) -> None:
+        for result in results:
+            if output_file is not None:
+                output_file.write(result.output)
+            if errors_file is not None:
+                errors_file.write(result.errors)
+            totals[:] = [total + count for total, count in zip(totals, result.counts)]
+
+    try:
+        if processes > 1 and len(arguments) > 1:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                collect(executor.map(_process_chunk, *zip(*arguments)))
+        else:
+            collect(_process_chunk(*chunk) for chunk in arguments)
+    finally:
+        if output_file is not None:
+            output_file.close()
+        if errors_file is not None:
+            errors_file.close()
+
+    return ValidationResult(sum(totals), *totals)
+
+
+def read_error_offsets(path: PathInput) -> array:
+    """Read the byte offsets written by `validate_file`"""
+
+    offsets = array("Q")
+    with open(path, "rb") as file:
+        offsets.frombytes(file.read())
+    return offsets
+
+
+@lru_cache()
+def _diagnosis_tables(barcode_type: type[EAN]) -> DiagnosisTables:
+    """The weighted-residue tables of the positions of a code with its check digit
+
+    `substitutions[i][digit * 10 + residue]` lists the digits that make the
+    residue 0 when they replace `digit` at position `i`.
+    `transpositions[i][a * 10 + b]` is the residue that swapping the digits
+    `a` and `b` at positions `i` and `i + 1` makes 0, or 10 when it's none.
+    """
+
+    length = barcode_type.BARCODE_LENGTH
+    weights = [
+        barcode_type.WEIGHTS.ODD if i % 2 else barcode_type.WEIGHTS.EVEN
+        for i in range(length)
+    ] + [1]
+
+    by_weight = {}
+    for weight in set(weights):
+        by_weight[weight] = [
+            tuple(
+                other
+                for other in range(10)
+                if other != digit and (residue + weight * (other - digit)) % 10 == 0
+            )
+            for digit in range(10)
+            for residue in range(10)
+        ]
+
+    transpositions = []
+    for first, second in zip(weights, weights[1:]):
+        table = bytearray(100)
+        for a in range(10):
+            for b in range(10):
+                delta = (first * (b - a) + second * (a - b)) % 10
+                table[a * 10 + b] = (10 - delta) % 10 if delta else 10
+        transpositions.append(bytes(table))
+
+    return DiagnosisTables(
+        weights, [by_weight[weight] for weight in weights], transpositions
+    )
+
+
+def diagnose_codes(
+    codes: Iterable[Union[str, bytes]], barcode_type: type[EAN] = EAN13
+) -> Diagnosis:
+    """Find the likely intended codes of codes with a wrong check digit
+
+    Every single-digit substitution and adjacent transposition, the check
+    digit included, that gives the code a correct check digit is listed.
+    Each code costs a lookup per position in tables of weighted residues,
+    instead of validating every candidate.
+
+    The corrections are returned as columns: the row of the code,
+    the kind of correction, its position, and the digit that's put at that
+    position. A transposition swaps the digit at its position with the next
+    one. Use `apply_correction` to get the corrected code.
+
+    For types that only accept some prefixes, like `JAN`, corrections that
+    leave the code without one of them aren't listed, and codes that can't
+    get one by a single correction are malformed.
+
+    Parameters
+    ----------
+    codes: Iterable[Union[str, bytes]]
+        The codes, with their check digit
+    barcode_type: type[EAN]
+        The type of the codes, which decides their length and check digit weights
+
+    Returns
+    -------
+    Diagnosis:
+        The columns of the corrections, and the rows of the codes that are
+        valid and of the ones that aren't codes of the type
+    """
+
+    weights, substitutions, transpositions = _diagnosis_tables(barcode_type)
+    length = len(weights)
+    positions_range = range(length - 1)
+    prefixes = tuple(prefix.encode("ascii") for prefix in barcode_type.PREFIXES)
+    prefix_length = max(map(len, prefixes), default=0)
+
+    rows, valid, malformed = array("Q"), array("Q"), array("Q")
+    kinds, positions, digits = array("B"), array("B"), array("B")
+
+    for row, code in enumerate(codes):
+        if isinstance(code, str):
+            code = code.encode("ascii", "replace")
+        code = code.strip()
+        if len(code) != length or not code.isdigit():
+            malformed.append(row)
+            continue
+
+        values = code.translate(DIGIT_VALUES)
+        residue = sum(map(mul, weights, values)) % 10
+        # Only corrections within the prefix can make up for a wrong one
+        fits = not prefixes or code.startswith(prefixes)
+        if not residue and fits:
+            valid.append(row)
+            continue
+
+        found = len(rows)
+        for position, digit in enumerate(values):
+            if position >= prefix_length and not fits:
+                break
+            for other in substitutions[position][digit * 10 + residue]:
+                if position < prefix_length and not _has_prefix(
+                    code, prefixes, position, (ZERO + other,)
+                ):
+                    continue
+                rows.append(row)
+                kinds.append(SUBSTITUTION)
+                positions.append(position)
+                digits.append(other)
+
+        # A code with a correct check digit but a wrong prefix can still be
+        # fixed by a transposition that keeps the residue at 0
+        target = residue or 10
+        for position in positions_range:
+            if position >= prefix_length and not fits:
+                break
+            a, b = values[position], values[position + 1]
+            if transpositions[position][a * 10 + b] != target:
+                continue
+            if position < prefix_length and not _has_prefix(
+                code, prefixes, position, (ZERO + b, ZERO + a)
+            ):
+                continue
+            rows.append(row)
+            kinds.append(TRANSPOSITION)
+            positions.append(position)
+            digits.append(b)
+
+        if len(rows) == found:
+            malformed.append(row)
+
+    return Diagnosis(rows, kinds, positions, digits, valid, malformed)
+
+
+def _has_prefix(
+    code: bytes, prefixes: tuple[bytes, ...], position: int, digits: tuple[int, ...]
+) -> bool:
+    """Whether the code starts with a prefix once `digits` are put at `position`"""
+
+    end = position + len(digits)
+    return (code[:position] + bytes(digits) + code[end:]).startswith(prefixes)
+
+
+def apply_correction(code: str, kind: int, position: int, digit: int) -> str:
+    """Apply a correction listed by `diagnose_codes` to its code"""
+
+    if kind == TRANSPOSITION:
+        return code[:position] + str(digit) + code[position] + code[position + 2 :]
+    return code[:position] + str(digit) + code[position + 1 :]
@@ -0,0 +1,101 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from pybarcodes import EAN13, EAN14
+from pybarcodes.allocator import GTINAllocator
+from pybarcodes.exceptions import IncorrectFormat
+
+
+def test_allocate_release_and_reserve(tmp_path: Path):
+    path = tmp_path / "codes.gtin"
+    with GTINAllocator(path, "4006381", EAN13) as allocator:
+        assert allocator.slots == 100000
+        codes = allocator.allocate(20)
+        assert codes == list(EAN13.range("4006381", 0, 20))
+        assert allocator.allocated == 20
+
+        allocator.release(codes[5:7])
+        allocator.reserve(["400638100020", "4006381000222"])
+        assert allocator.is_allocated("400638100020")
+        assert not allocator.is_allocated(codes[5])
+
+        # Released codes are allocated first, and reserved ones are skipped
+        assert allocator.allocate(4) == [
+            codes[5],
+            codes[6],
+            EAN13.normalize("400638100021"),
+            EAN13.normalize("400638100023"),
+        ]
+
+        with pytest.raises(ValueError):
+            allocator.reserve([codes[0]])
+        with pytest.raises(ValueError):
+            allocator.release(["400638199999"])
+        with pytest.raises(ValueError):
+            allocator.release(["400638200000"])
+        with pytest.raises(IncorrectFormat):
+            allocator.release(["4006381000011"])
+
+    # Everything is kept in the file
+    with GTINAllocator(path, "4006381") as allocator:
+        assert allocator.allocated == 24
+        assert allocator.allocate() == [EAN13.normalize("400638100024")]
+
+    with pytest.raises(ValueError):
+        GTINAllocator(path, "4006382")
+    with pytest.raises(IncorrectFormat):
+        GTINAllocator(tmp_path / "long.gtin", "400638133393")
+
+
+def test_allocator_runs_out(tmp_path: Path):
+    with GTINAllocator(tmp_path / "small.gtin", "400638133", EAN14) as allocator:
+        # 9 digits of prefix leave 10000 item references
+        assert allocator.free == 10000
+        allocator.allocate(9990)
+
+        with pytest.raises(ValueError):
+            allocator.allocate(11)
+        assert allocator.free == 10
+
+        allocator.release([allocator._code(3)])
+        assert len(allocator.allocate(11)) == 11
+        assert allocator.free == 0
+
+
+def test_allocators_never_share_codes(tmp_path: Path):
+    path = tmp_path / "shared.gtin"
+    allocators = [GTINAllocator(path, "5012345") for _ in range(2)]
+
+    def allocate(allocator):
+        return [code for _ in range(50) for code in allocator.allocate(7)]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        batches = list(executor.map(allocate, allocators * 2))
+
+    codes = [code for batch in batches for code in batch]
+    assert len(set(codes)) == len(codes) == 4 * 50 * 7
+    assert sorted(codes) == list(EAN13.range("5012345", 0, len(codes)))
+
+    for allocator in allocators:
+        allocator.close()
+
+
+def test_allocators_created_at_once(tmp_path: Path):
+    path = tmp_path / "new.gtin"
+    barrier = threading.Barrier(8)
+
+    def open_and_allocate(_):
+        barrier.wait()
+        with GTINAllocator(path, "5012345") as allocator:
+            return allocator.allocate(5)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        batches = list(executor.map(open_and_allocate, range(8)))
+
+    # Every allocator ends up on the same bitmap, so no code is issued twice
+    codes = [code for batch in batches for code in batch]
+    assert len(set(codes)) == len(codes) == 40
+    assert [p.name for p in tmp_path.iterdir()] == ["new.gtin"]
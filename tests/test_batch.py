@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+from pybarcodes import CODE39, CODE128, EAN8, EAN13, RenderProfile
+from pybarcodes.batch import gil_enabled, render_many, render_variants
+from pybarcodes.exceptions import RenderLimitError
+
+
+def test_render_many_matches_serial_rendering():
+    barcodes = [EAN13(f"4006381{i:05d}") for i in range(40)]
+    barcodes += [EAN8("9638507"), CODE39("ABC-123"), CODE128("Hello 123456")]
+
+    images = render_many(barcodes, max_workers=8, module_width=2)
+    assert all(isinstance(image, Image.Image) for image in images)
+    assert [image.tobytes() for image in images] == [
+        barcode.render(module_width=2).tobytes() for barcode in barcodes
+    ]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        encoded = render_many(barcodes, format="PNG", executor=executor)
+    assert encoded == [barcode.to_image_bytes() for barcode in barcodes]
+
+    assert isinstance(gil_enabled(), bool)
+
+
+def test_shared_barcode_renders_concurrently():
+    barcode = CODE39("THREADS")
+    profiles = [{"module_width": width, "bar_height": 40} for width in (1, 2, 3)] * 20
+    expected = {
+        width: barcode.render(module_width=width, bar_height=40).tobytes()
+        for width in (1, 2, 3)
+    }
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        images = list(executor.map(lambda options: barcode.render(**options), profiles))
+
+    for options, image in zip(profiles, images):
+        assert image.tobytes() == expected[options["module_width"]]
+    assert barcode.BARCODE_SIZE == CODE39.BARCODE_SIZE
+    # Rendering doesn't write to the barcode
+    assert vars(barcode) == vars(CODE39("THREADS"))
+
+
+def test_render_variants():
+    barcode = EAN13("400638133393")
+    specs = [
+        {"size": (95, 50), "draw_text": False},
+        {"module_width": 4, "format": "GIF"},
+        {"draw_text": False},
+        RenderProfile(mode="L", rotation=90, format="JPEG", quality=90),
+        {"size": (190, 100), "draw_text": False, "format": "TIFF"},
+    ]
+
+    variants = render_variants(barcode, specs)
+    assert variants == [
+        barcode.to_image_bytes(profile=RenderProfile(**spec))
+        if isinstance(spec, dict)
+        else barcode.to_image_bytes(profile=spec)
+        for spec in specs
+    ]
+    assert variants[1].startswith(b"GIF")
+    assert render_variants(barcode, []) == []
+
+    with pytest.raises(RenderLimitError):
+        render_variants(barcode, [{}, {"size": (40000, 10), "max_dimension": 32768}])
+    with pytest.raises(ValueError):
+        render_variants(barcode, [{"rotation": 45}])
@@ -0,0 +1,197 @@
+import multiprocessing
+import os
+import pickle
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from pybarcodes import EAN13
+from pybarcodes.cache import DiskCache, SharedMemoryCache
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+def test_disk_cache_image_bytes(tmp_path: Path, monkeypatch):
+    cache = DiskCache(tmp_path / "cache")
+    barcode = EAN13("400638133393")
+
+    data = barcode.to_image_bytes(module_width=2, cache=cache)
+    assert data == barcode.to_image_bytes(module_width=2)
+
+    key = barcode.render_key("PNG", module_width=2)
+    assert cache.path(key).read_bytes() == data
+    assert cache.get(key) == data
+    assert cache.get("0" * 32) is None
+
+    # A second call is served from the cache without rendering
+    monkeypatch.setattr(EAN13, "render", None)
+    assert barcode.to_image_bytes(module_width=2, cache=cache) == data
+
+
+def test_disk_cache_save(tmp_path: Path):
+    cache = DiskCache(tmp_path / "cache")
+    barcode = EAN13("400638133393")
+
+    first = tmp_path / "first.png"
+    image = barcode.save(first, bar_height=80, cache=cache)
+    assert cache.size() == first.stat().st_size
+
+    second = tmp_path / "second.png"
+    cached_image = barcode.save(second, bar_height=80, cache=cache)
+    # A hit returns the rendered image, the same as a miss
+    assert cached_image.tobytes() == image.tobytes()
+    assert cached_image.format is image.format is None
+    assert second.read_bytes() == first.read_bytes()
+    key = barcode.render_key("PNG", bar_height=80)
+    assert not os.path.samefile(second, cache.path(key))
+    assert second.stat().st_mode == first.stat().st_mode
+
+    # Save arguments are part of the key, and copies replace the destination
+    barcode.save(second, bar_height=80, cache=cache, format="JPEG", quality=50)
+    jpeg = barcode.save(first, bar_height=80, cache=cache, format="JPEG", quality=50)
+    assert jpeg.tobytes() == image.tobytes()
+    assert not os.path.samefile(first, second)
+    with Image.open(first) as saved:
+        assert saved.format == "JPEG"
+    assert len(list((tmp_path / "cache").glob("*/*"))) == 2
+
+
+def test_disk_cache_link(tmp_path: Path):
+    cache = DiskCache(tmp_path / "cache", link=True)
+    barcode = EAN13("400638133393")
+    key = barcode.render_key("PNG")
+
+    path = tmp_path / "out.png"
+    plain = tmp_path / "plain.png"
+    barcode.save(plain)
+    barcode.save(path, cache=cache)
+    data = cache.get(key)
+    barcode.save(path, cache=cache)
+    barcode.save(path, cache=cache)
+    assert os.path.samefile(path, cache.path(key))
+    assert cache.is_entry_link(path)
+    assert not cache.is_entry_link(plain)
+    assert path.stat().st_mode == plain.stat().st_mode
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "cache",
+        "out.png",
+        "plain.png",
+    ]
+
+    # A save with the cache replaces the link instead of writing into the cache
+    barcode.save(path, module_width=7, cache=cache)
+    assert not os.path.samefile(path, cache.path(key))
+    assert cache.get(key) == data
+    assert barcode.to_image_bytes(cache=cache) == data
+
+    # Files hardlinked by the user are written through as always
+    other = tmp_path / "other.png"
+    os.link(plain, other)
+    barcode.save(plain, module_width=3)
+    assert os.path.samefile(plain, other)
+
+
+def test_disk_cache_eviction(tmp_path: Path):
+    cache = DiskCache(tmp_path, max_size=1000)
+
+    for i in range(5):
+        path = cache.put(f"{i:02d}" + "0" * 30, b"x" * 300)
+        os.utime(path, (i, i))
+    cache.get("04" + "0" * 30)
+
+    assert cache.size() <= 900
+    assert cache.get("00" + "0" * 30) is None
+    assert cache.get("04" + "0" * 30) == b"x" * 300
+
+    cache.clear()
+    assert cache.size() == 0
+    assert cache.copy_to("04" + "0" * 30, tmp_path / "missing.png") is False
+
+    with pytest.raises(ValueError):
+        DiskCache(tmp_path, max_size=0)
+
+
+def _read_in_child(cache: SharedMemoryCache, key: str, queue) -> None:
+    queue.put(cache.get(key))
+    cache.put("child", b"written by the child")
+    cache.close()
+
+
+def test_shared_memory_cache():
+    barcode = EAN13("400638133393")
+    with SharedMemoryCache(size=1024**2) as cache:
+        data = barcode.to_image_bytes(cache=cache)
+        key = barcode.render_key("PNG")
+        assert cache.get(key) == data
+        assert barcode.to_image_bytes(cache=cache) == data
+        assert len(cache) == 1
+
+        assert not cache.put("large", bytes(cache.max_entry_size + 1))
+        assert cache.get("missing") is None
+
+        context = multiprocessing.get_context("spawn")
+        attached = SharedMemoryCache(size=1024**2, lock=context.Lock())
+        queue = context.Queue()
+        attached.put(key, data)
+        child = context.Process(target=_read_in_child, args=(attached, key, queue))
+        child.start()
+        assert queue.get(timeout=30) == data
+        child.join(timeout=30)
+        assert attached.get("child") == b"written by the child"
+        attached.close()
+
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.get(key) is None
+
+
+def test_shared_memory_cache_clock(tmp_path: Path):
+    with SharedMemoryCache(size=64 * 1024) as cache:
+        same = SharedMemoryCache(cache.name, lock=cache.lock)
+        hot = [f"hot{i}" for i in range(3)]
+        for key in hot:
+            cache.put(key, key.encode() * 1000)
+
+        for i in range(100):
+            for key in hot:
+                assert same.get(key) == key.encode() * 1000
+            cache.put(f"cold{i}", bytes(5000))
+        # Entries that were read keep their place, the others are evicted
+        assert cache.get("cold0") is None
+        assert cache.get("cold99") == bytes(5000)
+        assert len(cache) < 100
+
+        assert same.copy_to("hot0", tmp_path / "hot.txt")
+        assert [path.name for path in tmp_path.iterdir()] == ["hot.txt"]
+        assert not same.copy_to("cold0", tmp_path / "cold.txt")
+        assert same.put_file("file", tmp_path / "hot.txt")
+        assert cache.get("file") == b"hot0" * 1000
+        same.close()
+
+    with pytest.raises(ValueError):
+        SharedMemoryCache(size=10)
+
+
+@pytest.mark.skipif(fcntl is None, reason="needs fcntl")
+def test_shared_memory_cache_lock_file():
+    with SharedMemoryCache(size=64 * 1024) as cache:
+        # A process attaching by name locks the same file
+        attached = SharedMemoryCache(cache.name)
+        assert attached.lock.path == cache.lock.path
+        with open(cache.lock.path, "ab") as other:
+            with attached.lock:
+                with pytest.raises(BlockingIOError):
+                    fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(other.fileno(), fcntl.LOCK_UN)
+
+        attached.put("key", b"value")
+        assert cache.get("key") == b"value"
+        assert pickle.loads(pickle.dumps(attached)).get("key") == b"value"
+        attached.close()
+        path = cache.lock.path
+    assert not os.path.exists(path)
@@ -1,6 +1,6 @@
 import pytest
 
-from pybarcodes import CODE39
+from pybarcodes import CODE39, CODE128
 from pybarcodes.exceptions import IncorrectFormat
 
 
@@ -34,3 +34,52 @@ def test_code39():
     stop_char = binary_string[-6:]
     assert start_char == "0 0110"
     assert stop_char == "0 0110"
+
+
+def test_code128():
+    barcode = CODE128("Wikipedia")
+
+    assert barcode == "Wikipedia"
+    assert barcode.symbols == [104, 55, 73, 75, 73, 80, 69, 68, 73, 65]
+    assert barcode.checksum == CODE128.calculate_checksum("Wikipedia") == 88
+    assert CODE128.calculate_checksum(barcode) == 88
+    assert CODE128.validate("abc\t123") is None
+
+    binary_string = barcode.get_binary_string
+    assert len(binary_string) == 11 * 11 + 13
+    assert binary_string[:11] == "11010010000"
+    assert binary_string[-13:] == "1100011101011"
+
+    with pytest.raises(IncorrectFormat):
+        CODE128("é")
+    with pytest.raises(IncorrectFormat):
+        CODE128("")
+    with pytest.raises(TypeError):
+        CODE128.calculate_checksum(123)
+
+
+@pytest.mark.parametrize(
+    ("code", "symbols"),
+    [
+        # Digit pairs are packed in code set C
+        ("12345678", [105, 12, 34, 56, 78]),
+        ("99", [105, 99]),
+        # An odd digit is written in code set B before switching to C
+        ("AB1234567", [104, 33, 34, 17, 99, 23, 45, 67]),
+        # A single control character is shifted instead of switching
+        ("a\x01b", [104, 65, 98, 65, 66]),
+        ("\x01\x02abc", [103, 65, 66, 100, 65, 66, 67]),
+        ("123", [104, 17, 18, 19]),
+    ],
+)
+def test_code128_code_set_switching(code, symbols):
+    assert CODE128.encode(code) == symbols
+
+
+def test_code128_is_narrower_than_code39():
+    code = "ASSET0012345678"
+
+    code128 = CODE128(code).render(module_width=1, draw_text=False)
+    code39 = CODE39(code).render(module_width=1, draw_text=False)
+
+    assert code128.width < code39.width
@@ -1,8 +1,12 @@
+import importlib.util
+
 import pytest
 
 from pybarcodes import EAN8, EAN13, EAN14, JAN
 from pybarcodes.exceptions import IncorrectFormat
 
+NUMPY = importlib.util.find_spec("numpy") is not None
+
 
 def test_ean13():
     code = "400638133393"
@@ -186,3 +190,68 @@ def test_jan():
 def test_ean_calculate_checksum_rejects_non_digits(barcode_type):
     with pytest.raises(IncorrectFormat):
         barcode_type.calculate_checksum("x" * barcode_type.BARCODE_LENGTH)
+
+
+@pytest.mark.parametrize(
+    ("barcode_type", "prefix"),
+    [(EAN8, "96"), (EAN13, "4006381"), (EAN13, ""), (EAN14, "1061414"), (JAN, "45")],
+)
+def test_ean_range(barcode_type, prefix):
+    width = barcode_type.BARCODE_LENGTH - len(prefix)
+    start, stop = 9990, 10015
+    expected = [
+        barcode_type.normalize(prefix + f"{i:0{width}d}") for i in range(start, stop)
+    ]
+
+    assert list(barcode_type.range(prefix, start, stop)) == expected
+    assert list(barcode_type.range(prefix, start, stop, patterns=True)) == [
+        barcode_type(code).get_binary_string for code in expected
+    ]
+
+
+def test_ean_range_bounds_and_chunks():
+    codes = list(EAN13.range("40063813339"))
+    assert len(codes) == 10
+    assert codes[3] == "4006381333931"
+    assert list(EAN13.range("40063813339", 4, 4)) == []
+
+    chunks = list(EAN8.range_chunks("963850", chunk_size=4))
+    assert chunks[0] == b"96385005\n96385012\n96385029\n96385036\n"
+    assert b"".join(chunks).split() == [code.encode() for code in EAN8.range("963850")]
+
+    with pytest.raises(IncorrectFormat):
+        EAN13.range("4006381333931")
+    with pytest.raises(IncorrectFormat):
+        EAN13.range("40a")
+    with pytest.raises(IncorrectFormat):
+        JAN.range("40")
+    with pytest.raises(ValueError):
+        EAN13.range("4006381", 10, 5)
+    with pytest.raises(ValueError):
+        EAN13.range("4006381", 0, 100001)
+    with pytest.raises(ValueError):
+        next(EAN13.range_chunks("4006381", chunk_size=0))
+
+
+@pytest.mark.parametrize(
+    "use_numpy",
+    [False, pytest.param(True, marks=pytest.mark.skipif(not NUMPY, reason="numpy"))],
+)
+@pytest.mark.parametrize(
+    "barcode_type, prefix",
+    [(EAN13, "4006381"), (EAN8, "96"), (EAN14, "4006381"), (JAN, "4901234")],
+)
+def test_ean_encode_many(barcode_type, prefix, use_numpy):
+    codes = list(barcode_type.range(prefix, 0, 40))
+    # Codes without a check digit, or with a wrong one, are normalized
+    codes += [codes[0][:-1], codes[1][:-1] + str((int(codes[1][-1]) + 1) % 10)]
+
+    modules = barcode_type.encode_many(codes, use_numpy=use_numpy)
+
+    binary_strings = [barcode_type(code).get_binary_string for code in codes]
+    assert modules.shape == (len(codes), len(binary_strings[0]))
+    assert modules.tolist() == [[int(m) for m in s] for s in binary_strings]
+
+    assert len(barcode_type.encode_many([], use_numpy=use_numpy)) == 0
+    with pytest.raises(IncorrectFormat):
+        barcode_type.encode_many([codes[0], "123"], use_numpy=use_numpy)
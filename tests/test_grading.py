@@ -0,0 +1,46 @@
+import pytest
+from PIL import Image, ImageFilter
+
+from pybarcodes import CODE39, CODE128, EAN8, EAN13, EAN14, JAN
+from pybarcodes.grading import grade, grade_scanline
+
+
+@pytest.mark.parametrize(
+    "barcode_type, code",
+    [
+        (EAN13, "4006381333931"),
+        (EAN8, "96385074"),
+        (EAN14, "14006381333938"),
+        (JAN, "4901234567894"),
+        (CODE39, "HELLO-1"),
+    ],
+)
+def test_grade_renders(barcode_type, code):
+    barcode = barcode_type(code)
+    for mode in ("RGB", "1"):
+        result = grade(barcode.render(mode=mode))
+        assert result.grade == "A"
+        assert result.value == 4
+        assert result.code == barcode.code
+        assert result.symbology == barcode_type.__name__
+        assert len(result.scans) == 10
+
+
+def test_grade_scan():
+    image = EAN13("400638133393").render().convert("L")
+    image = image.filter(ImageFilter.GaussianBlur(1.5)).point(lambda v: 60 + v // 2)
+    result = grade(image, EAN13, scanlines=4)
+    assert result.grade in "BCD"
+    assert result.code == "4006381333931"
+    assert all(scan.symbol_contrast < 0.55 for scan in result.scans)
+
+
+def test_grade_failures():
+    assert grade(Image.new("L", (200, 100), 255)).grade == "F"
+    assert grade(CODE128("abc").render()).code is None
+    assert grade_scanline(bytes(50))[0].grade == "F"
+
+    with pytest.raises(ValueError):
+        grade(CODE128("abc").render(), CODE128)
+    with pytest.raises(ValueError):
+        grade(EAN13("400638133393").render(), scanlines=0)
@@ -1,10 +1,13 @@
+import socket
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from pathlib import Path
 
 import pytest
 from PIL import Image
 
-from pybarcodes import CODE39, EAN13
+from pybarcodes import CODE39, CODE128, EAN8, EAN13, RenderProfile, tiles
+from pybarcodes.exceptions import RenderLimitError
 
 
 def assert_barcode_image(image: Image.Image) -> None:
@@ -99,3 +102,235 @@ def test_image_bytes_outputs():
     with Image.open(image_buffer) as image_file:
         assert image_file.size == (len(barcode.get_binary_string) * 3 + 40, 80)
         assert image_file.mode == "RGB"
+
+
+def test_image_stream_outputs(tmp_path: Path):
+    barcode = CODE128("Hi 12345")
+    expected = barcode.to_image_bytes("GIF", module_width=2)
+
+    view = barcode.to_image_buffer("GIF", module_width=2)
+    assert isinstance(view, memoryview)
+    assert view == expected
+
+    path = tmp_path / "image.gif"
+    with open(path, "wb") as file:
+        barcode.write_image(file, "GIF", module_width=2)
+    assert path.read_bytes() == expected
+
+    left, right = socket.socketpair()
+    with left, right:
+        barcode.write_image(left, "GIF", module_width=2)
+        left.shutdown(socket.SHUT_WR)
+        received = b"".join(iter(lambda: right.recv(65536), b""))
+    assert received == expected
+
+
+def test_ean_tile_atlas(monkeypatch):
+    monkeypatch.setattr(tiles, "MAX_PROFILES", 2)
+    tiles.clear_tile_atlases()
+
+    profile = RenderProfile(module_width=2, bar_height=50, draw_text=False)
+    for code in ("400638133393", "629104150021", "123456789012"):
+        EAN13(code).render(profile=profile)
+    EAN8("9638507").render(profile=profile)
+
+    atlas = tiles.get_tile_atlas(2, 50)
+    # 3 guard patterns (left and right are the same) and 10 digits in 3 codings
+    assert 0 < len(atlas) <= 32
+    assert atlas.tile("101").size == (6, 50)
+    assert atlas.tile("101").getpixel((2, 0)) == (255, 255, 255)
+    assert atlas.tile("101").getpixel((4, 49)) == (0, 0, 0)
+
+    # Profiles are evicted once there are too many of them
+    tiles.get_tile_atlas(3, 50)
+    tiles.get_tile_atlas(4, 50)
+    assert tiles.get_tile_atlas(2, 50) is not atlas
+    # but a profile keeps the atlases it uses
+    assert profile.tile_atlas(2, 50) is atlas
+
+
+def test_ean_tiles_match_module_rendering():
+    barcode = EAN13("400638133393")
+    image = barcode.render(module_width=2, bar_height=10, quiet_zone=1, draw_text=False)
+
+    modules = [image.getpixel((1 + i * 2, 5)) for i in range(95)]
+    expected = [
+        (0, 0, 0) if m == "1" else (255, 255, 255) for m in barcode.get_binary_string
+    ]
+    assert modules == expected
+
+
+@pytest.mark.parametrize(
+    "barcode", [EAN13("400638133393"), CODE39("ABC-123 $"), CODE128("Hi 12345")]
+)
+def test_module_runs_match_rendering(barcode):
+    runs = barcode._get_module_runs()
+    image = barcode.render(module_width=1, quiet_zone=1, bar_height=2, draw_text=False)
+
+    assert image.width == runs.width + 2
+    row = [image.getpixel((x + 1, 0)) == (0, 0, 0) for x in range(runs.width)]
+    expected = [False] * runs.width
+    for start, width in runs.bars:
+        expected[start : start + width] = [True] * width
+    assert row == expected
+
+
+def test_render_profile():
+    profile = RenderProfile(
+        module_width=2, bar_height=50, quiet_zone=4, font_size=12, format="jpeg"
+    )
+    barcodes = [EAN13("400638133393"), CODE39("ABC123"), CODE128("Hi 12345")]
+
+    for barcode in barcodes:
+        image = barcode.render(profile=profile)
+        expected = barcode.render(
+            module_width=2, bar_height=50, quiet_zone=4, font_size=12
+        )
+        assert image.tobytes() == expected.tobytes()
+
+    # Options are resolved once per barcode type
+    assert profile.options(EAN13("629104150021")) is profile.options(barcodes[0])
+    assert list(profile._fonts) == [12]
+
+    data = barcodes[0].to_image_bytes(profile=profile)
+    assert Image.open(BytesIO(data)).format == "JPEG"
+    assert barcodes[0].to_image_bytes("PNG", profile=profile).startswith(b"\x89PNG")
+
+    with pytest.raises(TypeError):
+        barcodes[0].render(module_width=3, profile=profile)
+
+
+@pytest.mark.parametrize("mode", ["1", "L"])
+def test_render_modes(mode):
+    barcode = EAN13("400638133393")
+    options = {"module_width": 1, "quiet_zone": 1, "bar_height": 2, "draw_text": False}
+    profile = RenderProfile(mode=mode, **options)
+
+    image = barcode.render(profile=profile)
+    expected = barcode.render(**options)
+    assert image.mode == mode
+    assert image.size == expected.size
+    assert image.tobytes() == expected.convert(mode).tobytes()
+    assert barcode.render_key(profile=profile) != barcode.render_key(**options)
+    assert barcode.render(mode=mode, **options).tobytes() == image.tobytes()
+    assert barcode.render(mode=mode).mode == mode
+
+
+@pytest.mark.parametrize("rotation", [90, 180, 270])
+@pytest.mark.parametrize(
+    "barcode", [EAN8("9638507"), CODE39("ABC-123"), CODE128("Hi 12345")]
+)
+def test_rotated_rendering(barcode, rotation):
+    transpose = getattr(Image, "Transpose", Image)
+    method = getattr(transpose, f"ROTATE_{rotation}")
+
+    for mode in ("RGB", "1"):
+        image = barcode.render(mode=mode, rotation=rotation)
+        expected = barcode.render(mode=mode).transpose(method)
+        assert image.size == expected.size
+        assert image.tobytes() == expected.tobytes()
+
+    # The boxes of the measurement are rotated too
+    upright = barcode.measure()
+    measurement = barcode.measure(rotation=rotation)
+    image = Image.new("1", (upright.width, upright.height))
+    image.paste(1, upright.text)
+    assert image.transpose(method).getbbox() == measurement.text
+    assert measurement.raster_bytes < upright.raster_bytes
+
+    profile = RenderProfile(rotation=rotation, size=(100, 200))
+    assert barcode.render(profile=profile).size == (100, 200)
+    assert barcode.render_key(profile=profile) != barcode.render_key(size=(100, 200))
+
+
+@pytest.mark.parametrize("font_size", [7, 11, 17, 26])
+@pytest.mark.parametrize("mode", ["1", "L", "RGB"])
+def test_rotated_text(mode, font_size):
+    barcode = CODE39("AB-12 $")
+    transpose = getattr(Image, "Transpose", Image)
+    upright = barcode.render(mode=mode, font_size=font_size)
+
+    for rotation in (90, 180, 270):
+        method = getattr(transpose, f"ROTATE_{rotation}")
+        image = barcode.render(mode=mode, font_size=font_size, rotation=rotation)
+        assert image.tobytes() == upright.transpose(method).tobytes()
+
+
+@pytest.mark.parametrize("rotation", [0, 90])
+def test_threads_share_the_fonts_of_a_profile(rotation):
+    profile = RenderProfile(font_size=14, rotation=rotation)
+    codes = list(EAN13.range("4006381", 0, 64))
+    expected = [EAN13(code).render(profile=profile).tobytes() for code in codes]
+
+    def render(code):
+        return EAN13(code).render(profile=profile).tobytes()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(render, codes)) == expected
+
+
+def test_render_profile_rejects_invalid_options():
+    with pytest.raises(ValueError):
+        RenderProfile(module_width=0)
+    with pytest.raises(ValueError):
+        RenderProfile(size=(10, -1))
+    with pytest.raises(ValueError):
+        RenderProfile(mode="CMYK")
+    with pytest.raises(ValueError):
+        RenderProfile(rotation=45)
+    with pytest.raises(ValueError):
+        RenderProfile(format="NOPE")
+
+
+@pytest.mark.parametrize(
+    "options", [{}, {"module_width": 2, "font_size": 12}, {"size": (300, 150)}]
+)
+@pytest.mark.parametrize(
+    "barcode", [EAN13("400638133393"), CODE39("ABC-123"), CODE128("Hi 12345")]
+)
+def test_measure_matches_rendering(barcode, options):
+    measurement = barcode.measure(**options)
+    image = barcode.render(**options).convert("L")
+
+    assert image.size == (measurement.width, measurement.height)
+    assert measurement.raster_bytes >= image.width * image.height * 4
+
+    left, top, right, bottom = measurement.bars
+    ink = image.point(lambda value: 255 - value)
+    bars = ink.crop((left, top, right, bottom)).getbbox()
+    assert bars[0] == 0 and bars[3] == bottom - top
+    assert ink.crop((0, 0, image.width, top)).getbbox() is None
+
+    # The text is drawn within its box
+    text = ink.crop((0, bottom, image.width, image.height)).getbbox()
+    assert text is not None
+    assert measurement.text[0] <= text[0] + 3 and text[2] <= measurement.text[2]
+    assert barcode.measure(draw_text=False, **options).text is None
+
+
+def test_render_limits(monkeypatch):
+    barcode = EAN13("400638133393")
+
+    # Renders aren't limited by default
+    assert barcode.render(size=(40000, 1)).width == 40000
+
+    with pytest.raises(RenderLimitError):
+        barcode.render(profile=RenderProfile(max_dimension=100))
+    with pytest.raises(RenderLimitError):
+        barcode.render(profile=RenderProfile(max_raster_bytes=1024))
+    with pytest.raises(ValueError):
+        RenderProfile(max_dimension=0)
+
+    monkeypatch.setattr("pybarcodes.profile.MAX_DIMENSION", 32768)
+    monkeypatch.setattr("pybarcodes.profile.MAX_RASTER_BYTES", 256 * 1024**2)
+    with pytest.raises(RenderLimitError):
+        barcode.render(module_width=3000)
+    with pytest.raises(RenderLimitError):
+        barcode.render(size=(40000, 10))
+
+    # The measurement of a render over the limits is still available
+    assert barcode.measure(module_width=3000).width == 95 * 3000 + 100
+
+    # A profile can turn the module limits off
+    profile = RenderProfile(size=(40000, 1), max_dimension=None)
+    assert barcode.render(profile=profile).width == 40000
@@ -0,0 +1,131 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from pybarcodes import EAN13
+from pybarcodes.jobs import RenderJob, main
+
+OPTIONS = {"module_width": 1, "bar_height": 10, "draw_text": False}
+
+
+def write_codes(path: Path) -> list[str]:
+    codes = list(EAN13.range("4006381", 0, 24))
+    codes[3] = "not a code"
+    codes[12] = ""
+    path.write_text("\n".join(codes) + "\n")
+    return codes
+
+
+class Crash(Exception):
+    pass
+
+
+def test_job_renders_every_line(tmp_path: Path):
+    codes = write_codes(tmp_path / "codes.txt")
+    job = RenderJob(
+        tmp_path / "codes.txt",
+        "ean13",
+        tmp_path / "out",
+        chunk_size=10,
+        options=OPTIONS,
+    )
+
+    reports = []
+    result = job.run(progress=reports.append)
+
+    assert job.chunks()[1] == (137, 264, 10)
+    assert [report.completed for report in reports] == [1, 2, 3]
+    assert result[:5] == (3, 3, 22, 0, 1)
+    assert result.eta == 0
+
+    image = tmp_path / "out" / "000002" / "000000023.png"
+    with Image.open(image) as img:
+        assert img.tobytes() == EAN13(codes[23]).render(**OPTIONS).tobytes()
+    assert not (tmp_path / "out" / "000000" / "000000003.png").exists()
+
+    assert job.completed() == {0, 1, 2}
+    assert job.run()[:5] == (3, 3, 0, 0, 0)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_job_resumes_after_a_crash(tmp_path: Path, max_workers):
+    write_codes(tmp_path / "codes.txt")
+    job = RenderJob(
+        tmp_path / "codes.txt",
+        EAN13,
+        tmp_path / "out",
+        format="gif",
+        chunk_size=10,
+        options=OPTIONS,
+        max_workers=max_workers,
+    )
+
+    def crash(report):
+        raise Crash
+
+    with pytest.raises(Crash):
+        job.run(progress=crash)
+    (done,) = job.completed()
+
+    # A chunk that was cut short, with a broken image and a temporary file
+    pending = [n for n in range(3) if n != done][0]
+    directory = tmp_path / "out" / f"{pending:06d}"
+    directory.mkdir(exist_ok=True)
+    images = sorted(directory.glob("*.gif"))
+    broken = images[0] if images else directory / f"{pending * 10:09d}.gif"
+    broken.write_bytes(b"GIF89a")
+    (directory / "000000000.gif.1.tmp").write_bytes(b"")
+    with open(job.checkpoint, "a") as file:
+        file.write("2")
+
+    result = job.run()
+    assert result.completed == 3
+    # Chunks have 9, 9 and 4 valid codes
+    assert result.labels + result.reused == 22 - [9, 9, 4][done]
+    assert not list(directory.glob("*.tmp"))
+    with Image.open(broken) as img:
+        img.verify()
+    assert job.completed() == {0, 1, 2}
+
+
+def test_job_checkpoint_of_an_edited_input(tmp_path: Path):
+    codes = write_codes(tmp_path / "codes.txt")
+    job = RenderJob(tmp_path / "codes.txt", EAN13, tmp_path / "out", chunk_size=10)
+    job.run()
+
+    # Same size, same modification time, different codes
+    stat = (tmp_path / "codes.txt").stat()
+    codes[0], codes[1] = codes[1], codes[0]
+    (tmp_path / "codes.txt").write_text("\n".join(codes) + "\n")
+    os.utime(tmp_path / "codes.txt", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    with pytest.raises(ValueError):
+        job.completed()
+
+
+def test_job_manifest(tmp_path: Path, capsys):
+    write_codes(tmp_path / "codes.txt")
+    manifest = {
+        "input": "codes.txt",
+        "symbology": "EAN13",
+        "output": "out",
+        "chunk_size": 100,
+        "options": OPTIONS,
+        "checkpoint": "job.checkpoint",
+    }
+    (tmp_path / "job.json").write_text(json.dumps(manifest))
+
+    main([str(tmp_path / "job.json")])
+    assert "1/1 chunks, 22 rendered" in capsys.readouterr().err
+    assert (tmp_path / "job.checkpoint").exists()
+
+    # A checkpoint can't be reused by a job with different options
+    manifest["options"] = {**OPTIONS, "bar_height": 20}
+    (tmp_path / "job.json").write_text(json.dumps(manifest))
+    with pytest.raises(ValueError):
+        RenderJob.from_manifest(tmp_path / "job.json").run()
+
+    with pytest.raises(ValueError):
+        RenderJob(tmp_path / "codes.txt", EAN13, tmp_path, options={"mode": "P"})
@@ -0,0 +1,88 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from pybarcodes.loadtest import LoadCase, _fetch, main, run_load_test
+from pybarcodes.server import RenderServer
+
+MIX = [
+    LoadCase("ean13", weight=2),
+    LoadCase("code128", 20, {"module_width": 1, "size": (300, 100)}, "GIF"),
+    LoadCase("code39", 6, {"draw_text": False}),
+]
+
+
+@pytest.mark.parametrize("mode", ["thread", "process", "async"])
+def test_load_test_modes(mode):
+    report = run_load_test(
+        MIX, mode, concurrency=4, requests=30, sample_interval=0.05, seed=1
+    )
+
+    assert report["requests"] == 30
+    assert report["errors"] == 0
+    assert sum(case["requests"] for case in report["cases"]) == 30
+    latency = report["latency"]
+    assert 0 < latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+    assert report["throughput"] > 0
+    assert report["timeline"][-1]["completed"] == 30
+    assert report["timeline"][-1]["rss"] > 0
+    json.dumps(report)
+    assert LoadCase("ean8").options is None
+
+
+def test_load_test_rate(tmp_path: Path):
+    report = run_load_test(MIX, rate=200, duration=0.1, concurrency=2)
+    # Requests are started on a schedule, for the duration
+    assert report["requests"] == 20
+    assert report["duration"] >= 0.095
+
+    # Invalid options of a case are counted as errors
+    mix = [LoadCase("ean8", options={"module_width": 0})]
+    assert run_load_test(mix, "async", requests=3)["errors"] == 3
+
+    with pytest.raises(ValueError):
+        run_load_test([])
+    with pytest.raises(ValueError):
+        run_load_test(MIX, "fibers")
+    with pytest.raises(ValueError):
+        run_load_test(MIX, rate=0)
+    with pytest.raises(ValueError):
+        run_load_test([LoadCase("qr")])
+
+    (tmp_path / "mix.json").write_text(json.dumps([{"symbology": "jan"}]))
+    output = tmp_path / "report.json"
+    main(
+        [
+            "--mix",
+            str(tmp_path / "mix.json"),
+            "--requests",
+            "5",
+            "--output",
+            str(output),
+        ]
+    )
+    assert json.loads(output.read_text())["cases"][0]["requests"] == 5
+
+
+def test_failed_connections_are_replaced():
+    async def main():
+        async with RenderServer(port=0) as server:
+            connections = asyncio.Queue()
+            reader, writer = await asyncio.open_connection(*server.address)
+            reader.feed_eof()
+            connections.put_nowait((reader, writer))
+
+            with pytest.raises(asyncio.IncompleteReadError):
+                await _fetch(connections, server.address, "/stats")
+            assert connections.get_nowait() is None
+
+            # The next request opens a new connection in its place
+            connections.put_nowait(None)
+            assert await _fetch(connections, server.address, "/stats") > 0
+            reader, writer = connections.get_nowait()
+            writer.close()
+            await writer.wait_closed()
+
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+import re
+import zlib
+from io import BytesIO
+
+import pytest
+
+from pybarcodes import CODE128, EAN13
+from pybarcodes.pdf import PDFWriter, write_pdf
+
+
+def read_objects(document: bytes) -> dict[int, bytes]:
+    xref = int(document.rsplit(b"startxref\n", 1)[1].split()[0])
+    header, *entries = document[xref:].split(b"trailer")[0].splitlines()[1:]
+    assert header.startswith(b"0 ")
+
+    objects = {}
+    for number, entry in enumerate(entries[1:], start=1):
+        offset = int(entry.split()[0])
+        assert document[offset:].startswith(f"{number} 0 obj".encode())
+        objects[number] = document[offset : document.index(b"endobj", offset)]
+    return objects
+
+
+def test_pdf_pages_and_xref():
+    stream = BytesIO()
+    barcodes = [EAN13(code) for code in EAN13.range("4006381", 0, 13)]
+    pages = write_pdf(barcodes, stream, columns=2, rows=3)
+
+    document = stream.getvalue()
+    assert pages == 3
+    assert document.startswith(b"%PDF-1.4")
+    assert document.endswith(b"%%EOF\n")
+
+    objects = read_objects(document)
+    assert b"/Count 3" in objects[2]
+    assert b"/BaseFont /Courier" in objects[3]
+    assert len([obj for obj in objects.values() if b"/Type /Page " in obj]) == 3
+
+    content = objects[4].split(b"stream\n", 1)[1].rsplit(b"\nendstream", 1)[0]
+    content = zlib.decompress(content).decode()
+    assert content.count(" cm\n") == 6
+    assert f"({barcodes[0].code}) Tj" in content
+
+
+def test_pdf_label_geometry():
+    stream = BytesIO()
+    barcode = CODE128("A(1)")
+    with PDFWriter(
+        stream, compress=False, module_width=2, bar_height=50, quiet_zone=10
+    ) as writer:
+        writer.add(barcode)
+
+    document = stream.getvalue()
+    runs = barcode._get_module_runs()
+    rectangles = re.findall(rb"(\d+) (\d+) (\d+) 50 re", document)
+    assert len(rectangles) == len(runs.bars)
+    assert rectangles[0] == (b"10", b"50", str(runs.bars[0][1] * 2).encode())
+    assert b"(A\\(1\\)) Tj" in document
+
+    assert writer.pages == 1
+    writer.close()
+    with pytest.raises(ValueError):
+        writer.add(barcode)
+
+
+def test_empty_pdf_has_a_page():
+    stream = BytesIO()
+    assert write_pdf([], stream, draw_text=False) == 1
+    assert b"/Count 1" in stream.getvalue()
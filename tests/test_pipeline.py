@@ -0,0 +1,98 @@
+import random
+import threading
+import time
+
+import pytest
+
+from pybarcodes import EAN13
+from pybarcodes.exceptions import IncorrectFormat
+from pybarcodes.pipeline import Stage, _encode, _rasterize, pipeline, render_pipeline
+from pybarcodes.profile import get_render_profile
+
+
+def jitter(value):
+    time.sleep(random.random() / 1000)
+    return value
+
+
+def test_pipeline_keeps_input_order():
+    stages = [Stage(jitter, 4), Stage(lambda value: value * 2, 3), Stage(jitter, 2)]
+    assert list(pipeline(range(200), stages, queue_size=4)) == list(range(0, 400, 2))
+    assert list(pipeline(range(5), [])) == list(range(5))
+
+
+def test_pipeline_backpressure():
+    read = []
+
+    def items():
+        for item in range(1000):
+            read.append(item)
+            yield item
+
+    results = pipeline(items(), [Stage(jitter, 2)], queue_size=2)
+    assert next(results) == 0
+    time.sleep(0.1)
+    # Only a bounded number of items is read ahead of the consumer
+    assert len(read) <= 2 * 2 + 2
+    results.close()
+
+    assert threading.active_count() < 5
+
+
+def test_pipeline_errors_are_raised_in_order():
+    def invert(value):
+        return 1 / value
+
+    results = pipeline([4, 2, 0, 1], [Stage(invert, 2)])
+    assert next(results) == 0.25
+    assert next(results) == 0.5
+    with pytest.raises(ZeroDivisionError):
+        next(results)
+
+    def items():
+        yield 1
+        raise KeyError("broken")
+
+    results = pipeline(items(), [Stage(jitter)])
+    assert next(results) == 1
+    with pytest.raises(KeyError):
+        next(results)
+
+    with pytest.raises(ValueError):
+        pipeline([], [Stage(jitter, 0)])
+
+
+@pytest.mark.parametrize("encode_processes", [False, True])
+def test_render_pipeline(encode_processes):
+    codes = list(EAN13.range("4006381", 0, 30))
+    options = {"module_width": 2, "bar_height": 40, "draw_text": False}
+
+    images = render_pipeline(
+        codes,
+        EAN13,
+        "PNG",
+        encode_workers=2,
+        encode_processes=encode_processes,
+        **options,
+    )
+    assert list(images) == [
+        EAN13(code).to_image_bytes("PNG", **options) for code in codes
+    ]
+
+    images = render_pipeline(["400638133393", "bad"], EAN13, "GIF")
+    assert next(images).startswith(b"GIF")
+    with pytest.raises(IncorrectFormat):
+        next(images)
+
+
+def test_rasterize_draws_the_encoded_bars(monkeypatch):
+    options = {"module_width": 2, "size": (300, 120)}
+    encoded = _encode(EAN13, options, "400638133393")
+    profile = get_render_profile(**options)
+
+    # Rasterizing doesn't encode the code again
+    monkeypatch.setattr(EAN13, "_get_segments", None)
+    monkeypatch.setattr(EAN13, "_module_runs", None)
+    image = _rasterize(profile, encoded)
+    monkeypatch.undo()
+    assert image.tobytes() == EAN13("400638133393").render(**options).tobytes()
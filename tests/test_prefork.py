@@ -0,0 +1,67 @@
+import gc
+import os
+import signal
+
+import pytest
+
+import pybarcodes
+from pybarcodes import CODE39, EAN13, RenderProfile, tiles
+from pybarcodes.ean import _range_suffixes
+from pybarcodes.profile import get_render_profile
+
+
+def test_warmup_fills_profiles():
+    profile = RenderProfile(bar_height=40, format="GIF")
+    profiles = pybarcodes.warmup(
+        [{"module_width": 3, "draw_text": False}, profile], freeze=False
+    )
+
+    # Keyword renders share the warmed profile
+    assert profiles[0] is get_render_profile(module_width=3, draw_text=False)
+    assert profiles[1] is profile
+
+    # Every guard and digit of EAN barcodes is built, the outer guards are the same
+    atlas = profiles[0].tile_atlas(3, EAN13.BARCODE_SIZE[1])
+    assert len(atlas) == 2 + 30
+    assert profile._fonts
+
+    class LABEL(CODE39):
+        pass
+
+    assert len(pybarcodes.warmup(barcode_types=[LABEL], freeze=False)) == 1
+    with pytest.raises(ValueError):
+        pybarcodes.warmup(barcode_types=[pybarcodes.Code], freeze=False)
+
+
+def test_warmup_range_tables():
+    _range_suffixes.cache_clear()
+    pybarcodes.warmup(barcode_types=[EAN13], freeze=False)
+    assert _range_suffixes.cache_info().currsize == 0
+
+    pybarcodes.warmup(barcode_types=[EAN13], freeze=False, range_tables=True)
+    assert _range_suffixes.cache_info().currsize == 1
+
+
+def test_warmup_freezes():
+    try:
+        pybarcodes.warmup(barcode_types=[EAN13])
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_locks_are_reset_after_fork():
+    atlas = tiles.get_tile_atlas(2, 20)
+
+    # Locks held by the parent while it forks
+    with tiles._atlases_lock, atlas._lock:
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            signal.alarm(10)
+            tiles.get_tile_atlas(2, 20).tile("0101")
+            EAN13("400638133393").render(module_width=2, bar_height=20)
+            os._exit(0)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
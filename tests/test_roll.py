@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from pybarcodes import CODE128, EAN13
+from pybarcodes.roll import RollWriter, write_roll
+
+OPTIONS = {"module_width": 2, "bar_height": 20}
+
+
+@pytest.mark.parametrize("format", ["PBM", "TIFF", "raw"])
+def test_write_roll(tmp_path: Path, format):
+    barcodes = [EAN13(code) for code in EAN13.range("4006381", 0, 3)]
+    barcodes.append(CODE128("roll"))
+    path = tmp_path / "roll"
+
+    height = write_roll(barcodes, path, width=301, format=format, gap=5, **OPTIONS)
+
+    labels = [barcode.render(mode="1", **OPTIONS) for barcode in barcodes]
+    assert height == sum(label.height for label in labels) + 5 * 3
+
+    if format == "raw":
+        assert path.stat().st_size == height * 38
+        roll = Image.frombytes("1", (301, height), path.read_bytes(), "raw", "1;I")
+    else:
+        roll = Image.open(path)
+        assert roll.size == (301, height)
+
+    top = 0
+    for label in labels:
+        left = (301 - label.width) // 2
+        box = (left, top, left + label.width, top + label.height)
+        assert roll.crop(box).convert("1").tobytes() == label.tobytes()
+        top += label.height + 5
+    assert roll.convert("L").crop((0, 0, 1, height)).getextrema() == (255, 255)
+
+
+def test_roll_errors(tmp_path: Path):
+    with pytest.raises(ValueError):
+        RollWriter(tmp_path / "roll.gif", 300, format="GIF")
+    with pytest.raises(ValueError):
+        RollWriter(tmp_path / "roll.pbm", 300, mode="L")
+
+    # A roll without labels isn't left behind
+    with pytest.raises(ValueError, match="no labels"):
+        with RollWriter(tmp_path / "roll.pbm", 100) as writer:
+            with pytest.raises(ValueError):
+                writer.add(EAN13("400638133393"))
+    assert writer.height == 0
+    assert not (tmp_path / "roll.pbm").exists()
+    with pytest.raises(ValueError):
+        writer.add(EAN13("400638133393"))
+
+    # An error in the block isn't hidden by the roll being empty
+    with pytest.raises(ValueError, match="wider"):
+        write_roll([EAN13("400638133393")], tmp_path / "roll.tiff", width=100)
@@ -0,0 +1,97 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from pybarcodes import EAN13
+from pybarcodes.jobs import RenderJob
+from pybarcodes.scheduler import BULK, INTERACTIVE, PriorityClass, PriorityScheduler
+
+
+def blocked(scheduler: PriorityScheduler, priority_class: str = BULK):
+    """Hold a worker until the returned event is set"""
+
+    release = threading.Event()
+    future = scheduler.submit(priority_class, release.wait)
+    return release, future
+
+
+def test_interactive_goes_first():
+    order = []
+    with PriorityScheduler(max_workers=1) as scheduler:
+        release, first = blocked(scheduler)
+        futures = [scheduler.submit(BULK, order.append, f"b{i}") for i in range(3)]
+        futures.append(scheduler.submit(INTERACTIVE, order.append, "i"))
+
+        stats = scheduler.stats()
+        assert stats[BULK].queued == 3 and stats[BULK].running == 1
+        assert stats[INTERACTIVE].queued == 1
+
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+
+    assert order == ["i", "b0", "b1", "b2"]
+    assert scheduler.stats()[BULK].completed == 4
+
+
+def test_class_limits_and_aging():
+    with PriorityScheduler(max_workers=2) as scheduler:
+        # The bulk class leaves one of the two workers free
+        release, _ = blocked(scheduler)
+        second = scheduler.submit(BULK, time.monotonic)
+        interactive = scheduler.submit(INTERACTIVE, time.monotonic)
+        assert interactive.result(timeout=5)
+        assert not second.done()
+        release.set()
+        second.result(timeout=5)
+
+    order = []
+    classes = {"high": PriorityClass(0), "low": PriorityClass(1)}
+    with PriorityScheduler(1, classes, aging=0.01) as scheduler:
+        release, _ = blocked(scheduler, "low")
+        scheduler.submit("low", order.append, "low")
+        time.sleep(0.05)
+        scheduler.submit("high", order.append, "high")
+        release.set()
+    # The low call waited long enough to go before the high one
+    assert order == ["low", "high"]
+
+
+def test_errors_and_cancelling():
+    scheduler = PriorityScheduler(max_workers=1)
+    with pytest.raises(ValueError):
+        scheduler.submit("other", print)
+    with pytest.raises(ValueError):
+        scheduler.executor("other")
+    with pytest.raises(ZeroDivisionError):
+        scheduler.submit(INTERACTIVE, divmod, 1, 0).result(timeout=5)
+
+    release, _ = blocked(scheduler)
+    queued = scheduler.submit(BULK, print)
+    assert queued.cancel()
+    release.set()
+    scheduler.shutdown()
+    with pytest.raises(RuntimeError):
+        scheduler.submit(BULK, print)
+
+    with pytest.raises(ValueError):
+        PriorityScheduler(max_workers=1, classes={})
+    with pytest.raises(ValueError):
+        PriorityScheduler(max_workers=1, aging=0)
+
+
+def test_job_on_scheduler(tmp_path: Path):
+    codes = list(EAN13.range("4006381", 0, 12))
+    (tmp_path / "codes.txt").write_text("\n".join(codes) + "\n")
+    job = RenderJob(tmp_path / "codes.txt", EAN13, tmp_path / "out", chunk_size=4)
+
+    with PriorityScheduler(max_workers=2) as scheduler:
+        executor = scheduler.executor(BULK)
+        assert executor._max_workers == 1
+        report = job.run(executor=executor)
+        assert scheduler.stats()[BULK].completed == 3
+
+    assert report.completed == report.chunks == 3
+    assert report.labels == 12
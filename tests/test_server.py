@@ -0,0 +1,151 @@
+import asyncio
+import http.client
+import json
+from io import BytesIO
+
+from PIL import Image
+
+from pybarcodes import EAN13
+from pybarcodes.cache import SharedMemoryCache
+from pybarcodes.server import RenderServer
+
+
+def request(address, path, method="GET", headers=None):
+    connection = http.client.HTTPConnection(*address, timeout=10)
+    try:
+        connection.request(method, path, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+def run_with_server(callback, **server_kwargs):
+    async def main():
+        async with RenderServer(port=0, **server_kwargs) as server:
+            return server, await asyncio.to_thread(callback, server.address)
+
+    return asyncio.run(main())
+
+
+def test_server_renders_images_with_etags():
+    path = "/ean13/400638133393.png?module_width=3&bar_height=80&draw_text=0"
+
+    def requests(address):
+        first = request(address, path)
+        etag = first[1]["ETag"]
+        second = request(address, path, headers={"If-None-Match": etag})
+        weak = request(address, path, headers={"If-None-Match": f'"x", W/{etag}'})
+        head = request(address, path, method="HEAD")
+        return first, second, weak, head
+
+    server, (first, second, weak, head) = run_with_server(requests, max_workers=2)
+
+    status, headers, body = first
+    assert status == 200
+    assert headers["Content-Type"] == "image/png"
+    assert body == EAN13("400638133393").to_image_bytes(
+        module_width=3, bar_height=80, draw_text=False
+    )
+    with Image.open(BytesIO(body)) as image:
+        assert image.size == (95 * 3 + 100, 80)
+
+    expected_key = EAN13("400638133393").render_key(
+        "PNG", module_width=3, bar_height=80, draw_text=False
+    )
+    assert headers["ETag"] == f'"{expected_key}"'
+
+    assert second[0] == 304
+    assert second[2] == b""
+    assert "Content-Length" not in second[1]
+    assert weak[0] == 304
+    assert head[0] == 200
+    assert head[2] == b""
+
+    stats = server.stats()
+    assert stats.requests == 4
+    assert stats.renders == 2
+    assert stats.not_modified == 2
+    assert stats.in_flight == 0
+    assert stats.latency_p99 >= stats.latency_p50 > 0
+
+
+def test_server_formats_and_errors():
+    def requests(address):
+        return {
+            "jpeg": request(address, "/code39/ABC%20123.jpg?size=200x100"),
+            "stats": request(address, "/stats"),
+            "symbology": request(address, "/nope/123.png"),
+            "format": request(address, "/ean13/400638133393.nope"),
+            "path": request(address, "/ean13"),
+            "code": request(address, "/ean13/abc.png"),
+            "option": request(address, "/ean13/400638133393.png?module_width=0"),
+            "unknown": request(address, "/ean13/400638133393.png?colour=red"),
+            "limit": request(address, "/ean13/400638133393.png?module_width=3000"),
+            "method": request(address, "/ean13/400638133393.png", method="POST"),
+            "encoder": request(address, "/ean13/400638133393.xbm"),
+            "mode": request(address, "/ean13/400638133393.xbm?mode=1"),
+            "bad_mode": request(address, "/ean13/400638133393.png?mode=cmyk"),
+        }
+
+    _, responses = run_with_server(requests)
+
+    status, headers, body = responses["jpeg"]
+    assert status == 200
+    assert headers["Content-Type"] == "image/jpeg"
+    with Image.open(BytesIO(body)) as image:
+        assert image.size == (200, 100)
+
+    assert responses["stats"][0] == 200
+    assert json.loads(responses["stats"][2])["renders"] == 1
+
+    assert responses["symbology"][0] == 404
+    assert responses["format"][0] == 404
+    assert responses["path"][0] == 404
+    assert responses["code"][0] == 400
+    assert responses["option"][0] == 400
+    assert responses["unknown"][0] == 400
+    assert responses["limit"][0] == 400
+    assert b"over the limit" in responses["limit"][2]
+    assert responses["method"][0] == 405
+    assert responses["encoder"][0] == 500
+    assert b"can't be rendered" in responses["encoder"][2]
+    assert responses["mode"][0] == 200
+    assert responses["bad_mode"][0] == 400
+
+
+def test_server_shared_cache():
+    path = "/ean13/400638133393.png?module_width=2"
+
+    with SharedMemoryCache(size=1024**2) as cache:
+        server, (first, second) = run_with_server(
+            lambda address: (request(address, path), request(address, path)),
+            cache=cache,
+        )
+        # Another worker with the same cache doesn't render it again
+        other, third = run_with_server(lambda a: request(a, path), cache=cache)
+
+    assert first[2] == second[2] == third[2]
+    assert first[2] == EAN13("400638133393").to_image_bytes(module_width=2)
+    assert server.stats().renders == 1
+    assert server.stats().cache_hits == 1
+    assert other.stats().renders == 0
+
+
+def test_server_closes_keep_alive_connections():
+    async def main():
+        server = RenderServer(port=0)
+        await server.start()
+        reader, writer = await asyncio.open_connection(*server.address)
+        writer.write(b"GET /stats HTTP/1.1\r\nHost: test\r\n\r\n")
+        await writer.drain()
+        await reader.readuntil(b"\r\n\r\n")
+
+        # The connection is idle and kept alive while the server closes
+        await asyncio.wait_for(server.close(), timeout=10)
+        assert not server._connections
+        assert await reader.read() is not None
+        writer.close()
+        await writer.wait_closed()
+
+    asyncio.run(main())
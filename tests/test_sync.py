@@ -0,0 +1,98 @@
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from pybarcodes import EAN13
+from pybarcodes.sync import main, read_entries, sync_directory
+
+OPTIONS = {"module_width": 1, "bar_height": 10, "draw_text": False}
+
+
+def test_sync_renders_only_changes(tmp_path: Path):
+    output = tmp_path / "labels"
+    codes = dict(zip(["a", "b", "c"], EAN13.range("4006381", 0, 3)))
+
+    assert sync_directory(codes, output, "ean13", options=OPTIONS) == (3, 0, 0, 0, 0)
+    with Image.open(output / "b.png") as img:
+        assert img.tobytes() == EAN13(codes["b"]).render(**OPTIONS).tobytes()
+
+    modified = (output / "a.png").stat().st_mtime_ns
+    (output / "notes.txt").write_text("kept")
+
+    codes["b"] = "400638100099"
+    codes["d"] = "invalid"
+    del codes["c"]
+    result = sync_directory(codes, output, EAN13, options=OPTIONS, max_workers=2)
+    assert result == (1, 1, 1, 1, 0)
+    assert (output / "a.png").stat().st_mtime_ns == modified
+    assert not (output / "c.png").exists()
+    assert (output / "notes.txt").exists()
+
+    # Different options change every key
+    result = sync_directory(codes, output, EAN13, options={**OPTIONS, "bar_height": 20})
+    assert result == (2, 0, 0, 1, 0)
+
+    # A label that was deleted by hand is rendered again
+    (output / "a.png").unlink()
+    options = {**OPTIONS, "bar_height": 20}
+    assert sync_directory(codes, output, EAN13, options=options) == (1, 1, 0, 1, 0)
+
+    assert sync_directory(codes, output, EAN13, format="GIF") == (2, 0, 2, 1, 0)
+    assert sorted(path.name for path in output.iterdir()) == [
+        ".pybarcodes-sync.json",
+        "a.gif",
+        "b.gif",
+        "notes.txt",
+    ]
+
+
+def test_sync_render_failures(tmp_path: Path, monkeypatch):
+    codes = dict(zip(["a", "b"], EAN13.range("4006381", 0, 2)))
+    assert sync_directory(codes, tmp_path, EAN13, options=OPTIONS).rendered == 2
+    (tmp_path / "a.png.123.tmp").write_bytes(b"left by a killed sync")
+
+    save = EAN13.save
+
+    def failing_save(barcode, path, **kwargs):
+        if barcode.code == codes["b"]:
+            raise OSError("disk full")
+        return save(barcode, path, **kwargs)
+
+    # A failed label keeps its old file, and the sync goes on
+    monkeypatch.setattr(EAN13, "save", failing_save)
+    codes["c"] = "400638133393"
+    options = {**OPTIONS, "bar_height": 20}
+    assert sync_directory(codes, tmp_path, EAN13, options=options) == (2, 0, 0, 0, 1)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        ".pybarcodes-sync.json",
+        "a.png",
+        "b.png",
+        "c.png",
+    ]
+
+    # Until it renders
+    monkeypatch.undo()
+    assert sync_directory(codes, tmp_path, EAN13, options=options) == (1, 2, 0, 0, 0)
+
+
+def test_sync_invalid_names(tmp_path: Path):
+    code = "400638133393"
+    with pytest.raises(ValueError):
+        sync_directory([("a", code), ("a", code)], tmp_path, EAN13)
+    with pytest.raises(ValueError):
+        sync_directory([("../a", code)], tmp_path, EAN13)
+    with pytest.raises(ValueError):
+        sync_directory({"a": code}, tmp_path, EAN13, options={"mode": "P"})
+
+
+def test_sync_csv(tmp_path: Path, capsys):
+    source = tmp_path / "products.csv"
+    source.write_text("sku,code,name\nA-1,400638133393,Pen\n,400638100001,\n")
+    assert list(read_entries(source)) == [("A-1", "400638133393")]
+    with pytest.raises(ValueError):
+        list(read_entries(source, code_column="gtin"))
+
+    main([str(source), str(tmp_path / "labels"), "--format", "gif"])
+    assert "1 rendered, 0 unchanged" in capsys.readouterr().err
+    assert (tmp_path / "labels" / "A-1.gif").exists()
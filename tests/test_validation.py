@@ -0,0 +1,120 @@
+from pathlib import Path
+
+import pytest
+
+from pybarcodes import EAN8, EAN13, JAN
+from pybarcodes.validation import (
+    TRANSPOSITION,
+    apply_correction,
+    diagnose_codes,
+    read_error_offsets,
+    validate_file,
+)
+
+RECORDS = [
+    b"4006381333931",  # valid
+    b"4006381333932",  # wrong check digit
+    b"400638133393",  # missing check digit
+    b"40063813339x",  # not a code
+    b"",
+    b"6291041500213\r",  # valid, with a carriage return
+]
+
+
+def test_validate_file(tmp_path: Path):
+    source = tmp_path / "codes.txt"
+    source.write_bytes(b"\n".join(RECORDS) + b"\n")
+    output = tmp_path / "output.txt"
+    errors = tmp_path / "errors.bin"
+
+    result = validate_file(source, output=output, errors=errors)
+
+    assert result == (5, 2, 1, 1, 1)
+    assert output.read_bytes().split(b"\n") == [
+        b"4006381333931",
+        b"4006381333931",
+        b"4006381333931",
+        b"40063813339x",
+        b"6291041500213",
+        b"",
+    ]
+    assert list(read_error_offsets(errors)) == [14, 41]
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_validate_file_chunks(tmp_path: Path, processes):
+    source = tmp_path / "codes.txt"
+    with open(source, "wb") as file:
+        for chunk in EAN8.range_chunks("96", 0, 5000):
+            file.write(chunk)
+    output = tmp_path / "output.txt"
+
+    result = validate_file(
+        source, EAN8, output=output, processes=processes, chunk_size=1000
+    )
+
+    assert result.records == result.valid == 5000
+    assert output.read_bytes() == source.read_bytes()
+
+
+def test_validate_fixed_width_file(tmp_path: Path):
+    source = tmp_path / "codes.dat"
+    source.write_bytes(b"4006381333932 400638133393  6291041500213 ")
+
+    result = validate_file(source, EAN13, errors=tmp_path / "e", record_length=14)
+
+    assert result == (3, 1, 1, 1, 0)
+    assert list(read_error_offsets(tmp_path / "e")) == [0]
+
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+    assert validate_file(empty) == (0, 0, 0, 0, 0)
+
+    with pytest.raises(ValueError):
+        validate_file(source, record_length=0)
+
+
+def test_diagnose_codes():
+    codes = ["4006381333931", b"4006381333913", "40063813339x1", "4006318333931"]
+    diagnosis = diagnose_codes(codes)
+
+    assert list(diagnosis.valid) == [0]
+    assert list(diagnosis.malformed) == [2]
+    assert set(diagnosis.rows) == {1, 3}
+
+    corrections = [
+        (row, kind, apply_correction(str(codes[3]), kind, position, digit))
+        for row, kind, position, digit in zip(*diagnosis[:4])
+        if row == 3
+    ]
+    # Every digit can be substituted, one way each for weights of 1 and 3
+    assert len(corrections) > 13
+    assert (3, TRANSPOSITION, "4006381333931") in corrections
+    for _, _, code in corrections:
+        assert EAN13.normalize(code[:-1]) == code
+
+    # EAN8 weighs the positions the other way around
+    assert list(diagnose_codes(["96385074"], EAN8).valid) == [0]
+    diagnosis = diagnose_codes(["96385047"], EAN8)
+    assert (TRANSPOSITION, 6, 7) in zip(*diagnosis[1:4])
+
+
+def test_diagnose_jan_codes():
+    codes = ["4995595124481", "9490743915005", "4006381333931"]
+    diagnosis = diagnose_codes(codes, JAN)
+
+    # Corrections keep the country codes JAN accepts
+    corrections = [
+        apply_correction(codes[row], kind, position, digit)
+        for row, kind, position, digit in zip(*diagnosis[:4])
+        if row == 0
+    ]
+    assert corrections
+    for code in corrections:
+        assert JAN.normalize(code[:-1]) == code
+
+    # A swapped country code can be fixed even with a correct check digit
+    assert [row for row in diagnosis.rows if row == 1] == [1]
+    assert (1, TRANSPOSITION, 0, 4) in zip(*diagnosis[:4])
+    assert list(diagnosis.valid) == []
+    assert list(diagnosis.malformed) == [2]